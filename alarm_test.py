@@ -47,10 +47,11 @@ def callback(indata, frames, time, status):
         if ptext:
             print("Partial:", ptext)
 
+            # partials are only a hint: the siren waits for the final result
             for kw in KEYWORDS:
                 if kw in ptext:
-                    print(f"\n🚨 PARTIAL ALERT — {kw.upper()} 🚨\n")
-                    threading.Thread(target=play_siren, daemon=True).start()
+                    print(f"⏳ Armed on partial — {kw.upper()} (waiting for the final result)")
+                    break
 
 print("Starting siren test (say: help / police)...")
 with sd.InputStream(samplerate=SAMPLE_RATE, blocksize=8000, dtype='int16',
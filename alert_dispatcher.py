@@ -0,0 +1,156 @@
+"""
+alert_dispatcher.py
+
+Concurrent fan-out of one alert to every remote channel.
+
+Each Channel (Telegram, FCM, ...) runs on its own thread with its own
+timeout, retry count and optional fallback, all inside one overall
+deadline. The dispatcher returns as soon as every channel has finished or
+run out of time, so the time to first notification is bounded by the
+fastest channel instead of the sum of all of them. A channel that misses
+its timeout is reported as "timeout"; its thread is left to finish in the
+background but its result is ignored.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class Channel:
+    def __init__(self, name, send, timeout=10.0, retries=1, backoff=0.5, fallback=None, fatal=()):
+        """
+        send(timeout_s) -> truthy on success; may raise.
+        fallback(timeout_s) is tried once after all attempts of send failed.
+        fatal: exception types from send that retrying cannot fix (the request
+        itself was rejected); they skip the remaining attempts, not the fallback.
+        """
+        self.name = name
+        self.send = send
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.fallback = fallback
+        self.fatal = tuple(fatal)
+
+
+class ChannelResult:
+    def __init__(self, name, status, latency_ms, attempts, error=None):
+        self.name = name
+        self.status = status          # "ok" | "fallback" | "failed" | "timeout"
+        self.latency_ms = latency_ms
+        self.attempts = attempts
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.status in ("ok", "fallback")
+
+    @property
+    def retries(self):
+        return max(0, self.attempts - 1)
+
+    def as_dict(self):
+        return {"status": self.status, "latency_ms": round(self.latency_ms, 1),
+                "attempts": self.attempts, "retries": self.retries, "error": self.error}
+
+
+class DispatchResult:
+    def __init__(self, channels, first_ok_ms, total_ms):
+        self.channels = channels          # name -> ChannelResult
+        self.first_ok_ms = first_ok_ms    # None if nothing got through
+        self.total_ms = total_ms
+
+    @property
+    def ok(self):
+        return any(r.ok for r in self.channels.values())
+
+    def as_dict(self):
+        return {"first_ok_ms": self.first_ok_ms, "total_ms": round(self.total_ms, 1),
+                "channels": {n: r.as_dict() for n, r in self.channels.items()}}
+
+    def summary(self):
+        parts = []
+        for r in self.channels.values():
+            extra = f" x{r.attempts}" if r.attempts > 1 else ""
+            parts.append(f"{r.name}={r.status}/{r.latency_ms:.0f}ms{extra}")
+        first = f"{self.first_ok_ms:.0f}ms" if self.first_ok_ms is not None else "none"
+        return f"first={first} total={self.total_ms:.0f}ms " + " ".join(parts)
+
+
+class AlertDispatcher:
+    def __init__(self, max_workers=8, deadline=20.0):
+        self.deadline = deadline
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dispatch")
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+    def _run(self, ch, start, limit, state):
+        err = None
+        for attempt in range(ch.retries + 1):
+            remaining = limit - time.monotonic()
+            if remaining <= 0:
+                break
+            state["attempts"] = attempt + 1
+            try:
+                if ch.send(remaining):
+                    return ChannelResult(ch.name, "ok", (time.monotonic() - start) * 1000.0, attempt + 1)
+            except ch.fatal as e:
+                err = str(e)
+                break
+            except Exception as e:
+                err = str(e)
+            if attempt < ch.retries:
+                pause = min(ch.backoff * (2 ** attempt), max(0.0, limit - time.monotonic()))
+                time.sleep(pause)
+        if ch.fallback is not None:
+            remaining = limit - time.monotonic()
+            if remaining > 0:
+                try:
+                    if ch.fallback(remaining):
+                        return ChannelResult(ch.name, "fallback", (time.monotonic() - start) * 1000.0,
+                                             state["attempts"], err)
+                except Exception as e:
+                    err = str(e)
+        return ChannelResult(ch.name, "failed", (time.monotonic() - start) * 1000.0, state["attempts"], err)
+
+    def dispatch(self, channels, deadline=None):
+        deadline = self.deadline if deadline is None else deadline
+        start = time.monotonic()
+        limits = {}
+        states = {}
+        futures = {}
+        for ch in channels:
+            limits[ch.name] = start + min(ch.timeout, deadline)
+            states[ch.name] = {"attempts": 0}
+            f = self._pool.submit(self._run, ch, start, limits[ch.name], states[ch.name])
+            futures[f] = ch.name
+
+        results = {}
+        first_ok = None
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            for f in [f for f in pending if now >= limits[futures[f]] and not f.done()]:
+                name = futures[f]
+                results[name] = ChannelResult(name, "timeout", (now - start) * 1000.0,
+                                              states[name]["attempts"])
+                pending.discard(f)
+            if not pending:
+                break
+            next_limit = min(limits[futures[f]] for f in pending)
+            done, _ = wait(pending, timeout=max(0.0, next_limit - now), return_when=FIRST_COMPLETED)
+            for f in done:
+                pending.discard(f)
+                name = futures[f]
+                try:
+                    r = f.result()
+                except Exception as e:
+                    r = ChannelResult(name, "failed", (time.monotonic() - start) * 1000.0,
+                                      states[name]["attempts"], str(e))
+                results[name] = r
+                if r.ok and (first_ok is None or r.latency_ms < first_ok):
+                    first_ok = r.latency_ms
+
+        ordered = {ch.name: results[ch.name] for ch in channels}
+        return DispatchResult(ordered, first_ok, (time.monotonic() - start) * 1000.0)
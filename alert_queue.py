@@ -0,0 +1,110 @@
+"""
+alert_queue.py
+
+Bounded alert queue + small worker pool.
+
+The sounddevice callback must never block on camera / network / siren work,
+otherwise the input stream overflows and we lose audio. The callback only
+calls AlertQueue.submit(), which never waits; the workers run the actual
+alert handler.
+"""
+
+import queue
+import threading
+import time
+
+
+class AlertQueue:
+    def __init__(self, handler, maxsize=8, workers=2, name="alert"):
+        self.handler = handler
+        self.name = name
+        self._q = queue.Queue(maxsize=maxsize)
+        self._workers = workers
+        self._threads = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.dropped = 0
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0
+
+    def start(self):
+        for i in range(self._workers):
+            t = threading.Thread(target=self._run, name=f"{self.name}-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def submit(self, *args):
+        """Enqueue an alert without blocking. Returns False if the queue is full."""
+        try:
+            self._q.put_nowait((time.monotonic(), args))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                queued_at, args = self._q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self._lock:
+                self.busy += 1
+            try:
+                self.handler(*args)
+                with self._lock:
+                    self.processed += 1
+            except Exception as e:
+                print(f"❌ {self.name} handler error:", e)
+                with self._lock:
+                    self.failed += 1
+            finally:
+                with self._lock:
+                    self.busy -= 1
+                self._q.task_done()
+
+    def join(self):
+        """Wait until every queued alert has been handled."""
+        self._q.join()
+
+    def stop(self, timeout=2.0, drain=False):
+        """Stop the workers; with drain=True, items still queued are handled on the caller's thread."""
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+        while drain:
+            try:
+                _, args = self._q.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                self.handler(*args)
+                with self._lock:
+                    self.processed += 1
+            except Exception as e:
+                print(f"❌ {self.name} handler error:", e)
+                with self._lock:
+                    self.failed += 1
+            finally:
+                self._q.task_done()
+
+    def depth(self):
+        return self._q.qsize()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "depth": self._q.qsize(),
+                "busy": self.busy,
+                "submitted": self.submitted,
+                "processed": self.processed,
+                "failed": self.failed,
+                "dropped": self.dropped,
+            }
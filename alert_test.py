@@ -76,11 +76,11 @@ def callback(indata, frames, time_data, status):
         if partial:
             print("Partial:", partial)
 
+            # partials are only a hint: the alert waits for the final result
             for kw in KEYWORDS:
                 if kw in partial:
-                    print(f"\n🚨 PARTIAL ALERT — {kw.upper()} 🚨\n")
-                    threading.Thread(target=play_siren, daemon=True).start()
-                    threading.Thread(target=send_telegram_alert, args=(kw,), daemon=True).start()
+                    print(f"⏳ Armed on partial — {kw.upper()} (waiting for the final result)")
+                    break
 
 print("Starting ALERT system (Ctrl+C to stop)...")
 with sd.InputStream(samplerate=SAMPLE_RATE, blocksize=8000, dtype='int16',
@@ -0,0 +1,169 @@
+"""
+audio_evidence.py
+
+Audio evidence clips from a rolling PCM ring buffer.
+
+PcmRing holds the last few seconds of int16 mono audio in one
+preallocated array. The audio callback copies each block straight from
+indata into the ring (np.copyto into at most two slices, no temporary
+buffers), so memory stays fixed and the callback does no allocation.
+
+On an alert ClipRecorder waits on its own worker until enough audio after
+the keyword has arrived, cuts the clip, downsamples it and encodes it as
+G.711 mu-law WAV (8 bits per sample, 8 kHz: a quarter of 16-bit 16 kHz
+PCM and playable everywhere), then hands the bytes to a callback.
+"""
+
+import struct
+import threading
+import time
+
+import numpy as np
+
+from alert_queue import AlertQueue
+
+WAVE_FORMAT_MULAW = 7
+
+
+class PcmRing:
+    def __init__(self, seconds, sample_rate):
+        self.sample_rate = sample_rate
+        self.capacity = int(seconds * sample_rate)
+        self._buf = np.zeros(self.capacity, dtype=np.int16)
+        self._written = 0           # total samples ever written (the sample clock)
+        self._last_ts = None        # monotonic time of the end of the last block
+
+    def write(self, samples, ts=None):
+        """Append a 1-D int16 view (e.g. indata[:, 0]); called from the audio callback."""
+        n = len(samples)
+        if n >= self.capacity:
+            samples = samples[n - self.capacity:]
+            self._written += n - self.capacity
+            n = self.capacity
+        i = self._written % self.capacity
+        first = min(n, self.capacity - i)
+        np.copyto(self._buf[i:i + first], samples[:first])
+        if first < n:
+            np.copyto(self._buf[:n - first], samples[first:])
+        self._written += n
+        self._last_ts = time.monotonic() if ts is None else ts
+
+    @property
+    def position(self):
+        return self._written
+
+    def position_at(self, ts):
+        """Sample position that corresponds to monotonic time ts."""
+        if self._last_ts is None:
+            return self._written
+        return self._written - int(round((self._last_ts - ts) * self.sample_rate))
+
+    def ts_at(self, pos):
+        """Monotonic time of sample position pos (inverse of position_at)."""
+        if self._last_ts is None:
+            return time.monotonic()
+        return self._last_ts - (self._written - pos) / float(self.sample_rate)
+
+    def read(self, start, end):
+        """Copy of samples [start, end), clamped to what the ring still holds."""
+        written = self._written
+        start = max(start, written - self.capacity, 0)
+        end = min(end, written)
+        if end <= start:
+            return np.zeros(0, dtype=np.int16)
+        i, j = start % self.capacity, end % self.capacity
+        if i < j:
+            return self._buf[i:j].copy()
+        return np.concatenate((self._buf[i:], self._buf[:j]))
+
+
+def _lowpass_taps(factor, taps=31):
+    n = np.arange(taps) - (taps - 1) / 2.0
+    h = np.sinc(n / factor) * np.hamming(taps)
+    return h / h.sum()
+
+
+def decimate(pcm, factor):
+    if factor <= 1:
+        return pcm
+    y = np.convolve(pcm.astype(np.float32), _lowpass_taps(factor), mode="same")[::factor]
+    return np.clip(np.round(y), -32768, 32767).astype(np.int16)
+
+
+def mulaw_encode(pcm):
+    """G.711 mu-law: int16 samples -> uint8 codes."""
+    x = pcm.astype(np.int32) >> 2          # 14-bit, as in the reference coder
+    neg = x < 0
+    mag = np.minimum(np.where(neg, -x, x), 8158) + 33
+    exponent = np.clip(np.floor(np.log2(mag)).astype(np.int32) - 5, 0, 7)
+    mantissa = (mag >> (exponent + 1)) & 0x0F
+    return (((exponent << 4) | mantissa) ^ np.where(neg, 0x7F, 0xFF)).astype(np.uint8)
+
+
+def mulaw_wav(pcm, sample_rate):
+    """WAV file bytes (WAVE_FORMAT_MULAW, mono) for int16 samples."""
+    data = mulaw_encode(pcm).tobytes()
+    fmt = struct.pack("<HHIIHHH", WAVE_FORMAT_MULAW, 1, sample_rate, sample_rate, 1, 8, 0)
+    fact = struct.pack("<I", len(data))
+    pad = b"\0" if len(data) % 2 else b""
+    body = (b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+            + b"fact" + struct.pack("<I", len(fact)) + fact
+            + b"data" + struct.pack("<I", len(data)) + data + pad)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+class ClipRecorder:
+    def __init__(self, ring, before=8.0, after=4.0, out_rate=8000, on_clip=None, maxsize=4):
+        """on_clip(wav_bytes, keyword, *context) runs on the recorder's worker."""
+        self.ring = ring
+        self.before = before
+        self.after = after
+        self.out_rate = out_rate
+        self.on_clip = on_clip
+        self._queue = AlertQueue(self._cut, maxsize=maxsize, workers=1, name="clip")
+        self._stop = threading.Event()
+        self.clips = 0
+        self.bytes_encoded = 0
+        self.encode_ms = 0.0
+
+    def start(self):
+        self._stop.clear()
+        self._queue.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._queue.stop()
+
+    def request(self, keyword, trigger_ts=None, *context):
+        """Queue a clip around trigger_ts (monotonic); returns False if the queue is full."""
+        trigger_ts = time.monotonic() if trigger_ts is None else trigger_ts
+        return self._queue.submit(keyword, trigger_ts, *context)
+
+    def _cut(self, keyword, trigger_ts, *context):
+        sr = self.ring.sample_rate
+        center = self.ring.position_at(trigger_ts)
+        start = center - int(self.before * sr)
+        end = center + int(self.after * sr)
+        # wait for the audio after the keyword (the mic keeps running)
+        give_up = time.monotonic() + self.after + 2.0
+        while self.ring.position < end and time.monotonic() < give_up and not self._stop.is_set():
+            time.sleep(0.05)
+        t0 = time.perf_counter()
+        pcm = self.ring.read(start, end)
+        if not len(pcm):
+            return
+        factor = max(1, sr // self.out_rate)
+        wav = mulaw_wav(decimate(pcm, factor), sr // factor)
+        self.encode_ms = (time.perf_counter() - t0) * 1000.0
+        self.clips += 1
+        self.bytes_encoded += len(wav)
+        print(f"🎙 Audio clip ready ({len(pcm) / sr:.1f}s, {len(wav) / 1024:.0f} KB, "
+              f"encoded in {self.encode_ms:.0f}ms)")
+        if self.on_clip is not None:
+            self.on_clip(wav, keyword, *context)
+
+    def stats(self):
+        s = self._queue.stats()
+        s.update(clips=self.clips, bytes_encoded=self.bytes_encoded, encode_ms=round(self.encode_ms, 1))
+        return s
@@ -0,0 +1,129 @@
+"""
+audio_feed.py
+
+Decouples the capture block size from the recognizer feed size.
+
+The audio callback gets small device blocks (100 ms) and only copies them
+into the PcmRing (single producer, no lock; the reader keeps its own
+sample cursor). A feeder thread takes the audio out of the ring in chunks
+of `feed` samples and runs them through the VAD / recognizer.
+
+Small feeds cut the time until the recognizer has seen a keyword; large
+feeds are cheaper per second of audio (fewer decoder calls). With
+`adaptive` the feed size follows the measured real-time factor: it shrinks
+one step while the decoder has plenty of CPU headroom and grows when it
+gets close to real time or a backlog builds up.
+"""
+
+import threading
+import time
+
+
+class RecognizerFeed:
+    def __init__(self, ring, process, feed=3200, min_feed=1600, max_feed=8000, step=800,
+                 adaptive=True, low_rtf=0.25, high_rtf=0.6):
+        """process(pcm_1d_int16, chunk_end_ts) runs on the feeder thread (or in pump())."""
+        self.ring = ring
+        self.process = process
+        self.base_feed = feed
+        self.min_feed = min_feed
+        self.max_feed = max_feed
+        self.step = step
+        self.adaptive = adaptive
+        self.low_rtf = low_rtf
+        self.high_rtf = high_rtf
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.reset()
+
+    def reset(self, cursor=None):
+        self.feed = self.base_feed
+        self.cursor = self.ring.position if cursor is None else cursor
+        self.rtf = None             # moving average of decode time / audio time
+        self.chunk_t0 = None        # perf_counter when the current chunk started processing
+        self.chunks = 0
+        self.overrun_samples = 0
+        self.max_backlog = 0
+        self.resizes = 0
+
+    # ---------- thread ----------
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="recognizer-feed", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+
+    def notify(self):
+        """Called by the audio callback after each ring write."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(0.2)
+            self._wake.clear()
+            try:
+                self.pump()
+            except Exception as e:
+                print("Audio feed error:", e)
+
+    # ---------- feeding ----------
+
+    def backlog(self):
+        return self.ring.position - self.cursor
+
+    def pump(self, flush=False):
+        """Process every full chunk in the ring (and the tail too with flush); returns chunks."""
+        done = 0
+        while True:
+            avail = self.backlog()
+            if avail > self.ring.capacity:
+                # fell more than a ring behind: skip to the oldest audio still held
+                self.overrun_samples += avail - self.ring.capacity
+                self.cursor = self.ring.position - self.ring.capacity
+                avail = self.ring.capacity
+            self.max_backlog = max(self.max_backlog, avail)
+            n = self.feed if avail >= self.feed else (avail if flush else 0)
+            if n <= 0:
+                return done
+            pcm = self.ring.read(self.cursor, self.cursor + n)
+            self.cursor += n
+            ts = self.ring.ts_at(self.cursor)
+            self.chunk_t0 = time.perf_counter()
+            self.process(pcm, ts)
+            dt = time.perf_counter() - self.chunk_t0
+            self.chunk_t0 = None
+            self.chunks += 1
+            done += 1
+            self._adapt(dt, n, avail - n)
+
+    def _adapt(self, dt, n, backlog):
+        rtf = dt * self.ring.sample_rate / n
+        self.rtf = rtf if self.rtf is None else 0.8 * self.rtf + 0.2 * rtf
+        if not self.adaptive:
+            return
+        feed = self.feed
+        if self.rtf > self.high_rtf or backlog > 2 * feed:
+            feed = min(self.max_feed, feed + self.step)
+        elif self.rtf < self.low_rtf and backlog < feed:
+            feed = max(self.min_feed, feed - self.step)
+        if feed != self.feed:
+            self.feed = feed
+            self.resizes += 1
+
+    def stats(self):
+        sr = float(self.ring.sample_rate)
+        return {"feed_ms": round(self.feed * 1000.0 / sr), "chunks": self.chunks,
+                "rtf": None if self.rtf is None else round(self.rtf, 3),
+                "backlog_ms": round(self.backlog() * 1000.0 / sr),
+                "max_backlog_ms": round(self.max_backlog * 1000.0 / sr),
+                "overrun_ms": round(self.overrun_samples * 1000.0 / sr), "resizes": self.resizes}
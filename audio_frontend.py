@@ -0,0 +1,167 @@
+"""
+audio_frontend.py
+
+Native-rate, multi-channel capture front-end.
+
+Many USB mic arrays only run at 44.1 / 48 kHz with 2-8 channels; asking
+PortAudio / ALSA for 16 kHz mono makes it resample in the driver (CPU
+heavy) or fails to open the device. The stream is opened in the device's
+own format instead and each block goes through:
+
+- ChannelSelector: per-channel SNR from 10 ms frame energies against a
+  slowly tracked noise floor (one vectorized pass over the block); either
+  the best channel is taken (with hysteresis, so it does not flap between
+  two similar mics) or all channels are mixed with SNR weights
+- PolyphaseResampler: streaming rational resampler (up/down from the gcd,
+  e.g. 48000 -> 16000 is 1/3, 44100 -> 16000 is 160/441). Only the output
+  samples are computed, each as one K-tap dot product against its filter
+  phase (gathered with fancy indexing), with filter history carried
+  between blocks
+
+AudioFrontEnd ties both together and measures the CPU time it spends per
+second of audio. With a 16 kHz mono device it is a plain pass-through.
+"""
+
+import time
+from math import gcd
+
+import numpy as np
+
+
+class PolyphaseResampler:
+    def __init__(self, in_rate, out_rate, zero_crossings=12, rolloff=0.9, beta=8.0):
+        g = gcd(int(in_rate), int(out_rate))
+        self.up = int(out_rate) // g
+        self.down = int(in_rate) // g
+        up, down = self.up, self.down
+        # windowed-sinc low-pass just below the lower of the two Nyquist rates
+        # (at the upsampled rate), so little aliases back into the speech band
+        cutoff = rolloff * 0.5 / max(up, down)
+        length = 2 * zero_crossings * max(up, down) + 1
+        n = np.arange(length) - (length - 1) / 2.0
+        h = 2.0 * cutoff * np.sinc(2.0 * cutoff * n) * np.kaiser(length, beta) * up
+        self.taps = -(-length // up)                        # taps per phase (K)
+        h = np.concatenate((h, np.zeros(self.taps * up - length)))
+        self._phases = h.reshape(self.taps, up).T.astype(np.float32).copy()   # [phase, k] = h[phase + k*up]
+        self._hist = np.zeros(self.taps - 1, dtype=np.float32)
+        self._n0 = 0            # input index of the next block's first sample
+        self._m = 0             # index of the next output sample
+        self._k = np.arange(self.taps)
+
+    def reset(self):
+        self._hist[:] = 0.0
+        self._n0 = 0
+        self._m = 0
+
+    def process(self, x):
+        """1-D float32 block in, 1-D float32 block out (len ~ len(x) * up / down)."""
+        up, down, K = self.up, self.down, self.taps
+        x = np.asarray(x, dtype=np.float32)
+        ext = np.concatenate((self._hist, x))
+        end = self._n0 + len(x)
+        m_end = (end * up + down - 1) // down              # outputs whose newest input is in this block
+        m = np.arange(self._m, m_end, dtype=np.int64)
+        pos = m * down
+        i = pos // up - self._n0 + (K - 1)                  # newest input of each output, in ext
+        idx = i[:, None] - self._k[None, :]
+        y = np.einsum("mk,mk->m", ext[idx], self._phases[pos % up])
+        self._hist = ext[len(ext) - (K - 1):].copy() if K > 1 else self._hist
+        self._m = m_end
+        self._n0 = end
+        # keep the counters small: one period is `down` inputs / `up` outputs
+        periods = self._n0 // down
+        self._n0 -= periods * down
+        self._m -= periods * up
+        return y
+
+
+class ChannelSelector:
+    def __init__(self, sample_rate, mode="best", frame_ms=10, noise_adapt=0.02, hysteresis_db=3.0):
+        """mode: "best" (highest SNR channel), "mix" (SNR-weighted mix) or a channel index."""
+        self.mode = mode
+        self.frame = max(1, int(sample_rate * frame_ms / 1000))
+        self.noise_adapt = noise_adapt
+        self.hysteresis_db = hysteresis_db
+        self.noise = None               # per-channel noise energy
+        self.snr_db = None              # per-channel SNR of the last block
+        self.channel = 0
+        self.switches = 0
+
+    def _snr(self, x):
+        n = (len(x) // self.frame) * self.frame
+        if n == 0:
+            return self.snr_db
+        frames = x[:n].reshape(-1, self.frame, x.shape[1])
+        energy = np.mean(frames * frames, axis=1) + 1e-3     # [frame, channel]
+        quiet = np.percentile(energy, 20, axis=0)
+        if self.noise is None:
+            self.noise = quiet
+        else:
+            # follow drops at once, rises slowly (speech must not lift the floor)
+            self.noise = np.where(quiet < self.noise, quiet,
+                                  self.noise + self.noise_adapt * (quiet - self.noise))
+        loud = np.percentile(energy, 90, axis=0)
+        self.snr_db = 10.0 * np.log10(loud / self.noise)
+        return self.snr_db
+
+    def process(self, x):
+        """x: float32 [samples, channels] -> float32 [samples]."""
+        if x.shape[1] == 1:
+            return x[:, 0]
+        if not isinstance(self.mode, str):
+            return x[:, int(self.mode)]
+        snr = self._snr(x)
+        if self.mode == "mix":
+            w = np.power(10.0, np.maximum(snr, 0.0) / 10.0)
+            return x @ (w / w.sum()).astype(np.float32)
+        best = int(np.argmax(snr))
+        if best != self.channel and snr[best] - snr[self.channel] > self.hysteresis_db:
+            self.channel = best
+            self.switches += 1
+        return x[:, self.channel]
+
+
+class AudioFrontEnd:
+    def __init__(self, in_rate, channels, out_rate=16000, select="best"):
+        """Raises ValueError if `select` is not "best", "mix" or a channel the device has."""
+        if isinstance(select, str):
+            if select not in ("best", "mix"):
+                raise ValueError(f"channel select {select!r}: expected 'best', 'mix' or a channel index")
+        elif not 0 <= int(select) < int(channels):
+            raise ValueError(f"channel select {select}: the device has {channels} channel(s)")
+        self.in_rate = int(in_rate)
+        self.channels = int(channels)
+        self.out_rate = int(out_rate)
+        self.passthrough = self.in_rate == self.out_rate and self.channels == 1
+        self.selector = ChannelSelector(self.in_rate, select)
+        self.resampler = PolyphaseResampler(self.in_rate, self.out_rate) if self.in_rate != self.out_rate else None
+        self.cpu_s = 0.0
+        self.audio_s = 0.0
+
+    def blocksize(self, out_block):
+        """Device block that yields about `out_block` output samples."""
+        return int(round(out_block * self.in_rate / float(self.out_rate)))
+
+    def process(self, indata):
+        """int16 [samples, channels] at the device rate -> int16 mono at out_rate."""
+        if self.passthrough:
+            return indata[:, 0]
+        t0 = time.thread_time()
+        x = self.selector.process(indata.astype(np.float32))
+        if self.resampler is not None:
+            x = self.resampler.process(x)
+        out = np.clip(np.rint(x), -32768, 32767).astype(np.int16)
+        self.cpu_s += time.thread_time() - t0
+        self.audio_s += len(indata) / float(self.in_rate)
+        return out
+
+    def cpu_ms_per_s(self):
+        """CPU milliseconds spent per second of captured audio."""
+        return 1000.0 * self.cpu_s / self.audio_s if self.audio_s else 0.0
+
+    def stats(self):
+        s = self.selector
+        return {"in_rate": self.in_rate, "channels": self.channels, "out_rate": self.out_rate,
+                "channel": s.channel if s.mode == "best" else s.mode, "switches": s.switches,
+                "snr_db": None if s.snr_db is None else [round(float(v), 1) for v in s.snr_db],
+                "cpu_ms_per_s": round(self.cpu_ms_per_s(), 2)}
@@ -0,0 +1,222 @@
+"""
+camera_service.py
+
+Always-on camera capture.
+
+Keeps cv2.VideoCapture open in a background thread and stores the last few
+seconds of downscaled frames in a preallocated NumPy ring buffer, so an
+alert can grab the current frame (and some pre-trigger frames) without
+paying the device open / warm-up cost.
+"""
+
+import platform
+import threading
+import time
+
+import numpy as np
+
+
+class CameraService:
+    def __init__(self, cam_index=0, width=480, fps=5, seconds=4):
+        self.cam_index = cam_index
+        self.width = width
+        self.fps = fps
+        self.capacity = max(2, int(round(fps * seconds)))
+        self._cap = None
+        self._frames = None      # (capacity, h, w, 3) uint8, allocated on first frame
+        self._stamps = np.zeros(self.capacity, dtype=np.float64)
+        self._count = 0          # total frames written
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._thread = None
+        self.opens = 0
+        self.read_failures = 0
+        self._fps_window = []
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="camera", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+        self._release()
+
+    def wait_ready(self, timeout=None):
+        """Block until the first frame is in the buffer."""
+        return self._ready.wait(timeout)
+
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def _open(self):
+        import cv2      # heavy; imported on the camera thread, not at module import
+        backend = cv2.CAP_DSHOW if platform.system() == "Windows" else 0
+        cap = cv2.VideoCapture(self.cam_index, backend)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        return cap
+
+    def _release(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+    def _run(self):
+        interval = 1.0 / self.fps
+        next_store = 0.0
+        while not self._stop.is_set():
+            if self._cap is None:
+                self._cap = self._open()
+                if self._cap is None:
+                    print("❌ Cannot open webcam (index {}), retrying...".format(self.cam_index))
+                    self._stop.wait(2.0)
+                    continue
+                self.opens += 1
+            # grab() every frame so the driver buffer never holds stale images,
+            # but only decode + store at the configured rate
+            if not self._cap.grab():
+                self.read_failures += 1
+                self._release()
+                self._stop.wait(0.5)
+                continue
+            now = time.monotonic()
+            if now < next_store:
+                continue
+            ret, frame = self._cap.retrieve()
+            if not ret or frame is None:
+                self.read_failures += 1
+                continue
+            next_store = now + interval
+            self._store(frame, now)
+
+    def _store(self, frame, ts):
+        import cv2
+        h, w = frame.shape[:2]
+        if w > self.width:
+            scale = self.width / float(w)
+            frame = cv2.resize(frame, (self.width, int(h * scale)), interpolation=cv2.INTER_AREA)
+        if self._frames is None or self._frames.shape[1:] != frame.shape:
+            with self._lock:
+                self._frames = np.empty((self.capacity,) + frame.shape, dtype=np.uint8)
+                self._count = 0
+        slot = self._count % self.capacity
+        with self._lock:
+            self._frames[slot] = frame
+            self._stamps[slot] = ts
+            self._count += 1
+            self._fps_window.append(ts)
+            if len(self._fps_window) > 2 * self.fps:
+                del self._fps_window[0]
+            self._new_frame.notify_all()
+        self._ready.set()
+
+    # ---------- readers ----------
+
+    def latest(self):
+        """Return (frame_copy, timestamp) of the newest frame or (None, 0.0)."""
+        with self._lock:
+            if self._count == 0:
+                return None, 0.0
+            slot = (self._count - 1) % self.capacity
+            return self._frames[slot].copy(), float(self._stamps[slot])
+
+    def recent(self, count):
+        """Return up to `count` newest (frame_copy, timestamp) pairs, oldest first."""
+        with self._lock:
+            n = min(count, self._count, self.capacity)
+            out = []
+            for i in range(self._count - n, self._count):
+                slot = i % self.capacity
+                out.append((self._frames[slot].copy(), float(self._stamps[slot])))
+            return out
+
+    def snapshot(self, trigger_ts=None, pre_frames=2):
+        """
+        Current frame plus up to `pre_frames` frames captured at or before
+        `trigger_ts` (monotonic seconds). Returns (frame, [pre frames, oldest first]).
+        """
+        with self._lock:
+            if self._count == 0:
+                return None, []
+            first = max(0, self._count - self.capacity)
+            last = self._count - 1
+            current = self._frames[last % self.capacity].copy()
+            before = []
+            i = last - 1 if trigger_ts is None else last
+            while i >= first and len(before) < pre_frames:
+                slot = i % self.capacity
+                if trigger_ts is None or self._stamps[slot] <= trigger_ts:
+                    if i != last:
+                        before.append(self._frames[slot].copy())
+                i -= 1
+            before.reverse()
+            return current, before
+
+    def burst(self, trigger_ts=None, before=2, after=1, wait=0.5):
+        """
+        Frames around `trigger_ts`: up to `before` captured at or before it and
+        up to `after` captured after it, waiting at most `wait` seconds for the
+        latter. Returns [(frame_copy, ts)], oldest first.
+        """
+        trigger_ts = time.monotonic() if trigger_ts is None else trigger_ts
+        deadline = time.monotonic() + wait
+        with self._new_frame:
+            while after:
+                first = max(0, self._count - self.capacity)
+                n_after = 0
+                i = self._count - 1
+                while i >= first and self._stamps[i % self.capacity] > trigger_ts:
+                    n_after += 1
+                    i -= 1
+                remaining = deadline - time.monotonic()
+                if n_after >= after or remaining <= 0:
+                    break
+                self._new_frame.wait(remaining)
+            if self._count == 0:
+                return []
+            first = max(0, self._count - self.capacity)
+            picked_after, picked_before = [], []
+            for i in range(first, self._count):
+                slot = i % self.capacity
+                ts = float(self._stamps[slot])
+                if ts > trigger_ts:
+                    if len(picked_after) < after:
+                        picked_after.append(slot)
+                else:
+                    picked_before.append(slot)
+            slots = picked_before[-before:] if before else []
+            slots += picked_after
+            if not slots:       # trigger older than the whole buffer
+                slots = [(self._count - 1) % self.capacity]
+            return [(self._frames[s].copy(), float(self._stamps[s])) for s in slots]
+
+    def stats(self):
+        # copy under the ring lock: the capture thread trims the window in place
+        with self._lock:
+            win = list(self._fps_window)
+            count = self._count
+            buf_bytes = self._frames.nbytes if self._frames is not None else 0
+        fps = 0.0
+        if len(win) > 1 and win[-1] > win[0]:
+            fps = (len(win) - 1) / (win[-1] - win[0])
+        return {
+            "capture_fps": round(fps, 2),
+            "frames": count,
+            "buffered": min(count, self.capacity),
+            "capacity": self.capacity,
+            "buffer_bytes": buf_bytes,
+            "opens": self.opens,
+            "read_failures": self.read_failures,
+        }
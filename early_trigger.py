@@ -0,0 +1,93 @@
+"""
+early_trigger.py
+
+Two-phase keyword trigger: arm on a partial result, act on the final one.
+
+Vosk's final result only arrives once the speaker stops, often a second or
+two after the keyword. A keyword in a partial result is too unreliable to
+alert on, but it is a good reason to start the cheap, reversible part of
+the alert straight away: open a provisional incident, pin the frames
+around the keyword, warm the HTTP connections. Nothing that people or
+remote parties would notice (siren, Telegram, FCM) happens while armed.
+
+The final result then confirms the arming (the caller dispatches the alert
+with the prepared evidence, which is usually ready by then) or cancels it
+(the provisional incident is dropped, the prepared work is discarded).
+An arming without a final result is cancelled after `timeout` seconds of
+`clock` (time.monotonic, or the audio position when replaying clips).
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Arming:
+    def __init__(self, keyword, ts, incident, prepared, armed_at):
+        self.keyword = keyword
+        self.ts = ts                    # monotonic time of the block holding the partial
+        self.incident = incident
+        self.prepared = prepared        # Future of prepare(keyword, ts)
+        self.armed_at = armed_at
+
+
+class EarlyTrigger:
+    def __init__(self, prepare, timeout=10.0, pool=None, clock=time.monotonic):
+        """prepare(keyword, ts) runs on `pool` and returns whatever the alert reuses."""
+        self.prepare = prepare
+        self.timeout = timeout
+        self.clock = clock
+        self.pool = pool or ThreadPoolExecutor(max_workers=1, thread_name_prefix="early")
+        self._armed = None
+        self._lock = threading.Lock()
+        self.armed = 0
+        self.confirmed = 0
+        self.cancelled = 0
+        self.expired = 0
+        self.lead_ms = 0.0              # how much earlier than the final the last arming came
+
+    @property
+    def current(self):
+        return self._armed
+
+    def arm(self, keyword, ts, incident=None):
+        """Start preparing; returns the Arming (an existing one is kept, not replaced)."""
+        with self._lock:
+            if self._armed is not None:
+                return self._armed
+            self.armed += 1
+            self._armed = Arming(keyword, ts, incident, self.pool.submit(self.prepare, keyword, ts),
+                                 self.clock())
+            return self._armed
+
+    def confirm(self):
+        """The final result has the keyword: hand over the Arming (None if not armed)."""
+        with self._lock:
+            a, self._armed = self._armed, None
+            if a is not None:
+                self.confirmed += 1
+                self.lead_ms = (self.clock() - a.armed_at) * 1000.0
+            return a
+
+    def cancel(self):
+        """The final result has no keyword: drop the Arming (returned for cleanup)."""
+        with self._lock:
+            a, self._armed = self._armed, None
+            if a is not None:
+                self.cancelled += 1
+            return a
+
+    def expire(self, now=None):
+        """Cancel an arming older than `timeout`; returns it, or None."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            a = self._armed
+            if a is None or now - a.armed_at < self.timeout:
+                return None
+            self._armed = None
+            self.expired += 1
+            return a
+
+    def stats(self):
+        return {"armed": self.armed, "confirmed": self.confirmed, "cancelled": self.cancelled,
+                "expired": self.expired, "lead_ms": round(self.lead_ms, 1)}
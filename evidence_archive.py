@@ -0,0 +1,105 @@
+"""
+evidence_archive.py
+
+Optional on-disk evidence archive.
+
+Alert evidence (JPEG snapshots, later audio clips) travels through the
+alert pipeline as in-memory buffers; writing it to the SD card is a
+separate, asynchronous step that never delays the alert. Every file gets a
+unique name (time + keyword + random suffix) and is written atomically, so
+concurrent alerts cannot overwrite each other.
+
+A file that an outbox row will point at must be on disk before the row is
+queued (the drainer may pick it up at once): wait() for a queued write, or
+save(..., sync=True). stop() writes whatever is still queued.
+"""
+
+import os
+import re
+import threading
+import uuid
+from datetime import datetime
+
+from alert_queue import AlertQueue
+
+
+def evidence_name(keyword, suffix="", ext=".jpg", when=None):
+    when = when or datetime.now()
+    kw = re.sub(r"[^a-z0-9]+", "-", (keyword or "alert").lower()).strip("-") or "alert"
+    tag = f"_{suffix}" if suffix else ""
+    return f"{when.strftime('%Y%m%d-%H%M%S')}_{kw}_{uuid.uuid4().hex[:8]}{tag}{ext}"
+
+
+def write_atomic(path, data):
+    tmp = path + ".part"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class EvidenceArchive:
+    def __init__(self, directory="evidence", maxsize=32):
+        self.directory = directory
+        self._queue = AlertQueue(self._write, maxsize=maxsize, workers=1, name="archive")
+        self._pending = {}          # path -> Event set once the queued write is done
+        self._lock = threading.Lock()
+        self.written = 0
+        self.bytes_written = 0
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._queue.start()
+        return self
+
+    def stop(self):
+        self._queue.stop(drain=True)
+
+    def save(self, data, keyword, suffix="", ext=".jpg", sync=False):
+        """
+        Queue a buffer for writing (or write it now with sync=True); returns
+        the file path it gets, or None if it was dropped / could not be written.
+        """
+        path = os.path.join(self.directory, evidence_name(keyword, suffix, ext))
+        if sync:
+            try:
+                self._write(path, bytes(data))
+            except OSError as e:
+                print("❌ Could not save evidence:", e)
+                return None
+            return path
+        with self._lock:
+            self._pending[path] = threading.Event()
+        # the caller may reuse its buffer, so hand the worker an owned copy
+        if not self._queue.submit(path, bytes(data)):
+            self._done(path)
+            print("⚠ Evidence archive queue full, not saving:", path)
+            return None
+        return path
+
+    def wait(self, path, timeout=5.0):
+        """Wait for a queued write of path; True once the file is on disk."""
+        with self._lock:
+            done = self._pending.get(path)
+        if done is not None:
+            done.wait(timeout)
+        return os.path.exists(path)
+
+    def _done(self, path):
+        with self._lock:
+            done = self._pending.pop(path, None)
+        if done is not None:
+            done.set()
+
+    def _write(self, path, data):
+        try:
+            write_atomic(path, data)
+            with self._lock:
+                self.written += 1
+                self.bytes_written += len(data)
+        finally:
+            self._done(path)
+
+    def stats(self):
+        s = self._queue.stats()
+        s.update(written=self.written, bytes_written=self.bytes_written)
+        return s
@@ -0,0 +1,162 @@
+"""
+fcm_delivery.py
+
+Bulk FCM delivery to several targets (zone topics and device tokens).
+
+All messages of one delivery are built up front and handed to one
+send_each call (chunks of 500, the FCM limit), so reaching N targets costs
+one round trip instead of N. Each target gets its own result; only targets
+that failed with a retryable error are sent again (with backoff), so a
+flaky token does not resend the alert to every topic. Tokens FCM reports
+as unregistered / invalid are not retried.
+
+A delivery is ok only if at least one target got the message and every
+topic did; a dead token does not fail it, but a permanent error on a topic
+(bad topic name, invalid payload) does, so the caller queues the alert for
+a retry instead of logging it as sent.
+
+The transport is pluggable: send_each(items) takes [(target, data)] and
+returns one (ok, error) per item. The default one uses firebase_admin;
+fcm_bench.py plugs in an emulated endpoint.
+"""
+
+import time
+
+FCM_BATCH_LIMIT = 500
+
+# firebase_admin exception class names that retrying cannot fix
+PERMANENT_ERRORS = {"UnregisteredError", "SenderIdMismatchError", "InvalidArgumentError"}
+
+
+def targets(topics=(), tokens=()):
+    """[("topic", name), ..., ("token", token), ...] without duplicates, order kept."""
+    out = []
+    for t in [("topic", x) for x in topics] + [("token", x) for x in tokens]:
+        if t[1] and t not in out:
+            out.append(t)
+    return out
+
+
+def _label(target):
+    kind, name = target
+    if kind == "token" and len(name) > 12:
+        name = name[:12] + "…"
+    return f"{kind}:{name}"
+
+
+def firebase_message(target, data):
+    from firebase_admin import messaging
+    kind, name = target
+    return messaging.Message(data=data, android=messaging.AndroidConfig(priority="high"),
+                             **{kind: name})
+
+
+def firebase_send_each(items):
+    from firebase_admin import messaging
+    resp = messaging.send_each([firebase_message(t, d) for t, d in items])
+    return [(r.success, r.exception) for r in resp.responses]
+
+
+def firebase_send_one(target, data):
+    """Single messaging.send; the serial path, kept for comparison."""
+    from firebase_admin import messaging
+    return messaging.send(firebase_message(target, data))
+
+
+class TargetResult:
+    def __init__(self, target):
+        self.target = target
+        self.ok = False
+        self.attempts = 0
+        self.error = None
+        self.permanent = False
+
+    def as_dict(self):
+        return {"ok": self.ok, "attempts": self.attempts,
+                "error": None if self.error is None else str(self.error)}
+
+
+class FcmResult:
+    def __init__(self, results, latency_ms, calls):
+        self.results = results          # one TargetResult per item, in input order
+        self.latency_ms = latency_ms
+        self.calls = calls              # send_each round trips used
+
+    @property
+    def delivered(self):
+        return sum(1 for r in self.results if r.ok)
+
+    @property
+    def ok(self):
+        """Something was delivered, and every target that failed is a dead token."""
+        return self.delivered > 0 and all(r.ok or (r.permanent and r.target[0] == "token")
+                                          for r in self.results)
+
+    def failed(self):
+        return [r.target for r in self.results if not r.ok]
+
+    def pending(self):
+        """Failed targets a later retry could still reach (no permanent errors)."""
+        return [r.target for r in self.results if not r.ok and not r.permanent]
+
+    def summary(self):
+        parts = [f"{self.delivered}/{len(self.results)} delivered in {self.latency_ms:.0f}ms "
+                 f"({self.calls} call(s))"]
+        for r in self.results:
+            if not r.ok:
+                parts.append(f"{_label(r.target)}={'dead' if r.permanent else 'failed'}: {r.error}")
+        return " ".join(parts)
+
+
+class FcmDelivery:
+    def __init__(self, send_each=firebase_send_each, retries=2, backoff=0.3, limit=FCM_BATCH_LIMIT):
+        self.send_each = send_each
+        self.retries = retries
+        self.backoff = backoff
+        self.limit = limit
+        self.calls = 0
+        self.messages = 0
+        self.failures = 0
+
+    def send(self, data, to, deadline=None):
+        """One data payload to every target in `to` (see targets())."""
+        return self.send_messages([(t, data) for t in to], deadline)
+
+    def send_messages(self, items, deadline=None):
+        """
+        items: [(target, data)]. Sends in bulk, then retries the failed
+        retryable targets up to `retries` times; stops retrying once
+        `deadline` seconds have passed.
+        """
+        t0 = time.monotonic()
+        results = [TargetResult(t) for t, _ in items]
+        todo = list(range(len(items)))
+        calls = 0
+        for attempt in range(self.retries + 1):
+            if attempt:
+                delay = self.backoff * (2 ** (attempt - 1))
+                if deadline is not None and time.monotonic() - t0 + delay >= deadline:
+                    break
+                time.sleep(delay)
+            for i in range(0, len(todo), self.limit):
+                chunk = todo[i:i + self.limit]
+                try:
+                    outcome = self.send_each([items[k] for k in chunk])
+                except Exception as e:            # the whole call failed: every target retries
+                    outcome = [(False, e)] * len(chunk)
+                calls += 1
+                for k, (ok, err) in zip(chunk, outcome):
+                    r = results[k]
+                    r.attempts += 1
+                    r.ok, r.error = bool(ok), None if ok else err
+                    r.permanent = not ok and type(err).__name__ in PERMANENT_ERRORS
+            todo = [k for k in todo if not results[k].ok and not results[k].permanent]
+            if not todo:
+                break
+        self.calls += calls
+        self.messages += sum(r.attempts for r in results)
+        self.failures += sum(1 for r in results if not r.ok)
+        return FcmResult(results, (time.monotonic() - t0) * 1000.0, calls)
+
+    def stats(self):
+        return {"calls": self.calls, "messages": self.messages, "failures": self.failures}
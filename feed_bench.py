@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+feed_bench.py
+
+End-to-end keyword latency across device block / recognizer feed settings,
+on the replay path (replay.py): same clips, same recognizer, one row per
+setting.
+
+  detect p50/p90  keyword end -> alert, audio time + chunk processing time
+  rtf             wall time / audio time of the whole run
+  cpu             process CPU time / audio time
+  block p99       worst-case work per device block (callback + feed)
+
+Clips need labels with a keyword end time (clip.json {"keyword", "time"}),
+see replay.py.
+
+Usage:
+    python feed_bench.py clips/ [--mode keyword|free] [--no-vad]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+
+import replay
+import street_guardian as sg
+
+# (label, device block, feed, adaptive)
+SETTINGS = [
+    ("old: 500 ms blocks, fed as captured", 8000, 8000, False),
+    ("100 ms blocks, 100 ms feed", 1600, 1600, False),
+    ("100 ms blocks, 200 ms feed", 1600, 3200, False),
+    ("100 ms blocks, 500 ms feed", 1600, 8000, False),
+    ("100 ms blocks, adaptive feed", 1600, sg.FEED_SIZE, True),
+]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Keyword latency across block / feed sizes (replay path).")
+    ap.add_argument("paths", nargs="+")
+    ap.add_argument("--mode", choices=("keyword", "free"), default=sg.RECOGNIZER_MODE)
+    ap.add_argument("--no-vad", action="store_true")
+    args = ap.parse_args()
+
+    clips = replay.discover(args.paths)
+    if not any(kw_time is not None for _, _, kw_time in clips):
+        print("❌ No clips with a keyword end time (clip.json {\"keyword\": ..., \"time\": ...})")
+        sys.exit(1)
+    harness = replay.ReplayHarness(use_vad=not args.no_vad, mode=args.mode, early=False)
+
+    print(f"{len(clips)} clip(s), mode={args.mode}, vad={'off' if args.no_vad else 'on'}\n")
+    print(f"{'setting':<38} {'detect p50':>10} {'p90':>7} {'rtf':>7} {'cpu':>7} {'block p99':>10} "
+          f"{'recall':>7} {'fp':>3}")
+    for label, block, feed, adaptive in SETTINGS:
+        harness.blocksize = block
+        harness.configure_feed(feed, adaptive)
+        c0 = time.process_time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            r = replay.evaluate(harness, clips)
+        cpu = (time.process_time() - c0) / r["audio_s"] if r["audio_s"] else 0.0
+        d = r["detect_delay_ms"]
+        fmt = lambda v, spec=".0f": "n/a" if v is None else format(v, spec)
+        print(f"{label:<38} {fmt(d['p50']):>10} {fmt(d['p90']):>7} {fmt(r['rtf'], '.3f'):>7} "
+              f"{cpu:>7.3f} {fmt(r['block_ms']['p99'], '.1f'):>10} {fmt(r['recall'], '.2f'):>7} {r['fp']:>3}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+frame_select.py
+
+Pick the best frame of a camera burst.
+
+Each frame is scored on a half-resolution grayscale copy with two cheap
+NumPy metrics:
+- sharpness: variance of the 4-neighbour Laplacian (motion blur and bad
+  focus flatten edges and drive it towards zero)
+- exposure: spread of the 2nd..98th percentile of the luma histogram, damped
+  when the mean is far from mid-grey (dark or blown-out frames)
+
+Scoring stops once the time budget is spent; frames closest to the trigger
+are scored first, so a slow CPU still picks among the most relevant ones.
+"""
+
+import time
+
+import numpy as np
+
+
+def _gray(frame):
+    """Half-resolution luma of a BGR (or already gray) uint8 frame, as float32."""
+    small = frame[::2, ::2]
+    if small.ndim == 2:
+        return small.astype(np.float32)
+    b, g, r = small[..., 0], small[..., 1], small[..., 2]
+    return (0.114 * b + 0.587 * g + 0.299 * r).astype(np.float32)
+
+
+def sharpness(gray):
+    lap = (gray[1:-1, :-2] + gray[1:-1, 2:] + gray[:-2, 1:-1] + gray[2:, 1:-1]
+           - 4.0 * gray[1:-1, 1:-1])
+    return float(lap.var())
+
+
+def exposure(gray):
+    hist = np.bincount(gray.astype(np.uint8).ravel(), minlength=256)
+    cdf = np.cumsum(hist) / float(gray.size)
+    lo, hi = np.searchsorted(cdf, (0.02, 0.98))
+    spread = (hi - lo) / 255.0
+    mean = float(np.dot(hist, np.arange(256))) / gray.size
+    balance = 1.0 - abs(mean - 127.5) / 127.5
+    return float(spread * (0.5 + 0.5 * balance))
+
+
+def score_frame(frame):
+    g = _gray(frame)
+    s, e = sharpness(g), exposure(g)
+    return {"sharpness": round(s, 1), "exposure": round(e, 3), "score": float(np.log1p(s) * e)}
+
+
+def pick_best(frames, trigger_ts=None, budget_ms=80.0):
+    """
+    frames: [(frame, ts)], oldest first. Returns (best_index, {index: metrics}).
+    At least one frame is always scored; the rest only while time is left.
+    """
+    if not frames:
+        return None, {}
+    if trigger_ts is None:
+        order = list(range(len(frames) - 1, -1, -1))
+    else:
+        order = sorted(range(len(frames)), key=lambda i: abs(frames[i][1] - trigger_ts))
+    limit = time.perf_counter() + budget_ms / 1000.0
+    scores = {}
+    for i in order:
+        if scores and time.perf_counter() >= limit:
+            break
+        scores[i] = score_frame(frames[i][0])
+    best = max(scores, key=lambda i: scores[i]["score"])
+    return best, scores
+
+
+def contact_sheet(frames, thumb_width=160, cols=3):
+    """Tile frames into one image (thumbnails, row-major, black padding)."""
+    import cv2
+    thumbs = []
+    for f in frames:
+        h, w = f.shape[:2]
+        th = max(1, int(h * thumb_width / float(w)))
+        thumbs.append(cv2.resize(f, (thumb_width, th), interpolation=cv2.INTER_AREA))
+    th = max(t.shape[0] for t in thumbs)
+    cols = min(cols, len(thumbs))
+    rows = (len(thumbs) + cols - 1) // cols
+    sheet = np.zeros((rows * th, cols * thumb_width) + thumbs[0].shape[2:], dtype=np.uint8)
+    for k, t in enumerate(thumbs):
+        r, c = divmod(k, cols)
+        sheet[r * th:r * th + t.shape[0], c * thumb_width:(c + 1) * thumb_width] = t
+    return sheet
@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+"""
+hub.py
+
+Central StreetGuardian hub for many edge units.
+
+Edge units (street_guardian.py with HUB_URL set) post a compact JSON alert
+event, then the JPEG evidence, over a keep-alive HTTP connection. The hub
+holds the Telegram / Firebase credentials and:
+- deduplicates across devices: alerts from one site within
+  HUB_INCIDENT_WINDOW seconds of each other are one incident
+  (IncidentManager per site), so five units hearing the same scream produce
+  one alert. A site is the reported location name, or, for units that send
+  their coordinates, every unit within HUB_SITE_RADIUS_M of the first one;
+  two emergencies in different streets of one zone stay two incidents. The
+  alert lists every location that reported it
+- batches FCM: messages collect for HUB_FCM_BATCH_INTERVAL seconds and go
+  out in one send_each call, one message per zone topic and incident
+- fans out to Telegram: one photo per incident (waits briefly for the
+  evidence), later devices / hits become throttled caption edits
+- uploads the first evidence photo (imgbb) and sends a follow-up FCM message
+  carrying its URL
+- never drops an alert: the edge gets its 200 as soon as the event is
+  accepted, so a Telegram alert or FCM message that fails is stored in a
+  durable outbox (outbox.py, SQLite, photo written to HUB_EVIDENCE_DIR first)
+  and retried with backoff until it is delivered
+
+Pure asyncio streams (one task per connection, no thread per client), so a
+single process holds thousands of idle device connections. Blocking
+senders (requests, firebase_admin) run on a small thread pool.
+
+Endpoints:
+    POST /alert               {"device","zone","keyword","location","time"[,"lat","lon"]}
+                              -> {"event","incident","new"}
+    POST /evidence/<event>    JPEG body
+    GET  /stats, GET /health
+
+Usage:
+    python hub.py [--host 0.0.0.0] [--port 8765]
+See hub_loadtest.py for a load test against local stubs.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from evidence_archive import evidence_name, write_atomic
+from fcm_delivery import FcmDelivery
+from incidents import IncidentManager
+from outbox import Outbox, read_evidence
+from senders import ImgbbUploader, SenderPool, TelegramSender, fcm_payload
+
+# ---------------- CONFIG ----------------
+HUB_HOST = "0.0.0.0"
+HUB_PORT = 8765
+HUB_TOKEN = ""                    # shared secret expected in X-SG-Token ("" = no check)
+HUB_MAX_BODY = 2 * 1024 * 1024
+
+TELEGRAM_BOT_TOKEN = "add_bot_token"
+TELEGRAM_API = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
+TELEGRAM_DEFAULT_CHAT = "add_chat_id"
+ZONE_CHATS = {}                   # zone -> Telegram chat id (default: TELEGRAM_DEFAULT_CHAT)
+ZONE_TOPICS = {}                  # zone -> FCM topic (default: the zone name itself)
+SERVICE_ACCOUNT_PATH = "serviceAccountKey.json"
+IMGBB_API_KEY = ""                # "" = FCM messages go out without an image URL
+IMGBB_UPLOAD_URL = "https://api.imgbb.com/1/upload"
+
+HUB_OUTBOX_PATH = "hub_outbox.db"
+HUB_EVIDENCE_DIR = "hub_evidence"  # photos of alerts waiting in the outbox
+
+HUB_INCIDENT_WINDOW = 20.0        # seconds between hits of one cross-device incident
+HUB_SITE_RADIUS_M = 150.0         # units this close (lat/lon) report the same place
+HUB_INCIDENT_MAX_SECONDS = 600.0
+HUB_FCM_BATCH_INTERVAL = 0.2
+HUB_EVIDENCE_WAIT = 1.5           # how long the first Telegram message waits for a photo
+HUB_UPDATE_INTERVAL = 5.0         # at most one Telegram edit per incident this often
+HUB_SENDER_THREADS = 16
+# ----------------------------------------
+
+REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+           413: "Payload Too Large"}
+
+
+fcm = FcmDelivery(retries=2)
+
+
+def firebase_send_batch(items):
+    """items: [(topic, data)] -> [bool]; send_each in chunks of 500, failed topics retried."""
+    result = fcm.send_messages([(("topic", topic), data) for topic, data in items])
+    return [r.ok for r in result.results]
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((p2 - p1) / 2.0) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2.0) ** 2)
+    return 2.0 * 6371000.0 * math.asin(math.sqrt(min(1.0, a)))
+
+
+class _Site:
+    """One place in a zone: a location name, or a position with a radius around it."""
+
+    def __init__(self, name, lat, lon, mgr):
+        self.name = name
+        self.lat = lat
+        self.lon = lon
+        self.mgr = mgr
+
+
+class _Pending:
+    """Hub-side state of one incident."""
+
+    def __init__(self, incident, zone):
+        self.incident = incident
+        self.zone = zone
+        self.devices = set()
+        self.locations = OrderedDict()      # location -> devices that reported from it
+        self.image_url = ""
+        self.alerted = asyncio.Event()      # first Telegram send done (delivered or queued)
+        self.evidence = None
+        self.evidence_ready = asyncio.Event()
+        self.update_task = None
+        self.created = time.monotonic()
+
+
+class Hub:
+    def __init__(self, telegram_for_zone, fcm_send_batch=firebase_send_batch, token=HUB_TOKEN,
+                 window=HUB_INCIDENT_WINDOW, max_duration=HUB_INCIDENT_MAX_SECONDS, radius=HUB_SITE_RADIUS_M,
+                 fcm_interval=HUB_FCM_BATCH_INTERVAL, evidence_wait=HUB_EVIDENCE_WAIT,
+                 update_interval=HUB_UPDATE_INTERVAL, threads=HUB_SENDER_THREADS, outbox=None,
+                 evidence_dir=HUB_EVIDENCE_DIR, upload=None):
+        """outbox: Outbox for sends that failed (None: count and drop); upload(jpeg) -> image URL or ""."""
+        self.telegram_for_zone = telegram_for_zone
+        self.fcm_send_batch = fcm_send_batch
+        self.outbox = outbox
+        self.evidence_dir = evidence_dir
+        self.upload = upload
+        self.token = token
+        self.window = window
+        self.max_duration = max_duration
+        self.radius = radius
+        self.fcm_interval = fcm_interval
+        self.evidence_wait = evidence_wait
+        self.update_interval = update_interval
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="hub-send")
+        self._zones = {}                    # zone -> [_Site]
+        self._incidents = OrderedDict()     # incident id -> _Pending
+        self._events = OrderedDict()        # event id -> _Pending
+        self._fcm_pending = OrderedDict()   # (topic, incident id) -> data
+        self._tasks = set()
+        self._conns = {}                    # handler task -> writer
+        self._server = None
+        self._fcm_task = None
+        self._loop = None
+        self.stats_ = {"connections": 0, "peak_connections": 0, "requests": 0, "events": 0,
+                       "incidents": 0, "deduplicated": 0, "evidence": 0, "fcm_batches": 0,
+                       "fcm_messages": 0, "fcm_failed": 0, "fcm_queued": 0, "telegram_sent": 0,
+                       "telegram_edits": 0, "telegram_failed": 0, "telegram_queued": 0,
+                       "telegram_late": 0, "uploads": 0}
+
+    # ---------- lifecycle ----------
+
+    async def start(self, host=HUB_HOST, port=HUB_PORT):
+        self._loop = asyncio.get_running_loop()
+        if self.outbox is not None:
+            os.makedirs(self.evidence_dir, exist_ok=True)
+            self.outbox.register("telegram", self._outbox_telegram)
+            self.outbox.register("fcm", self._outbox_fcm)
+            self.outbox.start()
+        self._server = await asyncio.start_server(self._handle, host, port, backlog=4096)
+        self._fcm_task = asyncio.create_task(self._fcm_loop())
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"🛰 Hub listening on {host}:{self.port}")
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in self._conns.values():
+                writer.close()
+            if self._conns:
+                await asyncio.wait(list(self._conns), timeout=2.0)
+            await self._server.wait_closed()
+        if self._fcm_task is not None:
+            self._fcm_task.cancel()
+        await self._flush_fcm()
+        for t in list(self._tasks):
+            t.cancel()
+        if self.outbox is not None:
+            await self._blocking(self.outbox.stop)
+        self._pool.shutdown(wait=False)
+
+    def _spawn(self, coro):
+        t = asyncio.create_task(coro)
+        self._tasks.add(t)
+        t.add_done_callback(self._tasks.discard)
+        return t
+
+    async def _blocking(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+
+    # ---------- HTTP ----------
+
+    async def _handle(self, reader, writer):
+        s = self.stats_
+        s["connections"] += 1
+        s["peak_connections"] = max(s["peak_connections"], s["connections"])
+        task = asyncio.current_task()
+        self._conns[task] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                length = int(headers.get("content-length", 0))
+                if length > HUB_MAX_BODY:
+                    await self._reply(writer, 413, {"error": "body too large"})
+                    break
+                body = await reader.readexactly(length) if length else b""
+                s["requests"] += 1
+                if self.token and headers.get("x-sg-token") != self.token:
+                    status, payload = 401, {"error": "bad token"}
+                else:
+                    status, payload = await self._route(method, path, body)
+                await self._reply(writer, status, payload)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            s["connections"] -= 1
+            self._conns.pop(task, None)
+            writer.close()
+
+    async def _reply(self, writer, status, payload):
+        data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        writer.write(f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data)
+        await writer.drain()
+
+    async def _route(self, method, path, body):
+        if method == "POST" and path == "/alert":
+            try:
+                event = json.loads(body)
+                return 200, self.on_alert(event)
+            except (ValueError, KeyError, TypeError) as e:
+                return 400, {"error": f"bad event: {e}"}
+        if method == "POST" and path.startswith("/evidence/"):
+            ok = self.on_evidence(path[len("/evidence/"):], body)
+            return (200, {"ok": True}) if ok else (404, {"error": "unknown event"})
+        if method == "GET" and path == "/stats":
+            return 200, self.stats()
+        if method == "GET" and path == "/health":
+            return 200, {"ok": True}
+        return 404, {"error": "not found"}
+
+    # ---------- incidents ----------
+
+    def _site(self, zone, location, lat, lon):
+        """The site an event belongs to: nearest positioned site in range, else same name."""
+        sites = self._zones.setdefault(zone, [])
+        # a site whose incident has closed has nothing left to merge into
+        sites[:] = [s for s in sites if s.mgr.is_open()]
+        if lat is not None and lon is not None:
+            near = [(distance_m(lat, lon, s.lat, s.lon), s) for s in sites if s.lat is not None]
+            near = [(d, s) for d, s in near if d <= self.radius]
+            if near:
+                return min(near, key=lambda x: x[0])[1]
+        else:
+            for s in sites:
+                if s.lat is None and s.name == location:
+                    return s
+        site = _Site(location, lat, lon, IncidentManager(self.window, self.max_duration))
+        sites.append(site)
+        return site
+
+    def on_alert(self, event):
+        zone = str(event["zone"])
+        keyword = str(event["keyword"])
+        location = str(event.get("location") or zone)
+        lat, lon = event.get("lat"), event.get("lon")
+        lat, lon = (float(lat), float(lon)) if lat is not None and lon is not None else (None, None)
+        incident, new = self._site(zone, location, lat, lon).mgr.hit(keyword)
+        self.stats_["events"] += 1
+        if new:
+            incident.info = {"keyword": keyword, "time": str(event.get("time", "")), "zone": zone}
+            pending = _Pending(incident, zone)
+            self._incidents[incident.id] = pending
+            self._trim(self._incidents, 5000)
+            self.stats_["incidents"] += 1
+        else:
+            pending = self._incidents.get(incident.id)
+            if pending is None:          # trimmed away; treat as a fresh incident record
+                pending = self._incidents[incident.id] = _Pending(incident, zone)
+            self.stats_["deduplicated"] += 1
+        device = str(event.get("device", "?"))
+        pending.devices.add(device)
+        pending.locations.setdefault(location, set()).add(device)
+
+        event_id = uuid.uuid4().hex[:12]
+        self._events[event_id] = pending
+        self._trim(self._events, 20000)
+
+        self._queue_fcm(pending, update=not new)
+        if new:
+            self._spawn(self._telegram_new(pending))
+        elif pending.update_task is None:
+            pending.update_task = self._spawn(self._telegram_update(pending))
+        return {"event": event_id, "incident": incident.id, "new": new}
+
+    def on_evidence(self, event_id, jpeg):
+        pending = self._events.get(event_id)
+        if pending is None:
+            return False
+        self.stats_["evidence"] += 1
+        if pending.evidence is None and jpeg:
+            pending.evidence = jpeg
+            pending.evidence_ready.set()
+            if self.upload is not None:
+                self._spawn(self._upload(pending))
+        return True
+
+    async def _upload(self, pending):
+        url = await self._blocking(self.upload, pending.evidence)
+        if url:
+            self.stats_["uploads"] += 1
+            pending.image_url = url
+            self._queue_fcm(pending, update=True)
+
+    @staticmethod
+    def _trim(d, limit):
+        while len(d) > limit:
+            d.popitem(last=False)
+
+    @staticmethod
+    def _locations(pending):
+        """Every reporting location, with its device count when more than one."""
+        return "; ".join(loc if len(devs) == 1 else f"{loc} ({len(devs)} devices)"
+                         for loc, devs in pending.locations.items())
+
+    def _caption(self, pending):
+        inc = pending.incident
+        i = inc.info
+        text = TelegramSender.caption(i["keyword"], self._locations(pending), i["time"]) + f"\nIncident: {inc.id}"
+        if inc.hits > 1 or len(pending.devices) > 1:
+            text += f"\nUpdate: {inc.describe()} from {len(pending.devices)} device(s)"
+        return text
+
+    # ---------- Telegram fan-out ----------
+
+    async def _telegram_new(self, pending):
+        try:
+            await asyncio.wait_for(pending.evidence_ready.wait(), self.evidence_wait)
+        except asyncio.TimeoutError:
+            pass
+        tg = self.telegram_for_zone(pending.zone)
+        caption = self._caption(pending)
+        if pending.evidence is not None:
+            mid = await self._blocking(tg.send_photo, pending.evidence, caption, 15, False)
+            kind = "photo"
+        else:
+            mid = await self._blocking(tg.send_text, caption)
+            kind = "text"
+        inc = pending.incident
+        if mid:
+            inc.telegram = (mid, kind)
+            self.stats_["telegram_sent"] += 1
+        else:
+            self.stats_["telegram_failed"] += 1
+            await self._queue_telegram(pending, caption)
+        inc.last_update = time.monotonic()
+        with inc.lock:
+            inc.sent_version = inc.version if mid else 0
+        pending.alerted.set()
+
+    async def _queue_telegram(self, pending, caption):
+        """Hand a failed first alert to the outbox, photo on disk first so the row never dangles."""
+        if self.outbox is None:
+            return
+        inc = pending.incident
+        path = None
+        if pending.evidence is not None:
+            path = os.path.join(self.evidence_dir, evidence_name(inc.info["keyword"], inc.id))
+            try:
+                await self._blocking(write_atomic, path, pending.evidence)
+            except OSError as e:
+                print("❌ Could not store evidence for the outbox:", e)
+                path = None
+        self.outbox.enqueue("telegram", {"zone": pending.zone, "incident": inc.id, "caption": caption}, path)
+        self.stats_["telegram_queued"] += 1
+
+    def _outbox_telegram(self, items):
+        """Outbox thread: retry first alerts; a delivered one becomes editable again."""
+        results = []
+        for item in items:
+            p = item["payload"]
+            tg = self.telegram_for_zone(p["zone"])
+            jpeg = read_evidence(item["evidence"])
+            if jpeg is not None:
+                mid, kind = tg.send_photo(jpeg, p["caption"], 15, False), "photo"
+            else:
+                mid, kind = tg.send_text(p["caption"]), "text"
+            if mid:
+                if item["evidence"] and os.path.exists(item["evidence"]):
+                    os.remove(item["evidence"])
+                self._loop.call_soon_threadsafe(self._telegram_late, p["incident"], mid, kind)
+            results.append(bool(mid))
+        return results
+
+    def _telegram_late(self, incident_id, mid, kind):
+        self.stats_["telegram_late"] += 1
+        pending = self._incidents.get(incident_id)
+        if pending is None:
+            return
+        pending.incident.telegram = (mid, kind)
+        pending.incident.last_update = time.monotonic()
+        if pending.update_task is None:
+            pending.update_task = self._spawn(self._telegram_update(pending))
+
+    async def _telegram_update(self, pending):
+        inc = pending.incident
+        try:
+            await pending.alerted.wait()
+            wait = inc.last_update + self.update_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            with inc.lock:
+                if inc.version <= inc.sent_version or inc.telegram is None:
+                    return
+                inc.sent_version = inc.version
+            mid, kind = inc.telegram
+            ok = await self._blocking(self.telegram_for_zone(pending.zone).edit, mid,
+                                      self._caption(pending), kind)
+            self.stats_["telegram_edits" if ok else "telegram_failed"] += 1
+            inc.last_update = time.monotonic()
+        finally:
+            pending.update_task = None
+
+    # ---------- FCM batching ----------
+
+    def _queue_fcm(self, pending, update):
+        inc = pending.incident
+        i = inc.info
+        extra = {"incident": inc.id, "devices": len(pending.devices), "hits": inc.hits}
+        if update:
+            extra["type"] = "street_guardian_update"
+        topic = ZONE_TOPICS.get(pending.zone, pending.zone)
+        # later events of the same incident in the same batch replace earlier ones
+        self._fcm_pending[(topic, inc.id)] = fcm_payload(i["keyword"], pending.image_url, self._locations(pending),
+                                                         i["time"], extra)
+
+    async def _fcm_loop(self):
+        while True:
+            await asyncio.sleep(self.fcm_interval)
+            await self._flush_fcm()
+
+    async def _flush_fcm(self):
+        if not self._fcm_pending:
+            return
+        batch = [(topic, data) for (topic, _), data in self._fcm_pending.items()]
+        self._fcm_pending = OrderedDict()
+        try:
+            results = await self._blocking(self.fcm_send_batch, batch)
+        except Exception as e:
+            print("❌ FCM batch failed:", e)
+            results = [False] * len(batch)
+        self.stats_["fcm_batches"] += 1
+        self.stats_["fcm_messages"] += len(batch)
+        failed = [item for item, ok in zip(batch, results) if not ok]
+        self.stats_["fcm_failed"] += len(failed)
+        if self.outbox is not None:
+            for topic, data in failed:
+                self.outbox.enqueue("fcm", {"topic": topic, "data": data})
+            self.stats_["fcm_queued"] += len(failed)
+
+    def _outbox_fcm(self, items):
+        batch = []
+        for item in items:
+            data = item["payload"]["data"]
+            # a retry can land after a newer message of the incident; it must not drop the photo
+            pending = self._incidents.get(data.get("incident"))
+            if pending is not None and pending.image_url and not data.get("image"):
+                data["image"] = pending.image_url
+            batch.append((item["payload"]["topic"], data))
+        return self.fcm_send_batch(batch)
+
+    def stats(self):
+        s = dict(self.stats_)
+        s["zones"] = len(self._zones)
+        s["sites"] = sum(len(sites) for sites in self._zones.values())
+        if self.outbox is not None:
+            s["outbox"] = self.outbox.stats()
+        return s
+
+
+def main():
+    ap = argparse.ArgumentParser(description="StreetGuardian hub for many edge units.")
+    ap.add_argument("--host", default=HUB_HOST)
+    ap.add_argument("--port", type=int, default=HUB_PORT)
+    args = ap.parse_args()
+
+    import firebase_admin
+    from firebase_admin import credentials
+    firebase_admin.initialize_app(credentials.Certificate(SERVICE_ACCOUNT_PATH))
+
+    pool = SenderPool()
+    senders = {}
+
+    def telegram_for_zone(zone):
+        chat = ZONE_CHATS.get(zone, TELEGRAM_DEFAULT_CHAT)
+        if chat not in senders:
+            senders[chat] = TelegramSender(TELEGRAM_API, chat, pool)
+        return senders[chat]
+
+    upload = ImgbbUploader(IMGBB_UPLOAD_URL, IMGBB_API_KEY, pool).upload if IMGBB_API_KEY else None
+
+    async def run():
+        hub = await Hub(telegram_for_zone, outbox=Outbox(HUB_OUTBOX_PATH), upload=upload).start(args.host, args.port)
+        try:
+            while True:
+                await asyncio.sleep(30)
+                print("📊 hub", hub.stats())
+        finally:
+            await hub.stop()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("\nHub stopped")
+    finally:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
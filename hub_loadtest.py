@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+hub_loadtest.py
+
+Load test for hub.py: N simulated edge units on persistent keep-alive
+connections against an in-process hub. Telegram is the local stub from
+sender_stub_test.py (real TelegramSender / SenderPool on top), FCM is an
+emulated send_each endpoint with a fixed per-call and per-message cost.
+
+Every zone has --sites places (streets) with their own units. Half of the
+sites are named only (all units report the same location), the other half
+are positioned (every unit reports its own door number and its lat/lon,
+within a few tens of metres). A "scene" is one emergency at one site, heard
+by several of its units within a second; scenes in the same zone overlap in
+time, with the hub's default incident window. The hub should turn each
+scene into exactly one incident, listing every reporting location, with one
+Telegram photo and one FCM message per batch, however many devices report it.
+The evidence is uploaded to a stub imgbb; every incident's last FCM message
+must carry the image URL.
+
+--fail-telegram / --fail-fcm make the first alerts / send_each calls fail;
+the hub's outbox (in a temporary directory, short backoff) must deliver
+every one of them before the test ends.
+
+Usage:
+    python hub_loadtest.py [--devices 2000] [--zones 50] [--sites 4] [--scenes 200] [--per-scene 5]
+                           [--fail-telegram 20] [--fail-fcm 2]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import resource
+import tempfile
+import threading
+import time
+
+import hub as hub_mod
+from hub import Hub
+from outbox import Outbox
+from sender_stub_test import start_stub
+from senders import ImgbbUploader, SenderPool, TelegramSender
+
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 4096 + b"\xff\xd9"
+
+
+class EmulatedFcm:
+    """send_each stand-in: one round trip per call plus a small cost per message."""
+
+    def __init__(self, call_ms=40.0, per_message_ms=0.2, fail_calls=0):
+        self.call_ms = call_ms
+        self.per_message_ms = per_message_ms
+        self.fail_calls = fail_calls
+        self.calls = 0
+        self.messages = 0
+        self.last = {}              # incident -> data of its last delivered message
+
+    def __call__(self, items):
+        time.sleep((self.call_ms + self.per_message_ms * len(items)) / 1000.0)
+        self.calls += 1
+        if self.fail_calls > 0:
+            self.fail_calls -= 1
+            return [False] * len(items)
+        self.messages += len(items)
+        for _, data in items:
+            self.last[data["incident"]] = data
+        return [True] * len(items)
+
+
+class FlakyTelegram:
+    """
+    TelegramSender whose first `fail` alerts (photo / text) are lost. Records
+    which incidents lost a photo alert and which got one through, so the
+    test can check that the outbox re-sends the photo, not just the text.
+    """
+
+    def __init__(self, tg, fail):
+        self.tg = tg
+        self.fail = fail
+        self.lock = threading.Lock()
+        self.lost_photos = set()        # incident ids
+        self.sent_photos = set()
+
+    def __getattr__(self, name):
+        return getattr(self.tg, name)
+
+    def _send(self, fn, *args):
+        with self.lock:
+            lost = self.fail > 0
+            self.fail -= lost
+        return False if lost else fn(*args)
+
+    def send_photo(self, jpeg, caption, *args):
+        incident = re.search(r"Incident: (\w+)", caption).group(1)
+        mid = self._send(self.tg.send_photo, jpeg, caption, *args)
+        with self.lock:
+            (self.sent_photos if mid else self.lost_photos).add(incident)
+        return mid
+
+    def send_text(self, *args):
+        return self._send(self.tg.send_text, *args)
+
+
+class Device:
+    def __init__(self, name, zone, site, location, latlon, port):
+        self.name = name
+        self.zone = zone
+        self.site = site
+        self.location = location
+        self.latlon = latlon
+        self.port = port
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+
+    async def request(self, method, path, body=b"", ctype="application/json"):
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: hub\r\nContent-Type: {ctype}\r\n"
+                          f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            h = await self.reader.readline()
+            if h in (b"\r\n", b""):
+                break
+            k, _, v = h.decode("latin-1").partition(":")
+            if k.lower() == "content-length":
+                length = int(v)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    async def alert(self, keyword):
+        event = {"device": self.name, "zone": self.zone, "keyword": keyword,
+                 "location": self.location, "time": time.strftime("%Y-%m-%d %H:%M:%S")}
+        if self.latlon is not None:
+            event["lat"], event["lon"] = self.latlon
+        t0 = time.perf_counter()
+        status, j = await self.request("POST", "/alert", json.dumps(event).encode())
+        took = (time.perf_counter() - t0) * 1000.0
+        if status == 200:
+            await self.request("POST", f"/evidence/{j['event']}", JPEG, "image/jpeg")
+        return took, j
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+async def run(args):
+    tg_srv = start_stub()
+    pool = SenderPool(pool_size=hub_mod.HUB_SENDER_THREADS)
+    tg = FlakyTelegram(TelegramSender(f"http://127.0.0.1:{tg_srv.server_port}/botTEST", "42", pool),
+                       args.fail_telegram)
+    imgbb = ImgbbUploader(f"http://127.0.0.1:{tg_srv.server_port}/upload", "KEY", pool)
+    fcm = EmulatedFcm(fail_calls=args.fail_fcm)
+    tmp = tempfile.TemporaryDirectory()
+    outbox = Outbox(os.path.join(tmp.name, "outbox.db"), batch_size=50, base_backoff=0.2, max_backoff=1.0)
+    hub = await Hub(lambda zone: tg, fcm_send_batch=fcm, evidence_wait=0.5, update_interval=0.5,
+                    outbox=outbox, evidence_dir=os.path.join(tmp.name, "evidence"),
+                    upload=imgbb.upload).start("127.0.0.1", 0)
+
+    rnd = random.Random(1)
+    zones = [f"zone_{z}" for z in range(args.zones)]
+    devices = []
+    for i in range(args.devices):
+        z, k = i % args.zones, (i // args.zones) % args.sites
+        if k % 2:
+            # positioned site: sites 1 km apart, units scattered within ~30 m
+            lat = 12.9 + z * 0.1 + rnd.uniform(-0.0002, 0.0002)
+            lon = 77.5 + k * 0.01 + rnd.uniform(-0.0002, 0.0002)
+            location, latlon = f"Street {z}-{k} #{i}", (lat, lon)
+        else:
+            location, latlon = f"Street {z}-{k}", None
+        devices.append(Device(f"dev{i}", zones[z], (zones[z], k), location, latlon, hub.port))
+    t0 = time.perf_counter()
+    for k in range(0, len(devices), 500):
+        await asyncio.gather(*(d.connect() for d in devices[k:k + 500]))
+    print(f"🔌 {len(devices)} devices connected in {time.perf_counter() - t0:.2f}s "
+          f"(peak {hub.stats()['peak_connections']} hub connections)")
+
+    by_site = {}
+    for d in devices:
+        by_site.setdefault(d.site, []).append(d)
+    sites = sorted(by_site)
+    if args.scenes > len(sites):
+        raise SystemExit(f"--scenes {args.scenes} > {len(sites)} sites: a site has one scene per incident window")
+    latencies = []
+    results = []
+    reported = {}                   # scene -> [(incident, location)]
+
+    async def scene(at, site):
+        await asyncio.sleep(at)
+        reporters = rnd.sample(by_site[site], min(args.per_scene, len(by_site[site])))
+        async def one(d):
+            await asyncio.sleep(rnd.random() * 0.8)
+            took, j = await d.alert(rnd.choice(("HELP", "SAVE ME", "HELP ME")))
+            latencies.append(took)
+            results.append(j)
+            reported.setdefault(site, []).append((j.get("incident"), d.location))
+        await asyncio.gather(*(one(d) for d in reporters))
+
+    # one scene per site, all sites of a zone within the same couple of seconds
+    schedule = [(rnd.random() * args.spread, site) for site in rnd.sample(sites, args.scenes)]
+    t0 = time.perf_counter()
+    await asyncio.gather(*(scene(at, site) for at, site in schedule))
+    sent = time.perf_counter() - t0
+
+    await asyncio.sleep(1.5)       # let Telegram sends / edits / the last FCM batch finish
+    for _ in range(100):            # and the outbox retries
+        if outbox.stats()["depth"] == 0:
+            break
+        await asyncio.sleep(0.1)
+    stats = hub.stats()
+    split = sum(1 for r in reported.values() if len({inc for inc, _ in r}) != 1)
+    merged = len(reported) - len({r[0][0] for r in reported.values()})
+    unlisted = sum(1 for r in reported.values() for inc, loc in r
+                   if inc in hub._incidents and loc not in hub._incidents[inc].locations)
+    for d in devices:
+        d.close()
+    await hub.stop()
+    pool.stop()
+    tg_srv.shutdown()
+    tmp.cleanup()
+
+    incidents = {j.get("incident") for j in results}
+    photo_lost = len(tg.lost_photos - tg.sent_photos)
+    no_image = sum(1 for inc in incidents if not fcm.last.get(inc, {}).get("image"))
+    ob = stats["outbox"]
+    print(f"📨 {len(latencies)} alerts in {sent:.2f}s ({len(latencies) / sent:.0f}/s), "
+          f"ack latency p50 {pct(latencies, 0.5):.1f} ms, p99 {pct(latencies, 0.99):.1f} ms")
+    print(f"🧩 {len(incidents)} incidents for {args.scenes} scenes "
+          f"({stats['deduplicated']} duplicate reports merged; {split} scene(s) split, "
+          f"{merged} merged with another, {unlisted} reporting location(s) missing)")
+    print(f"🔥 FCM: {fcm.messages} messages in {fcm.calls} send_each calls "
+          f"(vs {len(latencies)} single sends), {stats['fcm_queued']} queued for retry, "
+          f"{no_image} incident(s) without an image URL")
+    print(f"📤 Telegram: {stats['telegram_sent']} sent, {stats['telegram_edits']} edits, "
+          f"{stats['telegram_queued']} queued for retry, {stats['telegram_late']} delivered late, "
+          f"{photo_lost} photo alert(s) re-sent without the photo")
+    print(f"📦 Outbox: {ob['delivered']} delivered, {ob['depth']} still waiting")
+    print("📊 hub", stats)
+    ok = (len(incidents) == args.scenes and not split and not merged and not unlisted and not no_image
+          and stats["telegram_late"] == stats["telegram_queued"] == stats["telegram_failed"] and not photo_lost
+          and (stats["telegram_queued"] > 0) == (args.fail_telegram > 0)
+          and ob["depth"] == 0 and ob["delivered"] == stats["telegram_queued"] + stats["fcm_queued"])
+    print("\nHub load test", "PASSED ✔️" if ok else "FAILED ❌")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load-test hub.py with simulated devices.")
+    ap.add_argument("--devices", type=int, default=2000)
+    ap.add_argument("--zones", type=int, default=50)
+    ap.add_argument("--sites", type=int, default=4, help="separate places per zone")
+    ap.add_argument("--scenes", type=int, default=200)
+    ap.add_argument("--per-scene", type=int, default=5)
+    ap.add_argument("--spread", type=float, default=2.0, help="seconds over which all scenes start")
+    ap.add_argument("--fail-telegram", type=int, default=20, help="first N Telegram alerts fail")
+    ap.add_argument("--fail-fcm", type=int, default=2, help="first N send_each calls fail")
+    args = ap.parse_args()
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    need = 2 * args.devices + 256
+    if soft < need:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(need, hard), hard))
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+incidents.py
+
+Debouncing / coalescing of keyword hits into incidents.
+
+"help ... help ... help me" is one emergency, not three. The first hit opens
+an incident and runs the full alert (siren, snapshot, uploads, Telegram,
+FCM). Any further hit within `window` seconds of the previous one joins the
+same incident and only bumps its version; the caller turns that into a
+cheap update (Telegram caption edit, follow-up FCM with the same incident
+id) instead of a new alert. An incident is closed after `window` seconds
+without hits or `max_duration` seconds after it opened.
+
+A provisional incident (opened from a partial recognizer result, see
+early_trigger.py) only counts once it is confirmed; cancel() drops it.
+"""
+
+import threading
+import time
+import uuid
+
+
+class Incident:
+    def __init__(self, keyword, ts, provisional=False):
+        self.id = uuid.uuid4().hex[:8]
+        self.provisional = provisional
+        self.keywords = [keyword]
+        self.hits = 1
+        self.first_ts = ts
+        self.last_ts = ts
+        self.version = 1            # bumped on every hit
+        self.sent_version = 0       # last version the remote side has seen
+        self.last_update = 0.0      # monotonic time of the last update sent
+        self.info = {}              # keyword / location / time of the first alert
+        self.image_url = ""
+        self.telegram = None        # (message_id, "photo" | "text") of the alert message
+        self.alerted = threading.Event()    # set when the first alert has been handled
+        self.lock = threading.Lock()
+
+    def describe(self):
+        return f"{self.hits} hit(s): {', '.join(self.keywords)}"
+
+
+class IncidentManager:
+    def __init__(self, window=30.0, max_duration=600.0):
+        self.window = window
+        self.max_duration = max_duration
+        self._current = None
+        self._lock = threading.Lock()
+        self.incidents = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    def hit(self, keyword, ts=None, provisional=False):
+        """Record a keyword hit; returns (incident, is_new)."""
+        ts = time.monotonic() if ts is None else ts
+        with self._lock:
+            inc = self._current
+            if self._joins(inc, ts):
+                with inc.lock:
+                    inc.hits += 1
+                    inc.last_ts = max(inc.last_ts, ts)
+                    inc.version += 1
+                    if keyword not in inc.keywords:
+                        inc.keywords.append(keyword)
+                self.coalesced += 1
+                return inc, False
+            inc = Incident(keyword, ts, provisional)
+            self._current = inc
+            if not provisional:
+                self.incidents += 1
+            return inc, True
+
+    def _joins(self, inc, ts):
+        return (inc is not None and ts - inc.last_ts <= self.window
+                and ts - inc.first_ts <= self.max_duration)
+
+    def is_open(self, ts=None):
+        """Would a hit at ts join the current incident?"""
+        ts = time.monotonic() if ts is None else ts
+        with self._lock:
+            return self._joins(self._current, ts)
+
+    def confirm(self, incident):
+        """A provisional incident turned out to be real."""
+        with self._lock:
+            if incident.provisional:
+                incident.provisional = False
+                self.incidents += 1
+
+    def cancel(self, incident):
+        """Drop a provisional incident (the keyword was not in the final result)."""
+        with self._lock:
+            if self._current is incident:
+                self._current = None
+            self.cancelled += 1
+
+    def close(self, incident=None):
+        """End the current incident (or only if it is `incident`)."""
+        with self._lock:
+            if incident is None or self._current is incident:
+                self._current = None
+
+    @property
+    def current(self):
+        return self._current
+
+    def stats(self):
+        return {"incidents": self.incidents, "coalesced": self.coalesced, "cancelled": self.cancelled,
+                "open": self._current.id if self._current is not None else None}
@@ -0,0 +1,184 @@
+"""
+keyword_matcher.py
+
+Compiled emergency keyword matcher.
+
+Built once from the keyword lists: every keyword and transcript goes through
+the same normalization, duplicates are merged with all their language tags,
+and an Aho-Corasick automaton finds every keyword in a single pass over the
+transcript. Normalization:
+- Unicode NFKD, lower case, anything that is not a letter, digit or mark
+  becomes a word separator
+- accents on Latin letters are stripped ("thuṇai" -> "thunai"), but vowel
+  signs, virama and nukta in Indic scripts stay part of the word, so
+  "मदद" / "मद" or "కాపాడు" / "కిపిడి" stay different words
+- repeated Latin letters are collapsed so romanized spellings like
+  "saahayam" / "sahayam" or "kaapadu" / "kapadu" are the same key; other
+  scripts are left as written
+
+There is no romanization: native-script spellings (what Vosk's Hindi or
+Telugu models actually emit) are added as aliases of the romanized keyword.
+
+Only whole words / whole phrases match, so "save" does not fire on "saved"
+and "100" does not fire on "1000".
+"""
+
+import unicodedata
+from collections import deque, namedtuple
+
+# keyword: canonical keyword, start/end: offsets in the original text,
+# langs: language tags of every list the keyword came from
+Match = namedtuple("Match", ["keyword", "start", "end", "langs"])
+
+
+_MARKS = ("Mn", "Mc")
+
+
+def _normalize_with_map(text):
+    """
+    Return (normalized, starts, ends): normalized[i] came from
+    text[starts[i]:ends[i]].
+    """
+    out = []
+    starts = []
+    ends = []
+    for i, ch in enumerate(text):
+        for c in unicodedata.normalize("NFKD", ch):
+            if unicodedata.category(c) in _MARKS:
+                # accent on a Latin letter: drop; Indic vowel sign / virama /
+                # nukta: part of the word (a mark after a separator is dropped)
+                if not out or out[-1] == " " or out[-1].isascii():
+                    continue
+                out.append(c)
+                starts.append(i)
+                ends.append(i + 1)
+                continue
+            c = c.lower()
+            if not c.isalnum():
+                c = " "
+            if c == " " and (not out or out[-1] == " "):
+                continue
+            # collapse repeated Latin letters (romanization variants); digits
+            # and other scripts are kept as written
+            if out and c == out[-1] and c.isascii() and c.isalpha():
+                ends[-1] = i + 1
+                continue
+            out.append(c)
+            starts.append(i)
+            ends.append(i + 1)
+    if out and out[-1] == " ":
+        out.pop()
+        starts.pop()
+        ends.pop()
+    return "".join(out), starts, ends
+
+
+def normalize(text):
+    return _normalize_with_map(text)[0]
+
+
+class KeywordMatcher:
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]          # node -> [(pattern_len, entry index)]
+        self._entries = []        # [keyword, set(langs)]
+        self._by_key = {}         # normalized pattern -> entry index
+        self._compiled = False
+
+    @classmethod
+    def build(cls, lists, aliases=None):
+        """
+        lists:   {lang: [keyword, ...]} (or a plain list, tagged "any")
+        aliases: {keyword: [other spelling / spoken form, ...]}
+        """
+        m = cls()
+        if not isinstance(lists, dict):
+            lists = {"any": lists}
+        for lang, words in lists.items():
+            for w in words:
+                m.add(w, lang=lang)
+                for alt in (aliases or {}).get(w, ()):
+                    m.add(alt, keyword=w, lang=lang)
+        return m.compile()
+
+    def add(self, pattern, keyword=None, lang="any"):
+        key = normalize(pattern)
+        if not key:
+            return
+        idx = self._by_key.get(key)
+        if idx is not None:
+            self._entries[idx][1].add(lang)
+            return
+        idx = len(self._entries)
+        self._entries.append([keyword or pattern, {lang}])
+        self._by_key[key] = idx
+        node = 0
+        for c in key:
+            nxt = self._goto[node].get(c)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][c] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(key), idx))
+        self._compiled = False
+
+    def compile(self):
+        q = deque()
+        for c, nxt in self._goto[0].items():
+            self._fail[nxt] = 0
+            q.append(nxt)
+        while q:
+            node = q.popleft()
+            for c, nxt in self._goto[node].items():
+                q.append(nxt)
+                f = self._fail[node]
+                while f and c not in self._goto[f]:
+                    f = self._fail[f]
+                f = self._goto[f].get(c, 0)
+                self._fail[nxt] = f if f != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._compiled = True
+        return self
+
+    def __len__(self):
+        return len(self._entries)
+
+    def keywords(self):
+        """Canonical keywords, deduplicated, in insertion order."""
+        return list(dict.fromkeys(kw for kw, _ in self._entries))
+
+    def find_all(self, text):
+        """All whole-word matches, ordered by position (longest first at the same start)."""
+        if not self._compiled:
+            self.compile()
+        norm, starts, ends = _normalize_with_map(text)
+        n = len(norm)
+        goto, fail, out = self._goto, self._fail, self._out
+        found = []
+        node = 0
+        for i, c in enumerate(norm):
+            while node and c not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(c, 0)
+            if not out[node]:
+                continue
+            # whole word: the match must end at a separator or the end of the text...
+            if i + 1 < n and norm[i + 1] != " ":
+                continue
+            for plen, idx in out[node]:
+                s = i - plen + 1
+                # ...and start at one
+                if s > 0 and norm[s - 1] != " ":
+                    continue
+                kw, langs = self._entries[idx]
+                found.append(Match(kw, starts[s], ends[i], tuple(sorted(langs))))
+        found.sort(key=lambda m: (m.start, -(m.end - m.start)))
+        return found
+
+    def first(self, text):
+        matches = self.find_all(text)
+        return matches[0] if matches else None
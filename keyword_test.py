@@ -36,10 +36,11 @@ def callback(indata, frames, time, status):
         if ptext:
             print("Partial:", ptext)
 
-            # detect partial emergency words
+            # partial emergency words are unconfirmed until the final result
             for kw in KEYWORDS:
                 if kw in ptext:
-                    print("\n🚨🚨 ALERT TRIGGERED (PARTIAL) —", kw.upper(), "🚨🚨\n")
+                    print("⏳ Armed on partial —", kw.upper(), "(waiting for the final result)")
+                    break
 
 print("Starting keyword detection (Ctrl+C to stop)...")
 with sd.InputStream(samplerate=SAMPLE_RATE, blocksize=8000, dtype='int16',
@@ -0,0 +1,262 @@
+"""
+metrics.py
+
+Lightweight tracing + metrics with a local Prometheus endpoint.
+
+- Counter / Gauge: plain values, or read from a callback at scrape time
+  (e.g. queue depths owned by other modules).
+- Histogram: fixed bucket counts plus a fixed-size ring of the most recent
+  observations for rolling quantiles, so memory never grows.
+- AlertTrace: timestamps one alert from the audio block that contained the
+  keyword through every stage (recognition, snapshot, encode, upload,
+  telegram, fcm, siren) into a per-stage histogram.
+- MetricsServer: serves GET /metrics in Prometheus text format from a
+  daemon thread (bind to 127.0.0.1 by default).
+"""
+
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                     for k, v in labels)
+    return "{" + inner + "}"
+
+
+def _fmt_value(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, fn=None):
+        self._fn = fn
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self._lock:
+            self._value += n
+
+    def value(self):
+        return self._fn() if self._fn is not None else self._value
+
+    def samples(self, name, labels):
+        return [(name, labels, self.value())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, v):
+        with self._lock:
+            self._value = v
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=512):
+        self.bounds = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.bounds) + 1)     # last slot: +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._ring = [0.0] * window
+        self._ring_n = 0
+        self._lock = threading.Lock()
+
+    def observe(self, v):
+        i = bisect.bisect_left(self.bounds, v)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += v
+            self._count += 1
+            self._ring[self._ring_n % len(self._ring)] = v
+            self._ring_n += 1
+
+    def recent(self):
+        with self._lock:
+            return sorted(self._ring[:min(self._ring_n, len(self._ring))])
+
+    @staticmethod
+    def _pick(vals, q):
+        return vals[min(len(vals) - 1, int(q * len(vals)))]
+
+    def quantile(self, q):
+        vals = self.recent()
+        return self._pick(vals, q) if vals else None
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        out = []
+        acc = 0
+        for bound, c in zip(self.bounds + (float("inf"),), counts):
+            acc += c
+            out.append((name + "_bucket", labels + (("le", _fmt_value(bound)),), acc))
+        out.append((name + "_sum", labels, total))
+        out.append((name + "_count", labels, count))
+        return out
+
+    def window_samples(self, name, labels):
+        vals = self.recent()
+        if not vals:
+            return []
+        return [(name + "_window", labels + (("quantile", str(q)),), self._pick(vals, q))
+                for q in QUANTILES]
+
+
+class Family:
+    """One metric name with an optional set of label names."""
+
+    def __init__(self, name, kind, help_text, label_names, factory):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.label_names:
+            self._children[()] = factory()
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._factory()
+                self._children[key] = child
+            return child
+
+    def __getattr__(self, attr):
+        # unlabeled family: forward inc/set/observe/value to the single child
+        if attr.startswith("_") or self.label_names:
+            raise AttributeError(attr)
+        return getattr(self._children[()], attr)
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        with self._lock:
+            children = list(self._children.items())
+        window = []
+        for key, child in children:
+            labels = tuple(zip(self.label_names, key))
+            try:
+                samples = child.samples(self.name, labels)
+            except Exception:
+                continue
+            for name, lbl, v in samples:
+                if v is None:
+                    continue
+                lines.append(f"{name}{_fmt_labels(lbl)} {_fmt_value(v)}")
+            if self.kind == "histogram":
+                window.extend(child.window_samples(self.name, labels))
+        if window:
+            lines.append(f"# HELP {self.name}_window {self.help} (recent observations)")
+            lines.append(f"# TYPE {self.name}_window gauge")
+            for name, lbl, v in window:
+                lines.append(f"{name}{_fmt_labels(lbl)} {_fmt_value(v)}")
+
+
+class Registry:
+    def __init__(self, prefix=""):
+        self.prefix = prefix
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _family(self, name, kind, help_text, labels, factory):
+        full = self.prefix + name
+        with self._lock:
+            fam = self._families.get(full)
+            if fam is None:
+                fam = Family(full, kind, help_text, labels, factory)
+                self._families[full] = fam
+            return fam
+
+    def counter(self, name, help_text, labels=(), fn=None):
+        return self._family(name, "counter", help_text, labels, lambda: Counter(fn))
+
+    def gauge(self, name, help_text, labels=(), fn=None):
+        return self._family(name, "gauge", help_text, labels, lambda: Gauge(fn))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS, window=512):
+        return self._family(name, "histogram", help_text, labels, lambda: Histogram(buckets, window))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            families = list(self._families.values())
+        for fam in families:
+            fam.render(lines)
+        return "\n".join(lines) + "\n"
+
+
+class AlertTrace:
+    """Per-alert stage timestamps, relative to the audio block that held the keyword."""
+
+    def __init__(self, stage_hist, t0=None):
+        self._hist = stage_hist
+        self.t0 = time.monotonic() if t0 is None else t0
+        self.marks = {}
+
+    def mark(self, stage, at=None):
+        elapsed = (time.monotonic() if at is None else at) - self.t0
+        self.marks[stage] = elapsed
+        self._hist.labels(stage).observe(elapsed)
+        return elapsed
+
+    def summary(self):
+        return " ".join(f"{k}=+{v * 1000.0:.0f}ms" for k, v in sorted(self.marks.items(), key=lambda kv: kv[1]))
+
+
+class MetricsServer:
+    def __init__(self, registry, host="127.0.0.1", port=9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._srv = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._srv = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._srv.daemon_threads = True
+        self.port = self._srv.server_port
+        threading.Thread(target=self._srv.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"📈 Metrics at http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        if self._srv is not None:
+            self._srv.shutdown()
+            self._srv.server_close()
+            self._srv = None
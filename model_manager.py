@@ -0,0 +1,145 @@
+"""
+model_manager.py
+
+Which Vosk models are resident, and which one goes when memory is short.
+
+Languages are grouped by model path: languages that share a path share one
+Model (one worker process in MultiLangEngine, one KaldiRecognizer per
+language). Each model is one entry:
+
+- hot languages' models are loaded at start and never evicted
+- cold ones are loaded on demand (MultiLangEngine.activate) and unloaded
+  again least-recently-used first whenever loading another model would
+  push the resident total over the memory budget
+- a model is "used" when it is activated or one of its languages returns
+  a result
+
+Memory is the resident set (RSS) of each model's worker process, read from
+/proc; load_mb is how much loading the model added to it. A model not loaded
+yet is estimated as the bare worker process (measured on the first load) plus
+its load_mb from an earlier load, or the on-disk size of the model directory.
+"""
+
+import os
+import time
+
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_mb(pid=None):
+    """Resident set size of a process in MB (None where /proc is not available)."""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE / (1024.0 * 1024.0)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def dir_mb(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total / (1024.0 * 1024.0)
+
+
+class ModelEntry:
+    def __init__(self, path, langs, hot):
+        self.path = path
+        self.langs = langs
+        self.hot = hot
+        self.state = "unloaded"     # unloaded / loading / ready / error
+        self.pid = None
+        self.load_s = None
+        self.load_mb = None         # RSS the model added to its worker
+        self.rss_mb = None          # worker RSS, refreshed by ModelManager.resident_mb()
+        self.error = None
+        self.last_used = 0.0
+        self.loads = 0
+        self.evictions = 0
+
+    @property
+    def resident(self):
+        return self.state in ("loading", "ready")
+
+
+class ModelManager:
+    def __init__(self, model_paths, hot=None, budget_mb=None):
+        """model_paths: lang -> model dir; hot: languages kept loaded (None = all); budget_mb: None = no limit."""
+        hot = set(model_paths if hot is None else hot)
+        self.budget_mb = budget_mb
+        self.worker_mb = 0.0        # RSS of a worker process before its model is loaded
+        self.entries = {}
+        for lang, path in model_paths.items():
+            e = self.entries.get(path)
+            if e is None:
+                e = self.entries[path] = ModelEntry(path, [], False)
+            e.langs.append(lang)
+            e.hot = e.hot or lang in hot
+        self._by_lang = {lang: self.entries[path] for lang, path in model_paths.items()}
+
+    def entry(self, lang):
+        return self._by_lang[lang]
+
+    def touch(self, lang):
+        self._by_lang[lang].last_used = time.monotonic()
+
+    def loaded(self, e, load_s, load_mb, rss):
+        e.state, e.load_s, e.load_mb, e.rss_mb = "ready", load_s, load_mb, rss
+        if load_mb is not None and rss is not None:
+            self.worker_mb = max(0.0, rss - load_mb)
+
+    def estimate_mb(self, e):
+        return self.worker_mb + (e.load_mb if e.load_mb is not None else dir_mb(e.path))
+
+    def hot_mb(self):
+        """Estimated memory of the hot models: start() loads them and nothing unloads them."""
+        return sum(self.estimate_mb(e) for e in self.entries.values() if e.hot)
+
+    def resident_mb(self):
+        total = 0.0
+        for e in self.entries.values():
+            if e.resident and e.pid is not None:
+                rss = rss_mb(e.pid)
+                if rss is not None:
+                    e.rss_mb = rss
+            if e.resident:
+                total += e.rss_mb if e.rss_mb is not None else self.estimate_mb(e)
+        return total
+
+    def plan(self, e):
+        """
+        Models to unload (LRU cold ones first) so that e fits in the budget,
+        [] if it fits already, or None if it cannot fit even then.
+        """
+        if self.budget_mb is None:
+            return []
+        need = self.resident_mb() + self.estimate_mb(e) - self.budget_mb
+        evict = []
+        cold = sorted((c for c in self.entries.values() if c.state == "ready" and not c.hot and c is not e),
+                      key=lambda c: c.last_used)
+        for c in cold:
+            if need <= 0:
+                break
+            evict.append(c)
+            need -= c.rss_mb if c.rss_mb is not None else self.estimate_mb(c)
+        return evict if need <= 0 else None
+
+    def report(self):
+        """Per model: languages, state, load time and memory, for sizing a deployment."""
+        self.resident_mb()
+        now = time.monotonic()
+        out = {}
+        for e in self.entries.values():
+            out[e.path] = {
+                "langs": list(e.langs), "hot": e.hot, "state": e.state,
+                "load_s": None if e.load_s is None else round(e.load_s, 2),
+                "load_mb": None if e.load_mb is None else round(e.load_mb, 1),
+                "rss_mb": round(e.rss_mb, 1) if e.resident and e.rss_mb is not None else None,
+                "idle_s": round(now - e.last_used, 1) if e.last_used else None,
+                "loads": e.loads, "evictions": e.evictions, "error": e.error,
+            }
+        return out
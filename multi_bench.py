@@ -0,0 +1,123 @@
+"""
+multi_bench.py
+
+Throughput of multi-language detection on a recorded clip:
+  - "round-robin": the old multi_test.py loop, one thread, each 0.5 s block
+                   goes to only one language in rotation
+  - "parallel":    MultiLangEngine, every language hears every block in its
+                   model's worker process
+
+For the parallel run it also prints each model's load time, the memory
+loading it took and its worker's resident size, to size the board (and
+MODEL_MEMORY_BUDGET_MB in multi_test.py) for a zone's languages.
+
+Usage:
+    python multi_bench.py clip.wav
+
+The clip must be 16 kHz, mono, 16-bit PCM WAV. Run it on the target board
+(e.g. a 4-core Pi) to size the deployment.
+"""
+
+import sys
+import json
+import time
+import wave
+
+import numpy as np
+from vosk import Model, KaldiRecognizer, SetLogLevel
+
+from multi_lang_engine import MultiLangEngine
+from multi_test import MODEL_PATHS, SAMPLE_RATE, GRAMMARS, is_emergency
+
+BLOCKSIZE = 8000
+
+
+def read_wav(path):
+    with wave.open(path, "rb") as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != SAMPLE_RATE:
+            raise ValueError(f"{path}: need {SAMPLE_RATE} Hz mono 16-bit WAV")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+
+def bench_round_robin(pcm):
+    models, loaded = {}, {}
+    for lang, path in MODEL_PATHS.items():
+        try:
+            if path not in loaded:
+                loaded[path] = Model(path)
+            models[lang] = loaded[path]
+        except Exception:
+            print(f"❌ ERROR loading: {lang}")
+    recognizers = {lang: KaldiRecognizer(m, SAMPLE_RATE, json.dumps(GRAMMARS[lang] + ["[unk]"]))
+                   if lang in GRAMMARS else KaldiRecognizer(m, SAMPLE_RATE) for lang, m in models.items()}
+    cycle = list(recognizers)
+    heard = {lang: 0 for lang in cycle}
+    hits = []
+    t0 = time.perf_counter()
+    for n, i in enumerate(range(0, len(pcm), BLOCKSIZE)):
+        lang = cycle[n % len(cycle)]
+        block = pcm[i:i + BLOCKSIZE]
+        heard[lang] += len(block)
+        if recognizers[lang].AcceptWaveform(block.tobytes()):
+            text = json.loads(recognizers[lang].Result()).get("text", "")
+            alert, kw = is_emergency(text)
+            if alert:
+                hits.append((lang, kw))
+    for lang, rec in recognizers.items():
+        alert, kw = is_emergency(json.loads(rec.FinalResult()).get("text", ""))
+        if alert:
+            hits.append((lang, kw))
+    wall = time.perf_counter() - t0
+    coverage = {lang: 100.0 * heard[lang] / len(pcm) for lang in cycle}
+    return wall, hits, coverage
+
+
+def bench_parallel(pcm):
+    engine = MultiLangEngine(MODEL_PATHS, SAMPLE_RATE, grammars=GRAMMARS).start()
+    try:
+        results = []
+        t0 = time.perf_counter()
+        for i in range(0, len(pcm), BLOCKSIZE):
+            engine.feed(pcm[i:i + BLOCKSIZE], block=True)
+            results.extend(engine.poll())
+        results.extend(engine.flush())
+        wall = time.perf_counter() - t0
+        stats = engine.stats()
+        models = engine.model_report()
+        memory = engine.memory_mb()
+    finally:
+        engine.stop()
+    hits = []
+    for r in results:
+        alert, kw = is_emergency(r["text"].lower())
+        if alert:
+            hits.append((r["lang"], kw))
+    return wall, hits, stats, models, memory
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    SetLogLevel(-1)
+    pcm = read_wav(sys.argv[1])
+    audio_s = len(pcm) / SAMPLE_RATE
+    print(f"Clip: {sys.argv[1]} ({audio_s:.1f}s)\n")
+
+    wall, hits, coverage = bench_round_robin(pcm)
+    print(f"round-robin: wall={wall:.2f}s  throughput={audio_s / wall:.2f}x realtime  hits={len(hits)}")
+    for lang, pct in coverage.items():
+        print(f"    {lang}: heard {pct:.0f}% of the audio")
+
+    wall, hits, stats, models, memory = bench_parallel(pcm)
+    print(f"parallel:    wall={wall:.2f}s  throughput={audio_s / wall:.2f}x realtime  hits={len(hits)}")
+    for lang, st in stats.items():
+        print(f"    {lang}: heard {100.0 * st['audio_s'] / audio_s:.0f}% of the audio, rtf={st['rtf']}")
+    print(f"\nmodels ({memory:.0f} MB resident in total):")
+    for path, m in models.items():
+        print(f"    {path} [{', '.join(m['langs'])}]: {m['state']} load={m['load_s']}s "
+              f"+{m['load_mb']}MB rss={m['rss_mb']}MB{' error=' + m['error'] if m['error'] else ''}")
+
+
+if __name__ == "__main__":
+    main()
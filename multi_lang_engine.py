@@ -0,0 +1,462 @@
+"""
+multi_lang_engine.py
+
+Run one Vosk recognizer per language at the same time on the same audio.
+
+The audio callback writes each block once into a shared-memory int16 ring
+(SharedAudioRing); every model has its own worker process that reads the
+full stream from that ring, so no language misses any audio and words that
+span two blocks are still recognized. Final results come back on a queue
+with per-language timing and are merged in audio order.
+
+Processes (not threads) are used because Kaldi decoding holds the GIL for
+long stretches; on a 4-core Pi three languages get a core each.
+
+Languages that map to the same model path share its worker: one Model, one
+KaldiRecognizer per language (optionally with its own keyword grammar).
+Which models are loaded is up to the ModelManager (model_manager.py): hot
+languages at start, cold ones on activate(), evicting least-recently-used
+cold models to stay within the memory budget. A model loaded later starts
+decoding at the audio written when it was activated, so it catches up on
+what was said while it was loading (up to the ring size).
+
+feed() runs on the audio callback thread while activate() / deactivate()
+run on another. The set of workers to wake is handed over explicitly:
+model changes happen under one lock and publish a new immutable tuple of
+semaphores, and feed() only ever reads that tuple (one attribute read, no
+lock, so the callback never waits on a model load or unload).
+"""
+
+import json
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from model_manager import ModelManager, rss_mb
+
+# header slots (int64): [write_pos, reader0_pos, reader0_decode_us, reader1_pos, ...]
+_HDR_WRITE = 0
+
+
+def _hdr_pos(i):
+    return 1 + 2 * i
+
+
+def _hdr_decode(i):
+    return 2 + 2 * i
+
+
+class SharedAudioRing:
+    """Single-producer / multi-consumer int16 ring in shared memory."""
+
+    def __init__(self, capacity, readers, name=None):
+        self.capacity = capacity
+        self.readers = readers
+        hdr_bytes = 8 * (1 + 2 * readers)
+        size = hdr_bytes + 2 * capacity
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.header = np.ndarray((1 + 2 * readers,), dtype=np.int64, buffer=self.shm.buf)
+        self.data = np.ndarray((capacity,), dtype=np.int16, buffer=self.shm.buf, offset=hdr_bytes)
+        if self.owner:
+            self.header[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write_pos(self):
+        return int(self.header[_HDR_WRITE])
+
+    def reader_pos(self, i):
+        return int(self.header[_hdr_pos(i)])
+
+    def min_reader_pos(self, readers=None):
+        pos = self.header[1::2]
+        if readers is not None:
+            pos = pos[list(readers)]
+        return int(pos.min()) if len(pos) else int(self.header[_HDR_WRITE])
+
+    def write(self, samples):
+        """Append samples (1-D int16). Never blocks; slow readers get overrun."""
+        n = samples.shape[0]
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+            self.header[_HDR_WRITE] += n - self.capacity
+            n = self.capacity
+        pos = int(self.header[_HDR_WRITE])
+        start = pos % self.capacity
+        first = min(n, self.capacity - start)
+        self.data[start:start + first] = samples[:first]
+        if first < n:
+            self.data[:n - first] = samples[first:]
+        # publish only after the samples are in place
+        self.header[_HDR_WRITE] = pos + n
+
+    def read(self, i, max_samples=None):
+        """
+        Return (samples_copy, overrun) of everything reader i has not seen yet.
+        If the writer lapped the reader, the oldest audio is skipped.
+        """
+        end = int(self.header[_HDR_WRITE])
+        pos = int(self.header[_hdr_pos(i)])
+        overrun = 0
+        if end - pos > self.capacity:
+            overrun = end - pos - self.capacity
+            pos = end - self.capacity
+        if max_samples is not None:
+            end = min(end, pos + max_samples)
+        n = end - pos
+        if n <= 0:
+            return np.zeros(0, dtype=np.int16), overrun
+        start = pos % self.capacity
+        first = min(n, self.capacity - start)
+        out = np.empty(n, dtype=np.int16)
+        out[:first] = self.data[start:start + first]
+        if first < n:
+            out[first:] = self.data[:n - first]
+        self.header[_hdr_pos(i)] = end
+        return out, overrun
+
+    def close(self):
+        # drop numpy views before closing the mapping
+        self.header = None
+        self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _result(lang, text, ring, index, sample_rate, decode_ms, lag=True):
+    return {
+        "type": "final", "lang": lang, "text": text,
+        "audio_end_s": ring.reader_pos(index) / sample_rate,
+        "decode_ms": decode_ms,
+        "lag_ms": (ring.write_pos() - ring.reader_pos(index)) * 1000.0 / sample_rate if lag else 0.0,
+        "wall": time.time(),
+    }
+
+
+def _worker(index, key, model_path, grammars, shm_name, capacity, readers, sample_rate,
+            chunk, data_sem, cmd_q, results_q, stop_evt):
+    from vosk import Model, KaldiRecognizer, SetLogLevel
+    SetLogLevel(-1)
+    t0 = time.perf_counter()
+    rss0 = rss_mb()
+    try:
+        model = Model(model_path)
+    except Exception as e:
+        results_q.put({"type": "error", "model": key, "error": str(e)})
+        return
+    # one Model, one recognizer per language that uses it
+    recs = {}
+    for lang, phrases in grammars.items():
+        if phrases:
+            recs[lang] = KaldiRecognizer(model, sample_rate, json.dumps(list(phrases) + ["[unk]"]))
+        else:
+            recs[lang] = KaldiRecognizer(model, sample_rate)
+    rss1 = rss_mb()
+    results_q.put({"type": "ready", "model": key, "load_s": time.perf_counter() - t0, "rss_mb": rss1,
+                   "load_mb": rss1 - rss0 if rss0 is not None and rss1 is not None else None})
+
+    ring = SharedAudioRing(capacity, readers, name=shm_name)
+    decode_us = 0
+    try:
+        while not stop_evt.is_set():
+            data_sem.acquire(timeout=0.5)
+            while not stop_evt.is_set():
+                samples, overrun = ring.read(index, chunk)
+                if overrun:
+                    results_q.put({"type": "overrun", "model": key, "samples": overrun})
+                if samples.size == 0:
+                    break
+                raw = samples.tobytes()
+                for lang, rec in recs.items():
+                    d0 = time.perf_counter()
+                    final = rec.AcceptWaveform(raw)
+                    dt = time.perf_counter() - d0
+                    decode_us += int(dt * 1e6)
+                    if final:
+                        text = json.loads(rec.Result()).get("text", "")
+                        if text:
+                            results_q.put(_result(lang, text, ring, index, sample_rate, dt * 1000.0))
+                ring.header[_hdr_decode(index)] = decode_us
+            try:
+                cmd = cmd_q.get_nowait()
+            except queue.Empty:
+                continue
+            if cmd == "flush":
+                for lang, rec in recs.items():
+                    text = json.loads(rec.FinalResult()).get("text", "")
+                    if text:
+                        results_q.put(_result(lang, text, ring, index, sample_rate, 0.0, lag=False))
+                results_q.put({"type": "flushed", "model": key})
+    finally:
+        ring.close()
+
+
+class MultiLangEngine:
+    def __init__(self, model_paths, sample_rate=16000, buffer_seconds=10, chunk_ms=250,
+                 hot=None, budget_mb=None, grammars=None):
+        """
+        model_paths: lang -> model dir (languages may share one); hot: languages
+        loaded by start() and never evicted (None = all); budget_mb: RSS limit
+        for all model workers together; grammars: lang -> keyword phrases for a
+        grammar-constrained recognizer (default: free transcription).
+        """
+        self.model_paths = dict(model_paths)
+        self.langs = list(self.model_paths)
+        self.grammars = dict(grammars or {})
+        self.sample_rate = sample_rate
+        self.chunk = int(sample_rate * chunk_ms / 1000)
+        self.manager = ModelManager(self.model_paths, hot, budget_mb)
+        self.slots = list(self.manager.entries.values())     # one ring reader / worker per model
+        self._slot = {e.path: i for i, e in enumerate(self.slots)}
+        self.ring = SharedAudioRing(int(sample_rate * buffer_seconds), len(self.slots))
+        ctx = mp.get_context("spawn")
+        self._ctx = ctx
+        self._results = ctx.Queue()
+        n = len(self.slots)
+        self._sems = [None] * n
+        self._cmds = [None] * n
+        self._stops = [None] * n
+        self._procs = [None] * n
+        self._start_pos = [0] * n
+        self._lock = threading.RLock()      # model changes (activate / deactivate / errors)
+        self._wake = ()                     # semaphores of running workers, read by feed()
+        self._pending = []
+        self.ready = {}          # lang -> model load seconds
+        self.errors = {}         # lang -> error string
+        self.overruns = {lang: 0 for lang in self.langs}
+
+    # ---------- model lifecycle ----------
+
+    def _publish(self):
+        """Hand feed() the semaphores of the workers running now (call with _lock held)."""
+        self._wake = tuple(self._sems[i] for i, p in enumerate(self._procs) if p is not None)
+
+    def _load(self, e):
+        i = self._slot[e.path]
+        pos = self.ring.write_pos()
+        self.ring.header[_hdr_pos(i)] = pos
+        self.ring.header[_hdr_decode(i)] = 0
+        self._start_pos[i] = pos
+        self._sems[i] = self._ctx.Semaphore(0)
+        self._cmds[i] = self._ctx.Queue()
+        self._stops[i] = self._ctx.Event()
+        grammars = {lang: self.grammars.get(lang) for lang in e.langs}
+        p = self._ctx.Process(
+            target=_worker, name=f"vosk-{'+'.join(e.langs)}", daemon=True,
+            args=(i, e.path, e.path, grammars, self.ring.name, self.ring.capacity, len(self.slots),
+                  self.sample_rate, self.chunk, self._sems[i], self._cmds[i], self._results, self._stops[i]))
+        p.start()
+        self._procs[i] = p
+        self._publish()
+        e.state, e.pid, e.error, e.rss_mb = "loading", p.pid, None, None
+        e.loads += 1
+        e.last_used = time.monotonic()
+
+    def _unload(self, e):
+        i = self._slot[e.path]
+        p = self._procs[i]
+        if p is not None:
+            self._stops[i].set()
+            self._sems[i].release()
+            p.join(3.0)
+            if p.is_alive():
+                p.terminate()
+            self._procs[i] = None
+            self._publish()
+        e.state, e.pid, e.rss_mb = "unloaded", None, None
+        for lang in e.langs:
+            self.ready.pop(lang, None)
+
+    def _wait_loaded(self, entries, timeout):
+        deadline = time.monotonic() + timeout
+        while any(e.state == "loading" for e in entries) and time.monotonic() < deadline:
+            self._collect(0.2)
+
+    def start(self, wait=True, timeout=120.0):
+        """Load the hot models (all of them unless `hot` was given)."""
+        hot = [e for e in self.slots if e.hot]
+        self._check_budget(self.manager.hot_mb(), "need ~")
+        with self._lock:
+            for e in hot:
+                self._load(e)
+        if wait:
+            self._wait_loaded(hot, timeout)
+            for e in hot:
+                self._print_state(e)
+            # the estimate is the on-disk size; a loaded model usually takes more
+            self._check_budget(self.manager.resident_mb(), "take ")
+        return self
+
+    def _check_budget(self, mb, verb):
+        budget = self.manager.budget_mb
+        if budget is not None and mb > budget:
+            # hot models are never unloaded: activate() could not load any cold one
+            print(f"⚠ Hot models {verb}{mb:.0f} MB, over the {budget:.0f} MB budget; they stay loaded, "
+                  f"but no other language can be activated (raise the budget or make fewer languages hot)")
+
+    def _print_state(self, e):
+        langs = ", ".join(e.langs)
+        if e.state == "error":
+            print(f"❌ ERROR loading: {langs} ({e.error})")
+        elif e.state == "ready":
+            mem = f", +{e.load_mb:.0f} MB" if e.load_mb is not None else ""
+            print(f"✔ Loaded: {langs} ({e.load_s:.1f}s{mem})")
+
+    def activate(self, lang, wait=False, timeout=120.0):
+        """
+        Make sure lang's model is loaded, unloading least-recently-used cold
+        models if the budget requires it. Returns False if it cannot fit.
+        """
+        e = self.manager.entry(lang)
+        self.manager.touch(lang)
+        with self._lock:
+            if not e.resident:
+                if not os.path.isdir(e.path):
+                    # fail before unloading anything for it
+                    e.state, e.error = "error", "model directory not found"
+                    self._print_state(e)
+                    return False
+                evict = self.manager.plan(e)
+                if evict is None:
+                    print(f"❌ Not loading {lang}: ~{self.manager.estimate_mb(e):.0f} MB does not fit the "
+                          f"{self.manager.budget_mb:.0f} MB budget ({self.manager.resident_mb():.0f} MB resident, "
+                          f"hot models are never unloaded)")
+                    return False
+                for c in evict:
+                    print(f"♻ Unloading {', '.join(c.langs)} ({c.rss_mb or 0:.0f} MB, least recently used)")
+                    self._unload(c)
+                    c.evictions += 1
+                self._load(e)
+        if wait:
+            self._wait_loaded([e], timeout)
+            self._print_state(e)
+        return e.state != "error"
+
+    def deactivate(self, lang):
+        """Unload lang's model now (and with it every language sharing it)."""
+        e = self.manager.entry(lang)
+        with self._lock:
+            if e.resident:
+                self._unload(e)
+
+    # ---------- audio ----------
+
+    def feed(self, indata, block=False):
+        """
+        Write one block to every loaded model. Called from the audio callback,
+        so by default it never waits; with block=True (offline replay) it waits
+        until the slowest ready worker has room so nothing is overrun.
+        """
+        samples = np.asarray(indata, dtype=np.int16).reshape(-1)
+        if block:
+            live = [i for i, e in enumerate(self.slots) if e.state == "ready"]
+            while self.ring.write_pos() + samples.shape[0] - self.ring.min_reader_pos(live) > self.ring.capacity:
+                self._collect(0.001)
+        self.ring.write(samples)
+        for sem in self._wake:
+            sem.release()
+
+    def _collect(self, timeout):
+        try:
+            msg = self._results.get(timeout=timeout) if timeout else self._results.get_nowait()
+        except queue.Empty:
+            return False
+        kind = msg["type"]
+        e = self.manager.entries.get(msg.get("model"))
+        if kind == "ready":
+            if e.state == "loading":        # not unloaded again meanwhile
+                self.manager.loaded(e, msg["load_s"], msg["load_mb"], msg["rss_mb"])
+                for lang in e.langs:
+                    self.ready[lang] = msg["load_s"]
+        elif kind == "error":
+            with self._lock:
+                e.state, e.error, e.pid = "error", msg["error"], None
+                self._procs[self._slot[e.path]] = None
+                self._publish()
+            for lang in e.langs:
+                self.errors[lang] = msg["error"]
+        elif kind == "overrun":
+            for lang in e.langs:
+                self.overruns[lang] += msg["samples"]
+        else:
+            if kind == "final":
+                self.manager.touch(msg["lang"])
+            self._pending.append(msg)
+        return True
+
+    def poll(self, timeout=0.0):
+        """Return final results received so far, merged in audio order."""
+        if self._collect(timeout):
+            while self._collect(0):
+                pass
+        out = [m for m in self._pending if m["type"] == "final"]
+        self._pending = [m for m in self._pending if m["type"] != "final"]
+        out.sort(key=lambda m: m["audio_end_s"])
+        return out
+
+    def flush(self, timeout=30.0):
+        """Wait for every loaded worker to consume all audio and emit its last results."""
+        live = [e.path for e in self.slots if e.state == "ready"]
+        for path in live:
+            i = self._slot[path]
+            self._cmds[i].put("flush")
+            self._sems[i].release()
+        deadline = time.monotonic() + timeout
+        done = set()
+        while len(done) < len(live) and time.monotonic() < deadline:
+            self._collect(0.1)
+            for m in [m for m in self._pending if m["type"] == "flushed"]:
+                done.add(m["model"])
+                self._pending.remove(m)
+        return self.poll()
+
+    # ---------- reporting ----------
+
+    def stats(self):
+        """Per language; decode time is per model (shared by the languages on it)."""
+        out = {}
+        for lang in self.langs:
+            e = self.manager.entry(lang)
+            i = self._slot[e.path]
+            pos = self.ring.reader_pos(i)
+            decode_s = int(self.ring.header[_hdr_decode(i)]) / 1e6 if e.resident else 0.0
+            audio_s = (pos - self._start_pos[i]) / self.sample_rate if e.resident else 0.0
+            out[lang] = {
+                "model": e.path,
+                "state": e.state,
+                "audio_s": round(audio_s, 2),
+                "decode_s": round(decode_s, 2),
+                "rtf": round(decode_s / audio_s, 3) if audio_s else 0.0,
+                "lag_ms": round((self.ring.write_pos() - pos) * 1000.0 / self.sample_rate, 1)
+                if e.resident else None,
+                "overrun_samples": self.overruns[lang],
+            }
+        return out
+
+    def model_report(self):
+        """Per model: languages, state, load time, load / resident MB (see ModelManager.report)."""
+        return self.manager.report()
+
+    def memory_mb(self):
+        """RSS of all model workers together."""
+        return self.manager.resident_mb()
+
+    def stop(self):
+        with self._lock:
+            for e in self.slots:
+                if e.resident:
+                    self._unload(e)
+        self.ring.close()
@@ -1,93 +1,153 @@
-import sounddevice as sd
-import json
-from vosk import Model, KaldiRecognizer
+import threading
+
+from multi_lang_engine import MultiLangEngine
+from keyword_matcher import KeywordMatcher
 
 SAMPLE_RATE = 16000
 CHANNELS = 1
 
 # -------------------------------
-# LOAD ALL MODELS (EN, HI, TE)
+# ALL MODELS (EN, HI, TE)
+# Each model gets its own worker process and hears the full stream.
+# Languages on the same model path share one loaded Model (a recognizer
+# each): Urdu runs on the Hindi model, restricted to its keywords.
 # -------------------------------
 MODEL_PATHS = {
     "english": "models/english",
     "hindi": "models/hindi",
+    "urdu": "models/hindi",
     "telugu": "models/telugu"
 }
 
-print("\nLoading models...\n")
-MODELS = {}
-for lang, path in MODEL_PATHS.items():
-    try:
-        MODELS[lang] = Model(path)
-        print(f"✔ Loaded: {lang}")
-    except:
-        print(f"❌ ERROR loading: {lang}")
-
-# Create recognizers
-recognizers = {lang: KaldiRecognizer(model, SAMPLE_RATE) for lang, model in MODELS.items()}
+# loaded at start and never unloaded; the others load on "load <lang>"
+HOT_LANGUAGES = ["english", "hindi"]
+# RSS limit for all model workers together (None = no limit); a 1 GB Pi
+# needs room left for the OS, audio and the alert pipeline
+MODEL_MEMORY_BUDGET_MB = 600
 
 # -------------------------------
 # EMERGENCY KEYWORDS COMBINED
 # -------------------------------
 
-EMERGENCY_WORDS = [
-    # English
-    "help", "police", "save me", "help me", "thief", "emergency", "attack", "fire", "ambulance", "108",
+EMERGENCY_WORDS = {
+    "english": ["help", "police", "save me", "help me", "thief", "emergency", "attack", "fire", "ambulance", "108"],
 
-    # Hindi
-    "madad", "police", "bachao", "chori", "hamla", "aag", "emergency",
+    "hindi": ["madad", "police", "bachao", "chori", "hamla", "aag", "emergency"],
 
-    # Telugu
-    "saahayam", "sahayam", "kaapadu", "kapadu", "nannu kaapadu", "dongalu", "aapad", "agni",
+    "telugu": ["saahayam", "sahayam", "kaapadu", "kapadu", "nannu kaapadu", "dongalu", "aapad", "agni"],
 
-    # Tamil
-    "uthaavi", "kaaval", "kaapathu", "soodam", "thee", "thuṇai",
+    "tamil": ["uthaavi", "kaaval", "kaapathu", "soodam", "thee", "thuṇai"],
 
-    # Kannada
-    "sahaya", "rakshisi", "police", "agni", "aparadhi", "bedi",
+    "kannada": ["sahaya", "rakshisi", "police", "agni", "aparadhi", "bedi"],
 
-    # Malayalam
-    "sahayam", "police", "rakshikkuka", "thee", "apatham",
+    "malayalam": ["sahayam", "police", "rakshikkuka", "thee", "apatham"],
 
-    # Urdu
-    "madad", "police", "bachao", "hamla", "aag"
-]
+    "urdu": ["madad", "police", "bachao", "hamla", "aag"],
+}
 
-def is_emergency(text):
-    for word in EMERGENCY_WORDS:
-        if word in text:
-            return True, word
-    return False, None
+# native-script spellings: the Hindi / Telugu models write Devanagari /
+# Telugu script, not the romanized keywords above
+NATIVE_SPELLINGS = {
+    "madad": ["मदद"],
+    "bachao": ["बचाओ"],
+    "chori": ["चोरी"],
+    "hamla": ["हमला"],
+    "aag": ["आग"],
+    "police": ["पुलिस", "పోలీస్"],
+    "emergency": ["इमरजेंसी"],
+    "sahayam": ["సహాయం"],
+    "kaapadu": ["కాపాడు", "కాపాడండి"],
+    "nannu kaapadu": ["నన్ను కాపాడు"],
+    "dongalu": ["దొంగలు"],
+    "aapad": ["ఆపద"],
+    "agni": ["అగ్ని", "अग्नि"],
+}
 
-# -------------------------------
-# MAIN LISTENING LOGIC
-# -------------------------------
+# deduplicated, normalized, whole-word matcher built once from all languages
+MATCHER = KeywordMatcher.build(EMERGENCY_WORDS, NATIVE_SPELLINGS)
 
-model_cycle = list(recognizers.keys())
-index = 0
+# keyword grammars for languages that share another language's model. A
+# grammar can only use words in that model's vocabulary: the Hindi model
+# spells in Devanagari, so Urdu keywords are listed the way it writes them
+# (romanized "madad" would only ever come out as [unk])
+GRAMMARS = {"urdu": ["मदद", "पुलिस", "बचाओ", "हमला", "आग"]}
 
-print("\n🎤 Multi-language detection started…\n")
+def is_emergency(text):
+    m = MATCHER.first(text)
+    if m:
+        return True, m.keyword
+    return False, None
 
-def callback(indata, frames, time, status):
-    global index
-    raw = indata.tobytes()
+def print_models(engine):
+    print(f"Models ({engine.memory_mb():.0f} MB resident, budget {MODEL_MEMORY_BUDGET_MB or '-'} MB):")
+    for path, m in engine.model_report().items():
+        load = f"load={m['load_s']}s +{m['load_mb']}MB" if m["load_s"] is not None else "never loaded"
+        print(f"  {path} [{', '.join(m['langs'])}]{' hot' if m['hot'] else ''}: {m['state']} "
+              f"rss={m['rss_mb'] or '-'}MB {load} loads={m['loads']} evictions={m['evictions']}"
+              f"{' error=' + m['error'] if m['error'] else ''}")
 
-    lang = model_cycle[index]
-    rec = recognizers[lang]
+def console(engine, lock):
+    """'load <lang>', 'unload <lang>', 'models' on stdin."""
+    while True:
+        try:
+            parts = input().strip().lower().split()
+        except EOFError:
+            return
+        if not parts:
+            continue
+        with lock:
+            if parts[0] in ("load", "unload") and len(parts) == 2 and parts[1] in MODEL_PATHS:
+                if parts[0] == "load":
+                    engine.activate(parts[1])
+                else:
+                    engine.deactivate(parts[1])
+            elif parts[0] == "models":
+                print_models(engine)
+            else:
+                print(f"Commands: load <lang> | unload <lang> | models   (languages: {', '.join(MODEL_PATHS)})")
 
-    if rec.AcceptWaveform(raw):
-        text = json.loads(rec.Result()).get("text", "").lower()
+# -------------------------------
+# MAIN LISTENING LOGIC
+# -------------------------------
 
-        if text.strip():
-            print(f"> {text}")   # SIMPLE ONE-LINE OUTPUT
+def main():
+    import sounddevice as sd
+    print("\nLoading models...\n")
+    engine = MultiLangEngine(MODEL_PATHS, SAMPLE_RATE, hot=HOT_LANGUAGES,
+                             budget_mb=MODEL_MEMORY_BUDGET_MB, grammars=GRAMMARS).start()
+    print_models(engine)
+    lock = threading.Lock()
+    threading.Thread(target=console, args=(engine, lock), daemon=True).start()
 
-            alert, keyword = is_emergency(text)
-            if alert:
-                print(f"\n🚨 ALERT — '{keyword.upper()}' DETECTED 🚨\n")
+    print("\n🎤 Multi-language detection started…\n")
 
-    index = (index + 1) % len(model_cycle)
+    def callback(indata, frames, time, status):
+        # only copies the block into shared memory; decoding happens in the workers
+        engine.feed(indata)
 
-with sd.InputStream(samplerate=SAMPLE_RATE, channels=1, dtype="int16",
-                    blocksize=8000, callback=callback):
-    while True:
-        sd.sleep(1000)
+    try:
+        with sd.InputStream(samplerate=SAMPLE_RATE, channels=1, dtype="int16",
+                            blocksize=8000, callback=callback):
+            while True:
+                # the console thread loads / unloads models between polls
+                with lock:
+                    results = engine.poll(timeout=0.5)
+                for r in results:
+                    text = r["text"].lower()
+                    print(f"> [{r['lang']}] {text}   (decode {r['decode_ms']:.0f} ms, lag {r['lag_ms']:.0f} ms)")
+
+                    m = MATCHER.first(text)
+                    if m:
+                        print(f"\n🚨 ALERT — '{m.keyword.upper()}' DETECTED ({r['lang']}, listed in: {', '.join(m.langs)}) 🚨\n")
+    except KeyboardInterrupt:
+        print("\nStopped by user")
+        for lang, st in engine.stats().items():
+            lag = "-" if st["lag_ms"] is None else f"{st['lag_ms']}ms"
+            print(f"  {lang}: {st['state']} rtf={st['rtf']} lag={lag} overrun={st['overrun_samples']}")
+        print_models(engine)
+    finally:
+        engine.stop()
+
+# worker processes are spawned, so the entry point must be guarded
+if __name__ == "__main__":
+    main()
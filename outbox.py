@@ -0,0 +1,264 @@
+"""
+outbox.py
+
+Durable outbox for alerts that could not be delivered.
+
+When the uplink is down an alert must not be lost. Failed channel sends are
+recorded in a SQLite database (WAL mode) together with a reference to the
+evidence file, and a background drainer retries them with exponential
+backoff, a batch at a time, once the link is back.
+
+enqueue() only appends to an in-memory list and wakes the background
+thread, so it costs microseconds; the same thread owns the SQLite
+connection, writes new entries within a few milliseconds and runs the
+drain loop.
+
+With delete_evidence the evidence files belong to the outbox (nothing else
+keeps them): a file is removed once no row refers to it any more, i.e. its
+last row was delivered or given up on. Several rows (one per failed channel)
+can share a file.
+"""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    created      REAL NOT NULL,
+    channel      TEXT NOT NULL,
+    payload      TEXT NOT NULL,
+    evidence     TEXT,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    last_error   TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (next_attempt);
+"""
+
+
+class Outbox:
+    def __init__(self, path="outbox.db", batch_size=10, base_backoff=5.0, max_backoff=600.0,
+                 max_attempts=None, delete_evidence=False):
+        self.path = path
+        self.batch_size = batch_size
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts     # None: retry forever
+        self.delete_evidence = delete_evidence
+        self._handlers = {}                  # channel -> fn(items) -> [bool, ...]
+        self._hold = {}                      # channel -> time.time() before which the link is assumed down
+        self._failures = {}                  # channel -> consecutive all-failed batches
+        self._incoming = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {"depth": 0, "oldest_age_s": 0.0, "by_channel": {}}
+        self.enqueued = 0
+        self.delivered = 0
+        self.retries = 0
+        self.given_up = 0
+
+    def register(self, channel, handler):
+        """
+        handler(items) -> list of bools, one per item. Each item is a dict with
+        id, channel, payload, evidence, attempts, created.
+        """
+        self._handlers[channel] = handler
+
+    # ---------- producer side ----------
+
+    def enqueue(self, channel, payload, evidence=None):
+        """Record an undelivered alert. Never touches the disk on the caller's thread."""
+        with self._lock:
+            self._incoming.append((time.time(), channel, json.dumps(payload), evidence))
+            self.enqueued += 1
+        self._wake.set()
+
+    def kick(self, channels=None):
+        """Link is (probably) back: retry what waits on `channels` (default: all) right now."""
+        with self._lock:
+            self._incoming.append(("kick", None if channels is None else tuple(channels)))
+        self._wake.set()
+
+    # ---------- background thread ----------
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(5.0)
+            self._thread = None
+
+    def _connect(self):
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(_SCHEMA)
+        return db
+
+    def _run(self):
+        db = self._connect()
+        try:
+            self._refresh_stats(db)
+            while not self._stop.is_set():
+                kicked = self._persist(db)
+                for channel in kicked:
+                    if channel is None:
+                        self._hold.clear()
+                        db.execute("UPDATE outbox SET next_attempt = ?", (time.time(),))
+                    else:
+                        self._hold.pop(channel, None)
+                        db.execute("UPDATE outbox SET next_attempt = ? WHERE channel = ?", (time.time(), channel))
+                if kicked:
+                    db.commit()
+                self._drain(db)
+                self._refresh_stats(db)
+                wait = self._next_due(db)
+                self._wake.wait(wait)
+                self._wake.clear()
+            self._persist(db)
+        finally:
+            db.close()
+
+    def _next_due(self, db):
+        """Seconds until a registered handler has something to retry."""
+        now = time.time()
+        due = None
+        for channel in self._handlers:
+            row = db.execute("SELECT MIN(next_attempt) FROM outbox WHERE channel = ?",
+                             (channel,)).fetchone()
+            if row[0] is None:
+                continue
+            t = max(row[0], self._hold.get(channel, 0.0))
+            due = t if due is None else min(due, t)
+        if due is None:
+            return 60.0
+        return max(0.05, min(60.0, due - now))
+
+    def _persist(self, db):
+        with self._lock:
+            incoming, self._incoming = self._incoming, []
+        kicked = set()
+        rows = []
+        for item in incoming:
+            if item[0] == "kick":
+                kicked.update((None,) if item[1] is None else item[1])
+                continue
+            created, channel, payload, evidence = item
+            rows.append((created, channel, payload, evidence, created))
+        if rows:
+            db.executemany("INSERT INTO outbox (created, channel, payload, evidence, next_attempt) "
+                           "VALUES (?, ?, ?, ?, ?)", rows)
+            db.commit()
+        return kicked
+
+    def _backoff(self, attempts):
+        delay = min(self.max_backoff, self.base_backoff * (2 ** max(0, attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    def _drain(self, db):
+        for channel, handler in self._handlers.items():
+            if time.time() < self._hold.get(channel, 0.0):
+                continue
+            # keep sending batches while they get through; one batch with no
+            # success means the link is still down, so back off the whole channel
+            while not self._stop.is_set():
+                rows = db.execute(
+                    "SELECT id, created, payload, evidence, attempts FROM outbox "
+                    "WHERE channel = ? AND next_attempt <= ? ORDER BY id LIMIT ?",
+                    (channel, time.time(), self.batch_size)).fetchall()
+                if not rows:
+                    break
+                items = [{"id": r[0], "created": r[1], "channel": channel, "payload": json.loads(r[2]),
+                          "evidence": r[3], "attempts": r[4]} for r in rows]
+                try:
+                    results = list(handler(items))
+                except Exception as e:
+                    print(f"❌ Outbox {channel} handler error:", e)
+                    results = [False] * len(items)
+                results += [False] * (len(items) - len(results))
+                done = []
+                for item, ok in zip(items, results):
+                    if ok:
+                        db.execute("DELETE FROM outbox WHERE id = ?", (item["id"],))
+                        self.delivered += 1
+                        done.append(item["evidence"])
+                        continue
+                    attempts = item["attempts"] + 1
+                    if self.max_attempts is not None and attempts >= self.max_attempts:
+                        print(f"⚠ Outbox giving up on {channel} alert #{item['id']} after {attempts} attempts")
+                        db.execute("DELETE FROM outbox WHERE id = ?", (item["id"],))
+                        self.given_up += 1
+                        done.append(item["evidence"])
+                        continue
+                    self.retries += 1
+                    db.execute("UPDATE outbox SET attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?",
+                               (attempts, time.time() + self._backoff(attempts), "send failed", item["id"]))
+                db.commit()
+                if self.delete_evidence:
+                    self._remove_evidence(db, done)
+                if any(results):
+                    self._failures[channel] = 0
+                    continue
+                self._failures[channel] = self._failures.get(channel, 0) + 1
+                self._hold[channel] = time.time() + self._backoff(self._failures[channel])
+                break
+
+    def _remove_evidence(self, db, paths):
+        """Delete evidence files that neither a row nor a not yet persisted entry refers to."""
+        with self._lock:
+            queued = {i[3] for i in self._incoming if i[0] != "kick"}
+        for path in set(paths):
+            if not path or path in queued:
+                continue
+            if db.execute("SELECT 1 FROM outbox WHERE evidence = ? LIMIT 1", (path,)).fetchone():
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _refresh_stats(self, db):
+        now = time.time()
+        by_channel = {}
+        depth = 0
+        oldest = None
+        for channel, n, first in db.execute(
+                "SELECT channel, COUNT(*), MIN(created) FROM outbox GROUP BY channel"):
+            by_channel[channel] = n
+            depth += n
+            oldest = first if oldest is None else min(oldest, first)
+        self._stats = {
+            "depth": depth,
+            "oldest_age_s": round(now - oldest, 1) if oldest is not None else 0.0,
+            "by_channel": by_channel,
+        }
+
+    def stats(self):
+        with self._lock:
+            waiting = sum(1 for i in self._incoming if i[0] != "kick")
+        s = dict(self._stats)
+        s.update(depth=s["depth"] + waiting, enqueued=self.enqueued, delivered=self.delivered,
+                 retries=self.retries, given_up=self.given_up)
+        return s
+
+
+def read_evidence(path):
+    """Evidence bytes for a stored reference, or None if the file is gone."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
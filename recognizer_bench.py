@@ -0,0 +1,81 @@
+"""
+recognizer_bench.py
+
+Compare the two recognizer modes of street_guardian on recorded clips:
+  - "free":    full large-vocabulary decoding
+  - "keyword": grammar built from EMERGENCY_KEYWORDS
+
+For each mode prints real-time factor (wall time / audio time), CPU usage
+(process CPU time / audio time) and the keywords found.
+
+Usage:
+    python recognizer_bench.py clip1.wav [clip2.wav ...]
+
+Clips must be 16 kHz, mono, 16-bit PCM WAV (same format as the mic stream).
+"""
+
+import sys
+import json
+import time
+import wave
+
+from vosk import Model, SetLogLevel
+
+import street_guardian as sg
+
+
+def read_wav(path):
+    with wave.open(path, "rb") as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != sg.SAMPLE_RATE:
+            raise ValueError(f"{path}: need {sg.SAMPLE_RATE} Hz mono 16-bit WAV")
+        return wf.readframes(wf.getnframes())
+
+
+def run_mode(model, mode, clips):
+    audio_s = wall = cpu = 0.0
+    hits = []
+    for path, pcm in clips:
+        rec, used = sg.build_recognizer(model, mode)
+        step = sg.FEED_SIZE * 2       # bytes: one recognizer feed chunk
+        w0, c0 = time.perf_counter(), time.process_time()
+        texts = []
+        for i in range(0, len(pcm), step):
+            if rec.AcceptWaveform(pcm[i:i + step]):
+                texts.append(json.loads(rec.Result()).get("text", ""))
+            else:
+                rec.PartialResult()   # the live callback also polls partials
+        texts.append(json.loads(rec.FinalResult()).get("text", ""))
+        wall += time.perf_counter() - w0
+        cpu += time.process_time() - c0
+        audio_s += len(pcm) / 2 / sg.SAMPLE_RATE
+        for t in texts:
+            kw = sg.contains_keyword(t)
+            if kw:
+                hits.append((path, kw))
+    return used, audio_s, wall, cpu, hits
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    SetLogLevel(-1)
+    clips = [(p, read_wav(p)) for p in sys.argv[1:]]
+
+    print("Loading Vosk model...")
+    t0 = time.perf_counter()
+    model = Model(sg.VOSK_MODEL_PATH)
+    print(f"✅ Model loaded in {time.perf_counter() - t0:.2f}s")
+
+    print(f"\n{'mode':<10}{'audio s':>10}{'wall s':>10}{'RTF':>8}{'CPU %':>8}{'hits':>6}")
+    for mode in ("free", "keyword"):
+        used, audio_s, wall, cpu, hits = run_mode(model, mode, clips)
+        label = used if used == mode else f"{mode}->{used}"
+        print(f"{label:<10}{audio_s:>10.1f}{wall:>10.2f}{wall / audio_s:>8.3f}"
+              f"{100.0 * cpu / audio_s:>8.1f}{len(hits):>6}")
+        for path, kw in hits:
+            print(f"    {path}: {kw}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+replay.py
+
+Offline replay / benchmark harness for the detection pipeline.
+
+Feeds WAV files through the same street_guardian.audio_callback path the
+microphone uses (audio ring -> recognizer feed -> VAD gate -> Vosk ->
+keyword matcher -> alert queue) as fast as the CPU allows. The feed is
+pumped on the replay thread after every device block, as the feeder thread
+would be woken. The alert queue is replaced by a recorder, so no
+camera, siren or network sender is touched.
+
+Reports real-time factor, per-block callback latency percentiles,
+keyword precision / recall and peak RSS.
+
+Detect delay is audio time from the end of the keyword to the device block
+that completed the recognizer chunk, plus the wall time that chunk took to
+process until the alert, so it covers both the feed size and decode cost.
+
+Detect-to-dispatch is modeled, not measured: the alert can only go out
+once its snapshot is ready, and replay has no camera, so that work is an
+assumed fixed --prep-ms (default: burst wait + scoring budget). The partial
+and final result times are real; without the early trigger the prep starts
+at the final result, armed on a partial it starts at the partial. The
+report shows both on the same run, so the difference is only as good as
+the --prep-ms figure (measure it on the device: the "snapshot" stage of the
+alert trace). --no-early turns the early trigger off to check that it adds
+no false alerts.
+
+Blocks are stamped with the audio position (a base time plus samples /
+SAMPLE_RATE), not the wall clock: replay runs faster than real time, so
+INCIDENT_WINDOW, EARLY_TRIGGER_TIMEOUT and SCREAM_COOLDOWN count seconds of
+audio, as they would on the device.
+
+The scream detector runs on the same chunks; its alerts are recorded with
+keyword "scream", so clips/scream/ evaluates it like any keyword (and a
+scream alert on a clips/none/ clip is a false positive). --no-scream turns
+it off; the report includes its CPU time per second of audio.
+
+Clip labels:
+  - clips/<keyword>/*.wav       expected keyword = directory name
+  - clips/scream/*.wav          expected scream detector alert
+  - clips/none/*.wav            (or negative/, noise/) no keyword expected
+  - clip.wav + clip.json        {"keyword": "help", "time": 1.8}
+                                 time = second the keyword ends (optional,
+                                 enables detection latency)
+  - any other WAV               unlabeled, timing only
+
+Usage:
+    python replay.py clips/ [more.wav ...] [--blocksize N] [--feed N] [--fixed-feed]
+                     [--mode keyword|free] [--no-vad] [--no-early] [--no-scream] [--prep-ms MS]
+                     [--json out.json] [--verbose]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import wave
+from concurrent.futures import Future
+
+import numpy as np
+
+import street_guardian as sg
+
+NEGATIVE_DIRS = ("none", "negative", "noise")
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:      # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024.0 if sys.platform != "darwin" else rss / (1024.0 * 1024.0)
+
+
+def percentiles(values, ps=(50, 90, 99)):
+    if not values:
+        return {f"p{p}": None for p in ps}
+    arr = np.asarray(values)
+    return {f"p{p}": round(float(np.percentile(arr, p)), 3) for p in ps}
+
+
+def read_wav(path):
+    with wave.open(path, "rb") as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != sg.SAMPLE_RATE:
+            raise ValueError(f"{path}: need {sg.SAMPLE_RATE} Hz mono 16-bit WAV")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+
+def load_label(path, default=None):
+    """(keyword or '' for negative or None for unlabeled, keyword end time or None)"""
+    side = os.path.splitext(path)[0] + ".json"
+    if os.path.exists(side):
+        with open(side, encoding="utf-8") as f:
+            meta = json.load(f)
+        return meta.get("keyword") or "", meta.get("time")
+    return default, None
+
+
+def discover(paths):
+    clips = []
+    for p in paths:
+        if os.path.isfile(p):
+            clips.append((p,) + load_label(p))
+            continue
+        for root, _, files in os.walk(p):
+            rel = os.path.relpath(root, p)
+            if rel == ".":
+                default = None
+            else:
+                top = rel.split(os.sep)[0]
+                default = "" if top.lower() in NEGATIVE_DIRS else top.replace("_", " ")
+            for name in sorted(files):
+                if name.lower().endswith(".wav"):
+                    path = os.path.join(root, name)
+                    clips.append((path,) + load_label(path, default))
+    return clips
+
+
+class RecordingQueue:
+    """Stands in for street_guardian.alert_queue: records alerts instead of running them."""
+
+    def __init__(self):
+        self.audio_pos = 0.0
+        self.alerts = []
+
+    def submit(self, keyword, *args):
+        # args: trigger_ts, incident[, prepared]; prepared holds the audio time it was armed at
+        prepared = args[2] if len(args) > 2 else None
+        armed_pos = prepared.result() if prepared is not None else None
+        t0 = sg.recognizer_feed.chunk_t0
+        busy = time.perf_counter() - t0 if t0 is not None else 0.0
+        self.alerts.append((keyword, self.audio_pos + busy, armed_pos))
+        return True
+
+    def stats(self):
+        return {"depth": 0, "busy": 0, "submitted": len(self.alerts), "processed": len(self.alerts),
+                "failed": 0, "dropped": 0}
+
+
+class InlinePool:
+    """Runs the early trigger's prepare step at once, on the replay thread."""
+
+    def submit(self, fn, *args):
+        f = Future()
+        f.set_result(fn(*args))
+        return f
+
+
+class ReplayHarness:
+    def __init__(self, blocksize=None, use_vad=True, mode=None, verbose=False, early=True,
+                 feed=None, adaptive=None, scream=True):
+        self.blocksize = blocksize or sg.BLOCKSIZE
+        self.configure_feed(feed, adaptive)
+        self.mode = mode or sg.RECOGNIZER_MODE
+        self.verbose = verbose
+        self.vad_frames = 0
+        self.vad_fed = 0
+        sg.VAD_ENABLED = use_vad
+        sg.EARLY_TRIGGER_ENABLED = early
+        sg.SCREAM_ENABLED = scream
+        self.queue = RecordingQueue()
+        sg.alert_queue = self.queue
+        # audio time: advances one block per callback and keeps running across clips
+        self.now = time.monotonic()
+        sg.clock = sg.early.clock = lambda: self.now
+        # no camera / network: arming only records when it happened
+        sg.early.prepare = lambda keyword, ts: self.queue.audio_pos
+        sg.early.pool = InlinePool()
+        with self._quiet():
+            sg.load_recognizer()
+
+    @contextlib.contextmanager
+    def _quiet(self):
+        if self.verbose:
+            yield
+        else:
+            with contextlib.redirect_stdout(io.StringIO()):
+                yield
+
+    def configure_feed(self, feed=None, adaptive=None):
+        f = sg.recognizer_feed
+        f.base_feed = feed or sg.FEED_SIZE
+        f.adaptive = sg.FEED_ADAPTIVE if adaptive is None else adaptive
+        f.min_feed = min(sg.FEED_MIN, f.base_feed)
+        f.max_feed = max(sg.FEED_MAX, f.base_feed)
+
+    def reset(self):
+        sg.recognizer_feed.reset()
+        sg.recognizer, _ = sg.build_recognizer(sg.model, self.mode)
+        sg.vad.reset()
+        sg.scream.reset()
+        sg.incidents.close()     # clips are independent: no coalescing across them
+        sg.early.cancel()
+        self.queue.alerts = []
+        self.queue.audio_pos = 0.0
+
+    def run_clip(self, pcm):
+        """Replay one clip; returns alerts [(keyword, audio_s, armed_audio_s)], wall time and per-block ms."""
+        self.reset()
+        block_ms = []
+        bs = self.blocksize
+        base = self.now
+        t0 = time.perf_counter()
+        with self._quiet():
+            for i in range(0, len(pcm), bs):
+                block = pcm[i:i + bs]
+                if len(block) < bs:
+                    block = np.concatenate((block, np.zeros(bs - len(block), dtype=np.int16)))
+                self.queue.audio_pos = (i + bs) / sg.SAMPLE_RATE
+                self.now = base + self.queue.audio_pos      # the callback stamps the block with this
+                b0 = time.perf_counter()
+                sg.audio_callback(block.reshape(-1, 1), bs, None, None)
+                sg.recognizer_feed.pump()
+                block_ms.append((time.perf_counter() - b0) * 1000.0)
+            # end of clip: feed the tail, then flush like the VAD would when speech stops
+            sg.recognizer_feed.pump(flush=True)
+            text = json.loads(sg.recognizer.FinalResult()).get("text", "")
+            sg.on_final_text(text, self.now)
+        wall = time.perf_counter() - t0
+        self.vad_frames += sg.vad.total_frames
+        self.vad_fed += sg.vad.fed_frames
+        return {"alerts": list(self.queue.alerts), "wall_s": wall, "block_ms": block_ms}
+
+
+def evaluate(harness, clips, prep_ms=0.0):
+    tp = fp = fn = 0
+    audio_total = wall_total = 0.0
+    all_blocks = []
+    delays = []
+    dispatch = []           # keyword end -> dispatch, with the early trigger as run
+    dispatch_final = []     # same, if the prep work only started at the final result
+    prep_s = prep_ms / 1000.0
+    per_clip = []
+    for path, label, kw_time in clips:
+        pcm = read_wav(path)
+        res = harness.run_clip(pcm)
+        audio_s = len(pcm) / sg.SAMPLE_RATE
+        audio_total += audio_s
+        wall_total += res["wall_s"]
+        all_blocks.extend(res["block_ms"])
+        fired = [kw for kw, _, _ in res["alerts"]]
+        verdict = "-"
+        if label is not None:
+            if label:
+                hit = [(t, armed) for kw, t, armed in res["alerts"] if kw == label]
+                if hit:
+                    tp += 1
+                    verdict = "TP"
+                    if kw_time is not None:
+                        final, armed = hit[0]
+                        ready = final + prep_s if armed is None else max(final, armed + prep_s)
+                        delays.append(max(0.0, final - kw_time) * 1000.0)
+                        dispatch.append(max(0.0, ready - kw_time) * 1000.0)
+                        dispatch_final.append(max(0.0, final + prep_s - kw_time) * 1000.0)
+                else:
+                    fn += 1
+                    verdict = "FN"
+                fp += sum(1 for kw in fired if kw != label)
+            else:
+                fp += len(fired)
+                verdict = "FP" if fired else "TN"
+        per_clip.append({"clip": path, "label": label, "fired": fired, "verdict": verdict,
+                         "rtf": round(res["wall_s"] / audio_s, 4) if audio_s else None})
+        print(f"  {verdict:<3} {path}  fired={fired or '-'}  rtf={res['wall_s'] / max(audio_s, 1e-9):.3f}")
+
+    precision = tp / (tp + fp) if tp + fp else None
+    recall = tp / (tp + fn) if tp + fn else None
+    return {
+        "clips": len(clips),
+        "audio_s": round(audio_total, 2),
+        "wall_s": round(wall_total, 3),
+        "rtf": round(wall_total / audio_total, 4) if audio_total else None,
+        "block_ms": percentiles(all_blocks),
+        "detect_delay_ms": percentiles(delays),
+        "prep_ms": prep_ms,
+        "prep_ms_measured": False,      # assumed (--prep-ms): replay runs no camera
+        "dispatch_delay_ms": percentiles(dispatch),
+        "dispatch_delay_final_only_ms": percentiles(dispatch_final),
+        "early_trigger": sg.early.stats() if sg.EARLY_TRIGGER_ENABLED else None,
+        "scream": sg.scream.stats() if sg.SCREAM_ENABLED else None,
+        "precision": precision,
+        "recall": recall,
+        "tp": tp, "fp": fp, "fn": fn,
+        "vad_skipped_pct": (round(100.0 * (1 - harness.vad_fed / harness.vad_frames), 1)
+                            if sg.VAD_ENABLED and harness.vad_frames else None),
+        "peak_rss_mb": peak_rss_mb(),
+        "per_clip": per_clip,
+    }
+
+
+def print_report(r):
+    fmt = lambda v: "n/a" if v is None else (f"{v:.3f}" if isinstance(v, float) else str(v))
+    print(f"\nclips={r['clips']} audio={r['audio_s']}s wall={r['wall_s']}s RTF={fmt(r['rtf'])}")
+    b = r["block_ms"]
+    print(f"block latency ms: p50={fmt(b['p50'])} p90={fmt(b['p90'])} p99={fmt(b['p99'])}")
+    d = r["detect_delay_ms"]
+    if d["p50"] is not None:
+        print(f"detect delay ms (after keyword end): p50={fmt(d['p50'])} p90={fmt(d['p90'])} p99={fmt(d['p99'])}")
+        d, f = r["dispatch_delay_ms"], r["dispatch_delay_final_only_ms"]
+        print(f"detect-to-dispatch ms, modeled with an assumed {r['prep_ms']:.0f} ms snapshot prep (--prep-ms, "
+              f"not measured): p50={fmt(d['p50'])} p90={fmt(d['p90'])} "
+              f"| prep at final only: p50={fmt(f['p50'])} p90={fmt(f['p90'])}")
+    e = r["early_trigger"]
+    if e is not None:
+        print(f"early trigger: armed={e['armed']} confirmed={e['confirmed']} cancelled={e['cancelled']} "
+              f"expired={e['expired']}")
+    s = r["scream"]
+    if s is not None:
+        print(f"scream detector: detections={s['detections']} analysed={s['analysed']}/{s['frames']} frames "
+              f"cpu={s['cpu_ms_per_s']}ms per audio second")
+    print(f"precision={fmt(r['precision'])} recall={fmt(r['recall'])} (tp={r['tp']} fp={r['fp']} fn={r['fn']})")
+    if r["vad_skipped_pct"] is not None:
+        print(f"vad skipped={r['vad_skipped_pct']}%")
+    print(f"peak RSS={fmt(r['peak_rss_mb'])} MB")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay WAV clips through the StreetGuardian detection pipeline.")
+    ap.add_argument("paths", nargs="+", help="WAV files or directories of labeled clips")
+    ap.add_argument("--blocksize", type=int, default=sg.BLOCKSIZE, help="device block size (samples)")
+    ap.add_argument("--feed", type=int, default=sg.FEED_SIZE, help="recognizer feed size (samples)")
+    ap.add_argument("--fixed-feed", action="store_true", help="do not adapt the feed size")
+    ap.add_argument("--no-vad", action="store_true", help="feed every block to Vosk")
+    ap.add_argument("--mode", choices=("keyword", "free"), default=sg.RECOGNIZER_MODE,
+                    help="recognizer mode (default: RECOGNIZER_MODE)")
+    ap.add_argument("--no-early", action="store_true", help="disable the partial-result early trigger")
+    ap.add_argument("--no-scream", action="store_true", help="disable the scream detector")
+    ap.add_argument("--prep-ms", type=float, default=sg.BURST_WAIT * 1000.0 + sg.BURST_SCORE_BUDGET_MS,
+                    help="assumed snapshot work before an alert can go out, used to model "
+                         "detect-to-dispatch (default: burst wait + scoring budget)")
+    ap.add_argument("--json", help="also write the report to this file")
+    ap.add_argument("--verbose", action="store_true", help="show recognizer output")
+    args = ap.parse_args()
+
+    clips = discover(args.paths)
+    if not clips:
+        print("❌ No WAV clips found")
+        sys.exit(1)
+    harness = ReplayHarness(args.blocksize, use_vad=not args.no_vad, mode=args.mode, verbose=args.verbose,
+                            early=not args.no_early, feed=args.feed,
+                            adaptive=False if args.fixed_feed else None, scream=not args.no_scream)
+    print(f"Replaying {len(clips)} clip(s), blocksize={args.blocksize}, "
+          f"feed={args.feed}{' fixed' if args.fixed_feed else ''}, mode={args.mode}, "
+          f"vad={'off' if args.no_vad else 'on'}, early trigger={'off' if args.no_early else 'on'}, "
+          f"scream={'off' if args.no_scream else 'on'}")
+    report = evaluate(harness, clips, args.prep_ms)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print("Report written to", args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+scream_detector.py
+
+Cheap scream / distress detector, a trigger path next to the keyword
+recognizer.
+
+A victim may scream instead of saying a word. Screams are loud, high
+pitched (F0 roughly 300-1800 Hz, speech sits around 85-255 Hz), strongly
+harmonic and sustained. Per 32 ms frame:
+- loudness: frame level against a slowly tracked background level; only
+  frames that spike above it get any further work (quiet streets, and
+  steady noise once it is tracked, cost one mean per frame)
+- pitch / voicing: highest normalized autocorrelation peak past the first
+  zero crossing (60 Hz and up), from the same rfft as the flatness (irfft of
+  the power spectrum); the pitch it gives must be in the scream F0 range
+- spectral flatness in 300-4000 Hz: low for tonal screams, high for broadband
+  noise bursts (traffic, wind, bangs, rain on the enclosure)
+Frames passing all three form runs (short gaps tolerated); a run that lasts
+`min_seconds` with a high enough mean score fires once, with that score as
+the confidence, then the detector holds off for `cooldown` seconds.
+"""
+
+import time
+
+import numpy as np
+
+_FULL_SCALE_SQ = 32768.0 ** 2
+
+
+class ScreamDetector:
+    def __init__(self, sample_rate=16000, frame=512, min_level_db=-35.0, rise_db=12.0,
+                 f0_range=(300.0, 1800.0), min_voicing=0.5, max_flatness=0.35, min_seconds=0.4,
+                 max_gap_frames=2, threshold=0.6, cooldown=10.0, background_adapt=0.02):
+        self.sample_rate = sample_rate
+        self.frame = frame
+        self.min_level_db = min_level_db
+        self.rise_db = rise_db
+        self.min_voicing = min_voicing
+        self.max_flatness = max_flatness
+        self.min_frames = max(1, int(round(min_seconds * sample_rate / frame)))
+        self.max_gap_frames = max_gap_frames
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.background_adapt = background_adapt
+        self._window = np.hanning(frame).astype(np.float32)
+        freqs = np.fft.rfftfreq(frame, 1.0 / sample_rate)
+        self._band = (freqs >= 300.0) & (freqs <= 4000.0)
+        self.f0_range = f0_range
+        self._lag_hi = min(frame // 2, int(sample_rate / 60.0))
+        self._lags = np.arange(self._lag_hi)
+        self.reset()
+        self.frames = 0
+        self.analysed = 0
+        self.detections = 0
+        self.cpu_s = 0.0
+        self.audio_s = 0.0
+        self.last = None            # (confidence, f0_hz) of the last detection
+
+    def reset(self):
+        """Forget the stream state (not the counters), e.g. between independent clips."""
+        self.background_db = self.min_level_db - self.rise_db
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._run = 0
+        self._gap = 0
+        self._score_sum = 0.0
+        self._run_start = None
+        self._fired = False
+        self._last_fire = None
+
+    def _features(self, frames):
+        """(voicing, f0_hz, flatness) for loud frames [n, frame]."""
+        power = np.abs(np.fft.rfft(frames * self._window, axis=1)) ** 2 + 1e-6
+        band = power[:, self._band]
+        flatness = np.exp(np.mean(np.log(band), axis=1)) / np.mean(band, axis=1)
+        ac = np.fft.irfft(power, axis=1)[:, :self._lag_hi]
+        # skip the main lobe around lag 0: search from the first negative lag on
+        first = np.argmax(ac < 0, axis=1)
+        first[first == 0] = self._lag_hi
+        lags = np.where(self._lags[None, :] >= first[:, None], ac, -np.inf)
+        peak = np.argmax(lags, axis=1)
+        voicing = np.maximum(lags[np.arange(len(lags)), peak], 0.0) / ac[:, 0]
+        f0 = self.sample_rate / np.maximum(peak, 1)
+        return voicing, f0, flatness
+
+    def process(self, pcm, ts=None):
+        """
+        Feed int16 audio (any shape) whose last sample is at monotonic time ts.
+        Returns (confidence, start_ts) when a scream run completes, else None.
+        """
+        t0 = time.thread_time()
+        ts = time.monotonic() if ts is None else ts
+        x = np.asarray(pcm).reshape(-1).astype(np.float32)
+        self.audio_s += len(x) / float(self.sample_rate)
+        if self._carry.size:
+            x = np.concatenate((self._carry, x))
+        n = len(x) // self.frame
+        self._carry = x[n * self.frame:].copy()
+        if n == 0:
+            self.cpu_s += time.thread_time() - t0
+            return None
+        frames = x[:n * self.frame].reshape(n, self.frame)
+        self.frames += n
+        level = 10.0 * np.log10(np.mean(frames * frames, axis=1) / _FULL_SCALE_SQ + 1e-10)
+        loud = (level > self.min_level_db) & (level > self.background_db + self.rise_db)
+        # background follows drops at once and rises slowly: a scream barely
+        # lifts it, steady loud noise (a generator, rain) becomes background
+        lvl = float(np.mean(level))
+        if lvl < self.background_db:
+            self.background_db = lvl
+        else:
+            self.background_db += self.background_adapt * (lvl - self.background_db)
+
+        score = np.zeros(n)
+        screamy = np.zeros(n, dtype=bool)
+        f0 = np.zeros(n)
+        if loud.any():
+            idx = np.flatnonzero(loud)
+            self.analysed += len(idx)
+            voicing, f0[idx], flatness = self._features(frames[idx])
+            lo, hi = self.f0_range
+            ok = ((voicing >= self.min_voicing) & (flatness <= self.max_flatness)
+                  & (f0[idx] >= lo) & (f0[idx] <= hi))
+            # each term is 0.5 right at its threshold and 1.0 for a clear scream
+            s_loud = np.clip(0.5 + (level[idx] - self.background_db - self.rise_db) / 36.0, 0.0, 1.0)
+            s_voice = np.clip(0.5 + 0.5 * (voicing - self.min_voicing) / (1.0 - self.min_voicing), 0.0, 1.0)
+            s_tonal = np.clip(1.0 - 0.5 * flatness / self.max_flatness, 0.0, 1.0)
+            screamy[idx] = ok
+            score[idx] = (s_loud + s_voice + s_tonal) / 3.0
+
+        # frame k ends (n - 1 - k) frames + the carried samples before ts
+        frame_s = self.frame / float(self.sample_rate)
+        end_ts = ts - len(self._carry) / float(self.sample_rate)
+        hit = None
+        for k in range(n):
+            if screamy[k]:
+                if self._run == 0:
+                    self._run_start = end_ts - (n - k) * frame_s
+                    self._fired = False
+                self._run += 1
+                self._gap = 0
+                self._score_sum += score[k]
+            elif self._run:
+                self._gap += 1
+                if self._gap > self.max_gap_frames:
+                    self._run = 0
+                    self._score_sum = 0.0
+            if self._run >= self.min_frames and not self._fired and hit is None:
+                at = end_ts - (n - 1 - k) * frame_s
+                confidence = self._score_sum / self._run
+                cooling = self._last_fire is not None and at - self._last_fire < self.cooldown
+                if confidence >= self.threshold and not cooling:
+                    self._fired = True
+                    self._last_fire = at
+                    self.detections += 1
+                    self.last = (round(float(confidence), 2), round(float(f0[k])))
+                    hit = (float(confidence), self._run_start)
+        self.cpu_s += time.thread_time() - t0
+        return hit
+
+    def cpu_ms_per_s(self):
+        return 1000.0 * self.cpu_s / self.audio_s if self.audio_s else 0.0
+
+    def stats(self):
+        return {"detections": self.detections, "frames": self.frames, "analysed": self.analysed,
+                "background_db": round(self.background_db, 1), "last": self.last,
+                "cpu_ms_per_s": round(self.cpu_ms_per_s(), 3)}
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+scream_eval.py
+
+Precision / recall and CPU cost of the scream detector (scream_detector.py)
+on labeled clips, for a sweep of confidence thresholds. Only the detector
+runs (no recognizer), in recognizer-feed sized chunks like on the device.
+
+Clips are labeled as for replay.py: clips/scream/*.wav must fire, every
+other labeled clip (clips/none/, keyword clips, ...) must not. Unlabeled
+clips are skipped.
+
+Usage:
+    python scream_eval.py clips/ [--chunk 3200] [--thresholds 0.5,0.6,0.7,0.8]
+"""
+
+import argparse
+import sys
+
+import replay
+import street_guardian as sg
+from scream_detector import ScreamDetector
+
+
+def run_clip(pcm, threshold, chunk):
+    d = ScreamDetector(sg.SAMPLE_RATE, min_level_db=sg.SCREAM_LEVEL_DB, rise_db=sg.SCREAM_RISE_DB,
+                       min_seconds=sg.SCREAM_MIN_SECONDS, threshold=threshold, cooldown=sg.SCREAM_COOLDOWN)
+    hits = []
+    for i in range(0, len(pcm), chunk):
+        hit = d.process(pcm[i:i + chunk], (i + chunk) / float(sg.SAMPLE_RATE))
+        if hit is not None:
+            hits.append(hit)
+    return hits, d
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Scream detector precision / recall / CPU on labeled clips.")
+    ap.add_argument("paths", nargs="+")
+    ap.add_argument("--chunk", type=int, default=sg.FEED_SIZE, help="samples per detector call")
+    ap.add_argument("--thresholds", default="0.5,0.6,0.7,0.8")
+    ap.add_argument("--verbose", action="store_true", help="list every clip at the configured threshold")
+    args = ap.parse_args()
+
+    clips = [(path, label) for path, label, _ in replay.discover(args.paths) if label is not None]
+    if not clips:
+        print("❌ No labeled WAV clips found")
+        sys.exit(1)
+    audio = [(path, label == sg.SCREAM_LABEL, replay.read_wav(path)) for path, label in clips]
+    print(f"{len(audio)} clip(s): {sum(pos for _, pos, _ in audio)} scream, "
+          f"{sum(not pos for _, pos, _ in audio)} other, chunk={args.chunk}\n")
+
+    print(f"{'threshold':>9} {'tp':>4} {'fp':>4} {'fn':>4} {'precision':>10} {'recall':>7} {'cpu ms/s':>9}")
+    for threshold in [float(t) for t in args.thresholds.split(",")]:
+        tp = fp = fn = 0
+        cpu_s = audio_s = 0.0
+        for path, positive, pcm in audio:
+            hits, d = run_clip(pcm, threshold, args.chunk)
+            cpu_s += d.cpu_s
+            audio_s += d.audio_s
+            if positive:
+                tp += bool(hits)
+                fn += not hits
+            else:
+                fp += len(hits)
+            if args.verbose and threshold == sg.SCREAM_THRESHOLD:
+                fired = ", ".join(f"{c:.2f}@{t:.1f}s" for c, t in hits) or "-"
+                print(f"    {'scream' if positive else 'other':<6} {path}  fired={fired}")
+        precision = tp / (tp + fp) if tp + fp else float("nan")
+        recall = tp / (tp + fn) if tp + fn else float("nan")
+        cpu = 1000.0 * cpu_s / audio_s if audio_s else 0.0
+        mark = "  <- SCREAM_THRESHOLD" if threshold == sg.SCREAM_THRESHOLD else ""
+        print(f"{threshold:>9.2f} {tp:>4} {fp:>4} {fn:>4} {precision:>10.3f} {recall:>7.3f} {cpu:>9.3f}{mark}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,24 @@
-import base64
-import json
-from firebase_admin import messaging, credentials, initialize_app
+import sys
+from firebase_admin import credentials, initialize_app
 from upload_image import upload_to_imgbb
+from senders import fcm_payload
+from fcm_delivery import FcmDelivery, targets
 
 cred = credentials.Certificate("serviceAccountKey.json")
 initialize_app(cred)
 
-# FCM Topic
+# FCM Topic; extra topics / device tokens from the command line:
+#   python send_test_fcm.py [topic:police_zone_b] [token:<device token>] ...
 TOPIC = "police_zone_a"
 
-def send_emergency(keyword, image_path):
+def parse_targets(args):
+    topics, tokens = [TOPIC], []
+    for a in args:
+        kind, _, name = a.partition(":")
+        (tokens if kind == "token" else topics).append(name if name else kind)
+    return targets(topics, tokens)
+
+def send_emergency(keyword, image_path, to):
     # Upload image
     image_url = upload_to_imgbb(image_path)
 
@@ -17,26 +26,13 @@ def send_emergency(keyword, image_path):
         print("❌ No image URL, aborting FCM send.")
         return
 
-    # ---- FIX: High-priority, data-only message ----
-    message = messaging.Message(
-        topic=TOPIC,
-        data={
-            "keyword": keyword.upper(),
-            "location": "Police Zone A",
-            "image": image_url,
-            "time": "Now"
-        },
-        android=messaging.AndroidConfig(
-            priority="high",   # 🔥 Forces wake-up even if app is closed
-        )
-    )
-
-    try:
-        response = messaging.send(message)
-        print("🚨 Emergency alert sent:", response)
-    except Exception as e:
-        print("❌ FCM send failed:", e)
+    # High-priority, data-only message to every target in one send_each batch
+    data = fcm_payload(keyword.upper(), image_url, "Police Zone A", "Now")
+    result = FcmDelivery().send(data, to)
+    print("🚨 Emergency alert:", result.summary())
+    for r in result.results:
+        print(f"   {r.target[0]}:{r.target[1]} -> {'ok' if r.ok else r.error} (x{r.attempts})")
 
 
 # Test send
-send_emergency("HELP", "snapshot.jpg")
+send_emergency("HELP", "snapshot.jpg", parse_targets(sys.argv[1:]))
@@ -0,0 +1,192 @@
+"""
+sender_stub_test.py
+
+Exercise the pooled sender layer (senders.py) against local stub HTTP
+servers instead of the real Telegram / imgbb APIs:
+  - keep-alive: many alerts reuse one pooled connection
+  - warm-up: getMe / HEAD pings open the connection before the first alert
+  - warm vs cold: with connection setup made slow (a stand-in for the TLS
+    handshake), the first alert on a warmed pool is as fast as the median
+    one, while the first alert on a cold pool pays the setup
+  - retries: 503 with Retry-After is retried, a 503 without it or a 502 is
+    not (an alert POST must never be sent twice)
+  - multipart: the JPEG arrives as a file part of sendPhoto
+
+start_stub() is also the Telegram / imgbb stand-in of hub_loadtest.py.
+
+Usage:
+    python -m pytest -q sender_stub_test.py
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from senders import SenderPool, TelegramSender, ImgbbUploader
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"     # keep-alive
+    disable_nagle_algorithm = True    # headers and body are separate writes: no 40 ms delayed-ACK stall
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+        time.sleep(self.server.connect_delay)
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, code, obj, headers=()):
+        body = json.dumps(obj).encode()
+        self.send_response(code)
+        for k, v in headers:
+            self.send_header(k, v)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.server.hits.append(("HEAD", self.path))
+        self._reply(200, {})
+
+    def do_GET(self):
+        self.server.hits.append(("GET", self.path))
+        self._reply(200, {"ok": True, "result": {"username": "stub_bot"}})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.hits.append(("POST", self.path))
+        if self.server.fail_next > 0:
+            self.server.fail_next -= 1
+            retry_after = self.server.fail_retry_after
+            self._reply(self.server.fail_status, {"ok": False},
+                        () if retry_after is None else (("Retry-After", retry_after),))
+            return
+        if self.path.endswith("/upload"):
+            self._reply(200, {"success": True, "data": {"url": "http://stub/image.jpg"}})
+            return
+        ctype = self.headers.get("Content-Type", "")
+        self.server.last_multipart = ctype.startswith("multipart/form-data") and b"image/jpeg" in body
+        self.server.last_body = body
+        self.server.message_id += 1
+        self._reply(200, {"ok": True, "result": {"message_id": self.server.message_id}})
+
+
+def start_stub():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    srv.connections = 0
+    srv.hits = []
+    srv.fail_next = 0
+    srv.fail_status = 503
+    srv.fail_retry_after = "0"     # None: no Retry-After header
+    srv.connect_delay = 0.0
+    srv.last_multipart = False
+    srv.last_body = b""
+    srv.message_id = 0
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+SETUP_S = 0.15         # stub connection setup, a stand-in for the TLS handshake
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 2048 + b"\xff\xd9"
+CAPTION = TelegramSender.caption("HELP", "Stub Zone", "now")
+
+
+@pytest.fixture(scope="module")
+def stubs():
+    tg_srv, img_srv = start_stub(), start_stub()
+    tg_srv.connect_delay = SETUP_S
+    tg_base = f"http://127.0.0.1:{tg_srv.server_port}/botTEST"
+    pool = SenderPool(pool_size=2, retries=2, backoff=0.05, warm_interval=0.2)
+    telegram = TelegramSender(tg_base, "42", pool)
+    imgbb = ImgbbUploader(f"http://127.0.0.1:{img_srv.server_port}/1/upload", "KEY", pool)
+    pool.add_warmup("telegram", telegram.warmup_url())
+    pool.add_warmup("imgbb", imgbb.warmup_url(), method="HEAD")
+    pool.start_keepalive()
+    time.sleep(0.5)
+    yield tg_srv, img_srv, tg_base, pool, telegram, imgbb
+    pool.stop()
+    tg_srv.shutdown()
+    img_srv.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def healthy(stubs):
+    for srv in stubs[:2]:
+        srv.fail_next, srv.fail_status, srv.fail_retry_after = 0, 503, "0"
+
+
+def test_keepalive_pings_reach_both_hosts(stubs):
+    tg_srv, img_srv = stubs[:2]
+    assert ("GET", "/botTEST/getMe") in tg_srv.hits
+    assert any(m == "HEAD" for m, _ in img_srv.hits)
+
+
+def test_warm_pool_skips_connection_setup(stubs):
+    tg_srv, _, tg_base, _, telegram, _ = stubs
+    cold_pool = SenderPool(pool_size=2, retries=2, backoff=0.05)
+    t0 = time.perf_counter()
+    TelegramSender(tg_base, "42", cold_pool).send_photo(JPEG, CAPTION, timeout=5)
+    cold_ms = (time.perf_counter() - t0) * 1000.0
+    cold_pool.stop()
+    conns = tg_srv.connections
+    lat = []
+    for _ in range(20):
+        t0 = time.perf_counter()
+        assert telegram.send_photo(JPEG, CAPTION, timeout=5)
+        lat.append((time.perf_counter() - t0) * 1000.0)
+    median = sorted(lat)[len(lat) // 2]
+    assert tg_srv.last_multipart                        # the JPEG went as a file part
+    assert tg_srv.connections - conns <= 2              # keep-alive
+    assert cold_ms >= SETUP_S * 1000.0                  # a cold pool pays the setup...
+    assert lat[0] < median + SETUP_S * 1000.0 / 2       # ...a warmed one does not
+
+
+def test_send_photo_returns_message_id_and_edits_caption(stubs):
+    tg_srv, telegram = stubs[0], stubs[4]
+    mid = telegram.send_photo(JPEG, CAPTION, timeout=5)
+    assert mid == tg_srv.message_id
+    assert telegram.edit(mid, CAPTION + "\n3 hits", kind="photo", timeout=5)
+    assert ("POST", "/botTEST/editMessageCaption") in tg_srv.hits
+    assert parse_qs(tg_srv.last_body.decode()).get("caption", [""])[0].endswith("3 hits")
+
+
+def test_upload_retried_through_503_with_retry_after(stubs):
+    img_srv, imgbb = stubs[1], stubs[5]
+    img_srv.fail_next = 2
+    assert imgbb.upload(JPEG, timeout=5) == "http://stub/image.jpg"
+
+
+def test_gives_up_after_the_retry_budget(stubs):
+    tg_srv, telegram = stubs[0], stubs[4]
+    tg_srv.fail_next = 5
+    assert not telegram.send_photo(JPEG, CAPTION, timeout=5, fallback=False)
+
+
+@pytest.mark.parametrize("status,retry_after", [(503, None), (502, "0"), (504, None)])
+def test_alert_post_is_not_retried(stubs, status, retry_after):
+    tg_srv, telegram = stubs[0], stubs[4]
+    tg_srv.fail_next, tg_srv.fail_status, tg_srv.fail_retry_after = 1, status, retry_after
+    before = tg_srv.hits.count(("POST", "/botTEST/sendPhoto"))
+    assert not telegram.send_photo(JPEG, CAPTION, timeout=5, fallback=False)
+    assert tg_srv.hits.count(("POST", "/botTEST/sendPhoto")) - before == 1
+
+
+def test_send_text(stubs):
+    tg_srv, pool, telegram = stubs[0], stubs[3], stubs[4]
+    assert telegram.send_text("plain text alert", timeout=5) == tg_srv.message_id
+    tg_srv.fail_next, tg_srv.fail_status = 1, 400
+    assert telegram.send_text("x", timeout=5) is False
+    assert TelegramSender("http://127.0.0.1:9/bot", "42", pool).send_text("x", timeout=1) is False
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main(["-q", __file__]))
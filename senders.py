@@ -0,0 +1,369 @@
+"""
+senders.py
+
+Shared HTTP sender layer for alerts.
+
+SenderPool keeps one keep-alive requests.Session per API with a small
+connection pool and a retry/backoff policy, and pings each API
+periodically (Telegram getMe, a HEAD to imgbb) so the TCP + TLS
+connection is already open when an alert fires. The first alert after
+hours of idle then goes out as fast as the hundredth.
+
+TelegramSender and ImgbbUploader hold the Telegram / imgbb request logic;
+all URLs come from the constructor, so the whole layer can be pointed at
+local stub servers (see sender_stub_test.py). HubClient posts alerts to a
+StreetGuardian hub (hub.py) instead of Telegram / FCM.
+"""
+
+import base64
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class _AlertRetry(Retry):
+    """
+    Retry policy that never sends an alert twice: a POST (sendPhoto, imgbb
+    upload, hub event) is not idempotent, and a 502 / 504 from a proxy does not
+    mean the upstream did not get it. POSTs retry only on connection errors
+    (nothing was sent) and on 429 / 503 that carry Retry-After (the server
+    says it rejected the request without processing it). Other methods
+    (keep-alive pings) also retry on 502 / 504.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method.upper() == "POST":
+            return bool(self.total and self.respect_retry_after_header and has_retry_after
+                        and status_code in (429, 503))
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class SenderPool:
+    def __init__(self, pool_size=4, retries=2, backoff=0.3, warm_interval=50.0):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.warm_interval = warm_interval
+        self._sessions = {}
+        self._warm = []             # [(name, method, url)]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.ping_stats = {}        # name -> {"ok", "failed", "last_ms"}
+
+    def _retry(self):
+        # read errors are never retried: the request may have been processed
+        return _AlertRetry(total=self.retries, connect=self.retries, read=0, status=self.retries,
+                     backoff_factor=self.backoff, status_forcelist=(429, 502, 503, 504),
+                     allowed_methods=None, respect_retry_after_header=True,
+                     raise_on_status=False)
+
+    def session(self, url):
+        """Keep-alive session for the scheme+host of url."""
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            s = self._sessions.get(key)
+            if s is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size,
+                                      max_retries=self._retry())
+                s.mount(key, adapter)
+                self._sessions[key] = s
+            return s
+
+    def post(self, url, **kwargs):
+        return self.session(url).post(url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.session(url).get(url, **kwargs)
+
+    # ---------- warm-up ----------
+
+    def add_warmup(self, name, url, method="GET"):
+        self._warm.append((name, method, url))
+        self.ping_stats[name] = {"ok": 0, "failed": 0, "last_ms": None}
+
+    def warm(self, timeout=5.0):
+        """Ping every warm-up URL once (opens / refreshes the pooled connection)."""
+        for name, method, url in self._warm:
+            t0 = time.perf_counter()
+            try:
+                self.session(url).request(method, url, timeout=timeout)
+                self.ping_stats[name]["ok"] += 1
+            except Exception:
+                self.ping_stats[name]["failed"] += 1
+            self.ping_stats[name]["last_ms"] = round((time.perf_counter() - t0) * 1000.0, 1)
+
+    def start_keepalive(self, warm_now=True):
+        if self._thread is not None or not self._warm:
+            return self
+        self._stop.clear()
+
+        def _run():
+            if not warm_now:
+                self._stop.wait(self.warm_interval)
+            while not self._stop.is_set():
+                self.warm()
+                self._stop.wait(self.warm_interval)
+
+        self._thread = threading.Thread(target=_run, name="http-keepalive", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+        with self._lock:
+            for s in self._sessions.values():
+                s.close()
+            self._sessions = {}
+
+
+def fcm_payload(keyword, image_url, location, timestamp, extra=None):
+    """Data payload of an alert FCM message (all values are strings)."""
+    data = {
+        "keyword": keyword,
+        "image": image_url or "",
+        "location": location,
+        "time": timestamp,
+        "type": "street_guardian_alert"
+    }
+    if extra:
+        data.update({k: str(v) for k, v in extra.items()})
+    return data
+
+
+class TelegramRejected(Exception):
+    """Telegram refused the request itself (4xx other than 429): sending it again cannot help."""
+
+    def __init__(self, code, description):
+        super().__init__(f"Telegram {code}: {description}")
+        self.code = code
+
+
+def _check_rejected(resp, j):
+    code = j.get("error_code") or resp.status_code
+    if isinstance(code, int) and 400 <= code < 500 and code != 429:
+        raise TelegramRejected(code, j.get("description", ""))
+
+
+def _message_id(j):
+    """message_id of a successful Telegram send (truthy), or False."""
+    if not j.get("ok"):
+        return False
+    result = j.get("result")
+    return result.get("message_id", True) if isinstance(result, dict) else True
+
+
+class TelegramSender:
+    """
+    Send methods return the Telegram message_id (truthy) on success, False
+    otherwise. With raise_rejected=True the photo sends raise TelegramRejected
+    instead when Telegram turns the request down for good (bad chat, photo or
+    caption), so a retrying caller knows not to repeat it.
+    """
+
+    def __init__(self, api, chat_id, pool):
+        self.api = api.rstrip("/")
+        self.chat_id = chat_id
+        self.pool = pool
+
+    @staticmethod
+    def caption(keyword, location, timestamp):
+        return f"<b>ALERT</b>\nKeyword: {keyword}\nLocation: {location}\nTime: {timestamp}"
+
+    def warmup_url(self):
+        return f"{self.api}/getMe"
+
+    def send_text(self, text, timeout=10):
+        try:
+            resp = self.pool.post(f"{self.api}/sendMessage",
+                                  data={"chat_id": self.chat_id, "text": text, "parse_mode": "HTML"},
+                                  timeout=timeout)
+            j = resp.json()
+            if j.get("ok"):
+                print("✅ Telegram message sent")
+                return _message_id(j)
+            print("❌ Telegram message failed:", j)
+            return False
+        except Exception as e:
+            print("❌ Telegram message exception:", e)
+            return False
+
+    def send_photo_url(self, image_url, caption, timeout=15, fallback=True, raise_rejected=False):
+        try:
+            resp = self.pool.post(f"{self.api}/sendPhoto",
+                                  data={"chat_id": self.chat_id, "photo": image_url, "caption": caption,
+                                        "parse_mode": "HTML"},
+                                  timeout=timeout)
+            j = resp.json()
+            if j.get("ok"):
+                print("✅ Telegram photo sent")
+                return _message_id(j)
+            print("❌ Telegram photo failed:", j)
+            if fallback:
+                self.send_text(caption + ("\n\nImage: " + image_url if image_url else ""))
+            elif raise_rejected:
+                _check_rejected(resp, j)
+            return False
+        except TelegramRejected:
+            raise
+        except Exception as e:
+            print("❌ Telegram send exception:", e)
+            return False
+
+    def send_photo(self, jpeg, caption, timeout=15, fallback=True, raise_rejected=False):
+        """sendPhoto with the JPEG bytes as a multipart upload."""
+        try:
+            if jpeg is None:
+                if fallback:
+                    self.send_text(caption)
+                return False
+            resp = self.pool.post(f"{self.api}/sendPhoto",
+                                  data={"chat_id": self.chat_id, "caption": caption, "parse_mode": "HTML"},
+                                  files={"photo": ("snapshot.jpg", jpeg, "image/jpeg")},
+                                  timeout=timeout)
+            j = resp.json()
+            if j.get("ok"):
+                print("✅ Telegram photo sent")
+                return _message_id(j)
+            print("❌ Telegram photo failed:", j)
+            if fallback:
+                self.send_text(caption)
+            elif raise_rejected:
+                _check_rejected(resp, j)
+            return False
+        except TelegramRejected:
+            raise
+        except Exception as e:
+            print("❌ Telegram send exception:", e)
+            return False
+
+    def edit(self, message_id, text, kind="photo", timeout=10):
+        """Replace the caption (photo) or text (text message) of a sent message."""
+        method, field = ("editMessageCaption", "caption") if kind == "photo" else ("editMessageText", "text")
+        try:
+            resp = self.pool.post(f"{self.api}/{method}",
+                                  data={"chat_id": self.chat_id, "message_id": message_id, field: text,
+                                        "parse_mode": "HTML"},
+                                  timeout=timeout)
+            j = resp.json()
+            if j.get("ok") or "not modified" in str(j.get("description", "")):
+                return True
+            print(f"❌ Telegram {method} failed:", j)
+            return False
+        except Exception as e:
+            print(f"❌ Telegram {method} exception:", e)
+            return False
+
+    def send_document(self, data, filename, caption, mime="audio/wav", timeout=30):
+        """sendDocument with the file bytes as a multipart upload (audio clips)."""
+        try:
+            resp = self.pool.post(f"{self.api}/sendDocument",
+                                  data={"chat_id": self.chat_id, "caption": caption, "parse_mode": "HTML"},
+                                  files={"document": (filename, data, mime)},
+                                  timeout=timeout)
+            j = resp.json()
+            if j.get("ok"):
+                print("✅ Telegram document sent:", filename)
+                return _message_id(j)
+            print("❌ Telegram document failed:", j)
+            return False
+        except Exception as e:
+            print("❌ Telegram document exception:", e)
+            return False
+
+
+class ImgbbUploader:
+    def __init__(self, upload_url, api_key, pool):
+        self.upload_url = upload_url
+        self.api_key = api_key
+        self.pool = pool
+
+    def warmup_url(self):
+        parts = urlsplit(self.upload_url)
+        return f"{parts.scheme}://{parts.netloc}/"
+
+    def upload(self, image, timeout=30):
+        """Upload JPEG bytes (or a local image path), return public url or ''"""
+        if isinstance(image, str):
+            try:
+                with open(image, "rb") as f:
+                    image = f.read()
+            except Exception as e:
+                print("❌ Could not open snapshot:", e)
+                return ""
+        payload = {
+            "key": self.api_key,
+            "image": base64.b64encode(image).decode("utf-8")
+        }
+        try:
+            r = self.pool.post(self.upload_url, data=payload, timeout=timeout)
+            res = r.json()
+            if res.get("success"):
+                url = res["data"]["url"]
+                print("✅ Uploaded to imgbb:", url)
+                return url
+            else:
+                print("❌ imgbb response error:", res)
+                return ""
+        except Exception as e:
+            print("❌ imgbb upload failed:", e)
+            return ""
+
+
+class HubClient:
+    """Edge side of hub.py: compact JSON alert event, then the JPEG evidence."""
+
+    def __init__(self, base_url, device, zone, pool, token="", latlon=None):
+        self.base_url = base_url.rstrip("/")
+        self.device = device
+        self.zone = zone
+        self.pool = pool
+        self.token = token
+        self.latlon = latlon        # (lat, lon): lets the hub merge nearby units by position
+
+    def _headers(self, ctype):
+        h = {"Content-Type": ctype}
+        if self.token:
+            h["X-SG-Token"] = self.token
+        return h
+
+    def warmup_url(self):
+        return f"{self.base_url}/health"
+
+    def send_alert(self, keyword, location, timestamp, jpeg=None, incident="", timeout=10):
+        """
+        Post the event, then the evidence if any; returns the hub's incident id,
+        or False if either was not taken (the outbox then sends both again).
+        """
+        event = {"device": self.device, "zone": self.zone, "keyword": keyword,
+                 "location": location, "time": timestamp, "incident": incident}
+        if self.latlon is not None:
+            event["lat"], event["lon"] = self.latlon
+        try:
+            r = self.pool.post(f"{self.base_url}/alert", data=json.dumps(event, separators=(",", ":")),
+                               headers=self._headers("application/json"), timeout=timeout)
+            if r.status_code != 200:
+                print("❌ Hub rejected alert:", r.status_code, r.text[:200])
+                return False
+            j = r.json()
+            print(f"✅ Hub alert accepted (incident {j['incident']}{', new' if j.get('new') else ''})")
+            if jpeg is not None:
+                r = self.pool.post(f"{self.base_url}/evidence/{j['event']}", data=bytes(jpeg),
+                                   headers=self._headers("image/jpeg"), timeout=timeout)
+                if r.status_code != 200:
+                    print("❌ Hub rejected evidence:", r.status_code, r.text[:200])
+                    return False
+            return j["incident"]
+        except Exception as e:
+            print("❌ Hub send failed:", e)
+            return False
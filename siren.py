@@ -0,0 +1,211 @@
+"""
+siren.py
+
+Gapless looping siren through a callback-driven sounddevice.OutputStream.
+
+The WAV is decoded once (prepare(), at startup) into an int16 NumPy buffer;
+if it is missing or unreadable a compact two-tone wail is synthesized
+instead. The output stream is opened up front and left stopped, so
+start() only resets the play position and starts the stream (a few ms),
+and stop() aborts it, dropping whatever is still buffered, so the siren
+goes quiet immediately. The callback copies straight out of the buffer
+and wraps around, so the loop point has no gap.
+"""
+
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+
+_PCM = 1
+_FLOAT = 3
+_EXTENSIBLE = 0xFFFE
+
+
+def _read_riff(path):
+    """(format tag, channels, rate, bytes per sample, data) from the fmt / data chunks."""
+    with open(path, "rb") as f:
+        blob = f.read()
+    if blob[:4] != b"RIFF" or blob[8:12] != b"WAVE":
+        raise ValueError(f"{path}: not a RIFF/WAVE file")
+    fmt = data = None
+    pos = 12
+    while pos + 8 <= len(blob):
+        cid, size = blob[pos:pos + 4], struct.unpack("<I", blob[pos + 4:pos + 8])[0]
+        body = blob[pos + 8:pos + 8 + size]
+        if cid == b"fmt ":
+            fmt = body
+        elif cid == b"data":
+            data = body
+        pos += 8 + size + (size & 1)        # chunks are word aligned
+    if fmt is None or data is None:
+        raise ValueError(f"{path}: missing fmt or data chunk")
+    tag, channels, rate, _, align, _ = struct.unpack("<HHIIHH", fmt[:16])
+    if tag == _EXTENSIBLE:
+        # WAVE_FORMAT_EXTENSIBLE: the real format is the first 2 bytes of the sub-format GUID
+        tag = struct.unpack("<H", fmt[24:26])[0]
+    width = align // channels
+    return tag, channels, rate, width, data[:len(data) - len(data) % align]
+
+
+def decode_wav(path):
+    """
+    (int16 array [frames, channels], samplerate) for a PCM (8/16/24/32-bit)
+    or 32-bit float WAV, plain or WAVE_FORMAT_EXTENSIBLE (which the stdlib
+    wave module cannot open).
+    """
+    tag, channels, rate, width, raw = _read_riff(path)
+    if tag == _FLOAT and width == 4:
+        pcm = np.clip(np.frombuffer(raw, dtype="<f4") * 32767.0, -32768, 32767).astype(np.int16)
+        return pcm.reshape(-1, channels), rate
+    if tag != _PCM:
+        raise ValueError(f"unsupported WAV format tag {tag:#x}")
+    if width == 1:
+        pcm = ((np.frombuffer(raw, dtype=np.uint8).astype(np.int16) - 128) << 8)
+    elif width == 2:
+        pcm = np.frombuffer(raw, dtype="<i2")
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        pcm = (b[:, 1].astype(np.int16) | (b[:, 2].astype(np.int8).astype(np.int16) << 8))
+    elif width == 4:
+        pcm = (np.frombuffer(raw, dtype="<i4") >> 16).astype(np.int16)
+    else:
+        raise ValueError(f"unsupported sample width {width}")
+    return pcm.reshape(-1, channels), rate
+
+
+def synthesize(samplerate=22050, seconds=2.0, low=650.0, high=1350.0):
+    """One wail period (low -> high -> low), phase-continuous across the loop point."""
+    n = int(samplerate * seconds)
+    t = np.arange(n + 1) / (n + 1)
+    freq = low + (high - low) * (1.0 - np.abs(2.0 * t - 1.0))
+    phase = np.cumsum(freq) * (2.0 * np.pi / samplerate)
+    # stretch so sample n (= the next loop's sample 0) lands on a whole cycle
+    cycles = max(1, round(phase[-1] / (2.0 * np.pi)))
+    phase *= cycles * 2.0 * np.pi / phase[-1]
+    wav = np.sin(phase[:n]) + 0.25 * np.sin(3.0 * phase[:n])     # a little edge
+    wav *= 32767.0 / np.max(np.abs(wav))
+    return wav.astype(np.int16).reshape(-1, 1), samplerate
+
+
+class SirenEngine:
+    def __init__(self, path=None, volume=0.8, blocksize=1024, synth_fallback=True):
+        self.path = path
+        self.volume = volume
+        self.blocksize = blocksize
+        self.synth_fallback = synth_fallback
+        self.source = None          # "file" | "synth" | None
+        self.samplerate = None
+        self._buf = None
+        self._pos = 0
+        self._active = False
+        self._stream = None
+        self._lock = threading.Lock()
+        self.starts = 0
+        self.underflows = 0
+        self.last_start_ms = None
+
+    def load(self):
+        if self._buf is not None:
+            return True
+        buf = None
+        if self.path and os.path.exists(self.path):
+            try:
+                buf, rate = decode_wav(self.path)
+                self.source = "file"
+            except Exception as e:
+                print("⚠ Could not decode siren WAV:", e)
+        if buf is None:
+            if not self.synth_fallback:
+                return False
+            buf, rate = synthesize()
+            self.source = "synth"
+        if self.volume != 1.0:
+            buf = (buf.astype(np.float32) * self.volume).astype(np.int16)
+        self._buf = np.ascontiguousarray(buf)
+        self.samplerate = rate
+        return True
+
+    def prepare(self):
+        """Decode the sound and open (but do not start) the output stream."""
+        with self._lock:
+            if self._stream is not None:
+                return True
+            if not self.load():
+                return False
+            import sounddevice as sd
+            try:
+                self._stream = sd.OutputStream(samplerate=self.samplerate, channels=self._buf.shape[1],
+                                               dtype="int16", blocksize=self.blocksize,
+                                               callback=self._callback)
+            except Exception as e:
+                print("❌ Siren output stream unavailable:", e)
+                return False
+        print(f"🔊 Siren ready ({self.source}, {len(self._buf) / self.samplerate:.1f}s loop, "
+              f"{self._buf.nbytes / 1e6:.1f}MB)")
+        return True
+
+    def _callback(self, outdata, frames, time_info, status):
+        if status and status.output_underflow:
+            self.underflows += 1
+        if not self._active:
+            outdata.fill(0)
+            return
+        buf = self._buf
+        n = len(buf)
+        pos = self._pos
+        i = 0
+        while i < frames:
+            take = min(frames - i, n - pos)
+            outdata[i:i + take] = buf[pos:pos + take]
+            pos = (pos + take) % n
+            i += take
+        self._pos = pos
+
+    @property
+    def playing(self):
+        return self._active
+
+    def start(self):
+        """Start looping; returns False if no output is available."""
+        t0 = time.perf_counter()
+        if self._stream is None and not self.prepare():
+            return False
+        with self._lock:
+            if self._active:
+                return True
+            self._pos = 0
+            self._active = True
+            try:
+                self._stream.start()
+            except Exception as e:
+                self._active = False
+                print("❌ Siren start failed:", e)
+                return False
+            self.starts += 1
+        self.last_start_ms = (time.perf_counter() - t0) * 1000.0
+        return True
+
+    def stop(self):
+        with self._lock:
+            if not self._active:
+                return
+            self._active = False
+            try:
+                self._stream.abort()     # drop queued audio: silence now, not after the buffer drains
+            except Exception:
+                pass
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+
+    def stats(self):
+        return {"source": self.source, "starts": self.starts, "underflows": self.underflows,
+                "last_start_ms": round(self.last_start_ms, 2) if self.last_start_ms is not None else None}
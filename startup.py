@@ -0,0 +1,119 @@
+"""
+startup.py
+
+Helpers for a fast, parallel boot.
+
+The microphone is opened first; until the recognizer is ready the audio
+callback only copies each block into a BlockBuffer (a preallocated ring of
+whole blocks with their timestamps). Model load, Firebase init, camera and
+HTTP warm-up run concurrently as Startup phases, and once the model is in,
+the buffered blocks are drained through the recognizer in order, so speech
+from the first seconds after a power cut is still checked for keywords.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class BlockBuffer:
+    """Fixed-size ring of audio blocks; when full the oldest block is dropped."""
+
+    def __init__(self, seconds, sample_rate, blocksize, channels=1):
+        slots = max(1, int(seconds * sample_rate / blocksize))
+        self.sample_rate = sample_rate
+        self._data = np.zeros((slots, blocksize, channels), dtype=np.int16)
+        self._frames = np.zeros(slots, dtype=np.int64)
+        self._ts = np.zeros(slots, dtype=np.float64)
+        self._head = 0      # next slot to read
+        self._count = 0
+        self._buffered = 0  # frames currently held
+        self.pushed = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self._count
+
+    def push(self, indata, ts):
+        slots = len(self._data)
+        if self._count == slots:
+            self._buffered -= int(self._frames[self._head])
+            self._head = (self._head + 1) % slots
+            self._count -= 1
+            self.dropped += 1
+        i = (self._head + self._count) % slots
+        n = min(len(indata), self._data.shape[1])
+        self._data[i, :n] = indata[:n]
+        self._frames[i] = n
+        self._ts[i] = ts
+        self._count += 1
+        self._buffered += n
+        self.pushed += 1
+
+    def pop(self):
+        """(block copy, ts) for the oldest block, or None when empty."""
+        if not self._count:
+            return None
+        i = self._head
+        block = self._data[i, :self._frames[i]].copy()
+        self._head = (i + 1) % len(self._data)
+        self._count -= 1
+        self._buffered -= len(block)
+        return block, float(self._ts[i])
+
+    def seconds(self):
+        return self._buffered / self.sample_rate
+
+
+class Startup:
+    """Runs startup phases on threads and records when each one finished."""
+
+    def __init__(self, max_workers=6):
+        self.t0 = time.monotonic()
+        self.done = {}          # phase -> seconds since t0
+        self.took = {}          # phase -> seconds the phase itself ran
+        self.errors = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="startup")
+
+    def mark(self, phase, started=None):
+        now = time.monotonic()
+        with self._lock:
+            self.done[phase] = now - self.t0
+            self.took[phase] = now - (self.t0 if started is None else started)
+
+    def run(self, phase, fn, *args):
+        def _phase():
+            started = time.monotonic()
+            try:
+                return fn(*args)
+            except BaseException as e:
+                self.errors[phase] = e
+                raise
+            finally:
+                self.mark(phase, started)
+
+        f = self._pool.submit(_phase)
+        self._futures[phase] = f
+        return f
+
+    def result(self, phase, timeout=None):
+        return self._futures[phase].result(timeout)
+
+    def finished(self):
+        return all(f.done() for f in self._futures.values())
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+    def report(self):
+        with self._lock:
+            items = sorted(self.done.items(), key=lambda kv: kv[1])
+        parts = []
+        for phase, at in items:
+            flag = " FAILED" if phase in self.errors else ""
+            parts.append(f"{phase}=+{at * 1000.0:.0f}ms ({self.took[phase] * 1000.0:.0f}ms){flag}")
+        return " ".join(parts)
@@ -6,45 +6,85 @@ Full prototype:
 - Vosk speech detection (English)
 - On emergency keyword:
     - capture snapshot from webcam (index 0)
-    - upload snapshot to imgbb
-    - send Telegram photo + caption
+    - send Telegram photo (JPEG uploaded directly) + caption
+    - upload snapshot to imgbb in parallel (URL for the FCM payload)
     - send FCM data-only high-priority message (topic police_zone_a)
     - play looping siren on laptop until manual stop
+- A spectral scream detector runs on the same audio as a second trigger
+  (alert keyword SCREAM, with its confidence)
+- With HUB_URL set, alerts go to hub.py instead, which merges reports from
+  many units and sends Telegram / FCM centrally
 """
 
 import os
 import sys
 import time
 import json
-import base64
 import threading
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import platform
 
-# audio + STT
-import sounddevice as sd
-from vosk import Model, KaldiRecognizer
+from alert_queue import AlertQueue
+from camera_service import CameraService
+from vad import EnergyVAD
+from keyword_matcher import KeywordMatcher
+from evidence_archive import EvidenceArchive
+from alert_dispatcher import AlertDispatcher, Channel
+from senders import SenderPool, TelegramSender, TelegramRejected, ImgbbUploader, HubClient, fcm_payload
+from fcm_delivery import FcmDelivery, targets
+from metrics import Registry, AlertTrace, MetricsServer
+from siren import SirenEngine
+from outbox import Outbox, read_evidence
+from startup import BlockBuffer, Startup
+from audio_evidence import PcmRing, ClipRecorder
+from audio_feed import RecognizerFeed
+from audio_frontend import AudioFrontEnd
+from frame_select import pick_best, contact_sheet
+from incidents import IncidentManager
+from early_trigger import EarlyTrigger
+from scream_detector import ScreamDetector
 
-# webcam
-import cv2
+# audio
+import sounddevice as sd
 import numpy as np
 
-# firebase (server)
-import firebase_admin
-from firebase_admin import credentials, messaging
+# vosk, cv2 and firebase_admin are heavy: they are imported where they are
+# used, and main() runs those imports in parallel startup phases
 
 # ---------------- CONFIG ----------------
 CAMERA_INDEX = 0   # you said cv2.VideoCapture(0)
 VOSK_MODEL_PATH = "model"   # english model folder
-SAMPLE_RATE = 16000
+SAMPLE_RATE = 16000         # what the recognizer gets
 CHANNELS = 1
-BLOCKSIZE = 8000
+
+# Capture format: None = the input device's native rate / all its channels
+# (USB mic arrays are often 44.1 / 48 kHz, 2-8 channels); the front-end
+# picks the best channel by SNR and resamples to SAMPLE_RATE itself
+CAPTURE_DEVICE = None
+CAPTURE_RATE = None
+CAPTURE_CHANNELS = None
+CHANNEL_SELECT = "best"     # "best", "mix" (SNR-weighted) or a channel index
+BLOCKSIZE = 1600            # device block (100 ms); the recognizer gets FEED_* chunks
+
+# Recognizer feed: the callback only copies device blocks into the audio
+# ring; a feeder thread hands VAD + Vosk FEED_SIZE samples at a time.
+# Smaller feeds see a keyword sooner, larger ones cost less CPU per second
+# of audio. FEED_ADAPTIVE moves between FEED_MIN and FEED_MAX in FEED_STEP
+# steps depending on the measured real-time factor.
+FEED_SIZE = 3200
+FEED_MIN = 1600
+FEED_MAX = 8000
+FEED_STEP = 800
+FEED_ADAPTIVE = True
 
 # Telegram
 TELEGRAM_BOT_TOKEN = "add_bot_token"
 TELEGRAM_CHAT_ID = "add_chat_id"
 TELEGRAM_API = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
+# "multipart": upload the JPEG bytes straight to sendPhoto (imgbb runs in parallel)
+# "url":       old path, wait for the imgbb URL and pass it to sendPhoto
+TELEGRAM_PHOTO_MODE = "multipart"
 
 # imgbb
 IMGBB_API_KEY = "Imgbb-api_key"
@@ -53,9 +93,29 @@ IMGBB_UPLOAD_URL = "https://api.imgbb.com/1/upload"
 # Firebase
 SERVICE_ACCOUNT_PATH = "serviceAccountKey.json"
 FCM_TOPIC = "police_zone_a"
+# every alert goes to FCM_TOPIC plus these topics / device tokens, in one
+# send_each batch; only targets that failed are retried
+FCM_EXTRA_TOPICS = []
+FCM_DEVICE_TOKENS = []
+FCM_RETRIES = 2
+
+# Where this unit stands; reported in every alert
+LOCATION = "Police Zone A"
+# (lat, lon) of the unit; with a hub, units within HUB_SITE_RADIUS_M of each
+# other report one incident even when their LOCATION names differ
+LOCATION_LATLON = None
+
+# Hub (hub.py). With HUB_URL set the unit posts its alerts to the hub instead
+# of Telegram / FCM; the hub merges reports of one incident from many units
+# in a zone and holds the Telegram / Firebase credentials.
+HUB_URL = ""                       # e.g. "http://hub.local:8765"
+HUB_TOKEN = ""
+DEVICE_ID = platform.node() or "streetguardian"
+ZONE = FCM_TOPIC
 
 # Siren file - change if needed
 SIREN_WAV = "siren.wav"  # put a valid .wav file in the same folder
+SIREN_VOLUME = 0.8       # synthesized wail is used if the WAV is missing
 
 # Emergency keywords (English demo)
 EMERGENCY_KEYWORDS = [
@@ -64,25 +124,196 @@ EMERGENCY_KEYWORDS = [
     "ambulance", "108", "fire","100"
 ]
 
-# snapshot filename
-SNAPSHOT_FILE = "snapshot.jpg"
+# Recognizer mode:
+#   "keyword" - Vosk decodes against a small grammar built from
+#               EMERGENCY_KEYWORDS (much faster, fewer false words)
+#   "free"    - full large-vocabulary decoding + substring search
+# "keyword" falls back to "free" if the model rejects runtime grammars.
+RECOGNIZER_MODE = "keyword"
+
+# How keywords that are not plain words are actually spoken / decoded
+KEYWORD_SPOKEN_FORMS = {
+    "108": ["one zero eight", "one oh eight", "one hundred eight"],
+    "100": ["one hundred", "one zero zero"],
+}
+
+# Evidence archive: snapshots are kept in memory for the alert; saving them
+# to disk is optional and happens in the background with unique filenames
+EVIDENCE_ARCHIVE = False
+EVIDENCE_DIR = "evidence"
+
+# Durable outbox: channels that failed are stored in SQLite and retried
+# with exponential backoff once the uplink is back (evidence is archived
+# to EVIDENCE_DIR so the retry can still send the photo)
+OUTBOX_ENABLED = True
+OUTBOX_PATH = "outbox.db"
+OUTBOX_BATCH = 10
+OUTBOX_BASE_BACKOFF = 5.0   # seconds, doubles per failed attempt
+OUTBOX_MAX_BACKOFF = 600.0
+
+# Audio evidence: the last AUDIO_RING_SECONDS of mic audio are kept in
+# memory (the same ring feeds the recognizer); each alert sends a mu-law WAV clip from AUDIO_CLIP_BEFORE seconds
+# before to AUDIO_CLIP_AFTER seconds after the keyword as a Telegram document
+AUDIO_CLIP_ENABLED = True
+AUDIO_RING_SECONDS = 15
+AUDIO_CLIP_BEFORE = 8.0
+AUDIO_CLIP_AFTER = 4.0
+AUDIO_CLIP_RATE = 8000
 
 # JPEG compression config
 SNAPSHOT_WIDTH = 480
 JPEG_QUALITY = 60
 
+# Always-on camera ring buffer (frames are stored already downscaled)
+CAMERA_FPS = 5
+CAMERA_BUFFER_SECONDS = 4
+PRE_TRIGGER_FRAMES = 2
+
+# Keyword hits within INCIDENT_WINDOW seconds of the previous hit belong to
+# the same incident: only the first one runs the full alert, later ones
+# edit the Telegram message and send a follow-up FCM with the incident id
+INCIDENT_WINDOW = 30.0
+INCIDENT_MAX_SECONDS = 600.0
+INCIDENT_UPDATE_INTERVAL = 5.0   # at most one update per incident this often
+
+# Burst capture: frames around the keyword are scored for sharpness and
+# exposure and the best one is sent; the others can follow as a contact sheet
+BURST_ENABLED = True
+BURST_BEFORE = 3            # frames at or before the keyword
+BURST_AFTER = 1             # frames after it, waiting at most BURST_WAIT seconds
+BURST_WAIT = 0.4
+BURST_SCORE_BUDGET_MS = 80
+BURST_CONTACT_SHEET = True
+
+# Two-phase trigger: a keyword in a partial result arms the alert (provisional
+# incident, burst frames pinned and encoded, HTTP connections warmed); the
+# final result then confirms and dispatches it, or cancels it. Nothing
+# audible or remote happens before the confirmation.
+EARLY_TRIGGER_ENABLED = True
+EARLY_TRIGGER_TIMEOUT = 10.0     # cancel an arming that never got a final result
+
+# Scream / distress detector next to the recognizer (loud, high pitched,
+# tonal, sustained). It sees every chunk, before the VAD gate; a detection
+# raises a SCREAM alert with its confidence through the same incident logic.
+SCREAM_ENABLED = True
+SCREAM_LABEL = "scream"
+SCREAM_THRESHOLD = 0.6      # mean frame score (0..1) a run needs to fire
+SCREAM_MIN_SECONDS = 0.4
+SCREAM_LEVEL_DB = -35.0     # absolute floor, dBFS
+SCREAM_RISE_DB = 12.0       # above the tracked background level
+SCREAM_COOLDOWN = 10.0
+
+# Voice activity gate in front of Vosk (skips silent audio)
+VAD_ENABLED = True
+VAD_FRAME_MS = 20
+VAD_ENERGY_DB = -50.0     # absolute speech floor, dBFS
+VAD_MARGIN_DB = 10.0      # speech must be this far above the tracked noise floor
+VAD_ZCR_MAX = 0.35        # max zero-crossing rate for voiced frames
+VAD_HANGOVER_MS = 300     # keep the gate open this long after speech
+VAD_PADDING_MS = 200      # audio sent before each speech onset
+
+# Alert pipeline: the audio callback only enqueues, workers run the alert
+ALERT_QUEUE_SIZE = 8
+ALERT_WORKERS = 2
+
+# Remote channels are sent concurrently; each gets its own timeout inside
+# the overall per-alert deadline (seconds)
+ALERT_DEADLINE = 20.0
+TELEGRAM_TIMEOUT = 15.0
+FCM_TIMEOUT = 15.0
+CHANNEL_RETRIES = 1
+
+# Pooled keep-alive HTTP sessions for Telegram / imgbb
+HTTP_POOL_SIZE = 4
+HTTP_RETRIES = 2          # connection errors / 429 / 5xx, with backoff
+HTTP_BACKOFF = 0.3
+HTTP_WARM_INTERVAL = 50   # seconds between keep-alive pings (getMe, imgbb HEAD)
+STATS_INTERVAL = 30   # seconds between audio/alert stats lines
+
+# Audio is captured from the first second of startup and held here until the
+# model has loaded, then run through the recognizer
+STARTUP_BUFFER_SECONDS = 30
+CAMERA_READY_TIMEOUT = 10.0
+
+# Local Prometheus endpoint (GET /metrics); keep it on localhost
+METRICS_ENABLED = True
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+
 # ----------------------------------------
 
 # Global flags
 siren_playing = False
 siren_lock = threading.Lock()
 
+# Audio path counters (written only from the PortAudio callback)
+audio_stats = {
+    "blocks": 0,
+    "input_overflow": 0,
+    "input_underflow": 0,
+    "callback_max_ms": 0.0,
+    "callback_errors": 0,
+}
+
+# ------------------ Metrics ------------------
+
+# Histograms keep fixed bucket counts + a fixed-size window of recent
+# samples; the gauges below are read from their owners at scrape time.
+metrics = Registry(prefix="streetguardian_")
+metrics.counter("audio_blocks_total", "Audio blocks received", fn=lambda: audio_stats["blocks"])
+metrics.counter("audio_dropped_blocks_total", "Input overflows (audio dropped before the callback)",
+                fn=lambda: audio_stats["input_overflow"])
+metrics.counter("audio_underflow_total", "Input underflows", fn=lambda: audio_stats["input_underflow"])
+metrics.counter("audio_callback_errors_total", "Audio blocks lost to an exception in the callback",
+                fn=lambda: audio_stats["callback_errors"])
+m_callback = metrics.histogram("audio_callback_seconds", "Audio callback duration",
+                               buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+m_decode = metrics.counter("recognizer_decode_seconds_total", "Wall time spent in AcceptWaveform")
+m_decoded = metrics.counter("recognizer_audio_seconds_total", "Audio fed to the recognizer")
+m_rtf = metrics.histogram("recognizer_rtf", "Recognizer real-time factor per fed chunk",
+                          buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0))
+m_stage = metrics.histogram("alert_stage_seconds",
+                            "Time from the audio block holding the keyword to each alert stage",
+                            labels=("stage",))
+m_channel = metrics.counter("alert_channel_results_total", "Alert channel outcomes",
+                            labels=("channel", "status"))
+m_early = metrics.counter("early_trigger_total", "Partial-result armings by outcome", labels=("outcome",))
+m_scream = metrics.histogram("scream_confidence", "Confidence of scream detections",
+                            buckets=(0.6, 0.7, 0.8, 0.9, 1.0))
+m_fcm = metrics.counter("fcm_target_results_total", "FCM delivery outcome per target",
+                        labels=("kind", "status"))
+metrics.gauge("alert_queue_depth", "Alerts waiting for a worker", fn=lambda: alert_queue.depth())
+metrics.gauge("alert_queue_busy", "Alert workers busy", fn=lambda: alert_queue.stats()["busy"])
+metrics.counter("alerts_dropped_total", "Alerts dropped on a full queue",
+                fn=lambda: alert_queue.stats()["dropped"])
+metrics.counter("audio_clips_total", "Audio evidence clips encoded", fn=lambda: clip_recorder.clips)
+metrics.counter("incidents_total", "Incidents opened (full alerts)", fn=lambda: incidents.incidents)
+metrics.counter("incident_hits_coalesced_total", "Keyword hits folded into an open incident",
+                fn=lambda: incidents.coalesced)
+metrics.gauge("outbox_depth", "Undelivered alerts waiting in the outbox", fn=lambda: outbox.stats()["depth"])
+metrics.gauge("outbox_oldest_age_seconds", "Age of the oldest outbox entry",
+              fn=lambda: outbox.stats()["oldest_age_s"])
+m_startup = metrics.gauge("startup_phase_seconds", "Seconds from start until each startup phase finished",
+                          labels=("phase",))
+metrics.gauge("camera_buffered_frames", "Frames in the camera ring buffer",
+              fn=lambda: camera.stats()["buffered"])
+metrics.gauge("capture_frontend_cpu_ratio", "CPU seconds per second of audio in channel select + resample",
+              fn=lambda: frontend.cpu_ms_per_s() / 1000.0)
+metrics.gauge("scream_detector_cpu_ratio", "CPU seconds per second of audio in the scream detector",
+              fn=lambda: scream.cpu_ms_per_s() / 1000.0)
+metrics.gauge("recognizer_feed_seconds", "Current recognizer feed size",
+              fn=lambda: recognizer_feed.feed / float(SAMPLE_RATE))
+metrics.gauge("recognizer_backlog_seconds", "Audio in the ring not yet fed to the recognizer",
+              fn=lambda: recognizer_feed.backlog() / float(SAMPLE_RATE))
+
 # ------------------ Utilities ------------------
 
 def init_firebase():
     if not os.path.exists(SERVICE_ACCOUNT_PATH):
         print("❌ Missing serviceAccountKey.json in folder.")
         return False
+    import firebase_admin
+    from firebase_admin import credentials
     cred = credentials.Certificate(SERVICE_ACCOUNT_PATH)
     try:
         firebase_admin.initialize_app(cred)
@@ -92,107 +323,143 @@ def init_firebase():
         print("❌ Firebase init failed:", e)
         return False
 
-def upload_to_imgbb(image_path):
-    """Upload a local image to imgbb, return public url or ''"""
-    try:
-        with open(image_path, "rb") as f:
-            img_b64 = base64.b64encode(f.read()).decode("utf-8")
-    except Exception as e:
-        print("❌ Could not open snapshot:", e)
-        return ""
+# shared keep-alive sessions, warmed up in main()
+http = SenderPool(pool_size=HTTP_POOL_SIZE, retries=HTTP_RETRIES, backoff=HTTP_BACKOFF,
+                  warm_interval=HTTP_WARM_INTERVAL)
+telegram = TelegramSender(TELEGRAM_API, TELEGRAM_CHAT_ID, http)
+imgbb = ImgbbUploader(IMGBB_UPLOAD_URL, IMGBB_API_KEY, http)
+hub = HubClient(HUB_URL, DEVICE_ID, ZONE, http, token=HUB_TOKEN, latlon=LOCATION_LATLON)
 
-    payload = {
-        "key": IMGBB_API_KEY,
-        "image": img_b64
-    }
-    try:
-        r = requests.post(IMGBB_UPLOAD_URL, data=payload, timeout=30)
-        res = r.json()
-        if res.get("success"):
-            url = res["data"]["url"]
-            print("✅ Uploaded to imgbb:", url)
-            return url
-        else:
-            print("❌ imgbb response error:", res)
-            return ""
-    except Exception as e:
-        print("❌ imgbb upload failed:", e)
-        return ""
+def upload_to_imgbb(image):
+    """Upload JPEG bytes (or a local image path) to imgbb, return public url or ''"""
+    return imgbb.upload(image)
+
+def _alert_caption(keyword, location, timestamp):
+    return TelegramSender.caption(keyword, location, timestamp)
+
+def send_telegram_text(text, timeout=10):
+    return telegram.send_text(text, timeout=timeout)
 
 def send_telegram_photo(image_url, keyword, location, timestamp):
-    caption = f"<b>ALERT</b>\nKeyword: {keyword}\nLocation: {location}\nTime: {timestamp}"
-    try:
-        resp = requests.post(f"{TELEGRAM_API}/sendPhoto",
-                             data={"chat_id": TELEGRAM_CHAT_ID, "photo": image_url, "caption": caption, "parse_mode":"HTML"},
-                             timeout=15)
-        j = resp.json()
-        if j.get("ok"):
-            print("✅ Telegram photo sent")
-            return True
-        else:
-            print("❌ Telegram photo failed:", j)
-            # fallback to text
-            text = caption + ("\n\nImage: " + image_url if image_url else "")
-            resp2 = requests.post(f"{TELEGRAM_API}/sendMessage",
-                                  data={"chat_id": TELEGRAM_CHAT_ID, "text": text, "parse_mode":"HTML"}, timeout=10)
-            print("Fallback sendMessage response:", resp2.json())
-            return False
-    except Exception as e:
-        print("❌ Telegram send exception:", e)
-        return False
+    return telegram.send_photo_url(image_url, _alert_caption(keyword, location, timestamp))
+
+def send_telegram_jpeg(jpeg, keyword, location, timestamp, timeout=15, fallback=True):
+    """
+    sendPhoto with the JPEG bytes as a multipart upload (no imgbb round trip).
+    With fallback=False a failed photo is not followed by a text message, so
+    the caller (the alert dispatcher) can retry and fall back itself.
+    """
+    return telegram.send_photo(jpeg, _alert_caption(keyword, location, timestamp),
+                               timeout=timeout, fallback=fallback)
+
+fcm = FcmDelivery(retries=FCM_RETRIES, backoff=HTTP_BACKOFF)
+fcm_targets = targets([FCM_TOPIC] + FCM_EXTRA_TOPICS, FCM_DEVICE_TOKENS)
 
-def send_fcm_data(keyword, image_url, location, timestamp):
+def send_fcm_data(keyword, image_url, location, timestamp, extra=None, to=None, deadline=FCM_TIMEOUT):
+    """
+    Send to `to` (default: every configured target); FcmDelivery retries
+    only the targets that failed, within `deadline` seconds. Returns the
+    FcmResult (result.pending() lists what is left to retry), or None if
+    Firebase is not initialized.
+    """
+    import firebase_admin
     if not firebase_admin._apps:
         print("❌ Firebase not initialized. Skipping FCM.")
-        return False
-    data_payload = {
-        "keyword": keyword,
-        "image": image_url,
-        "location": location,
-        "time": timestamp,
-        "type": "street_guardian_alert"
-    }
-    message = messaging.Message(
-        data=data_payload,
-        topic=FCM_TOPIC,
-        android=messaging.AndroidConfig(priority="high")
-    )
-    try:
-        resp = messaging.send(message)
-        print("✅ FCM sent:", resp)
-        return True
-    except Exception as e:
-        print("❌ FCM send failed:", e)
-        return False
+        return None
+    data_payload = fcm_payload(keyword, image_url, location, timestamp, extra)
+    result = fcm.send(data_payload, fcm_targets if to is None else to, deadline=deadline)
+    for r in result.results:
+        m_fcm.labels(r.target[0], "ok" if r.ok else "failed").inc()
+    if result.ok:
+        print("✅ FCM sent:", result.summary())
+    else:
+        print("❌ FCM send failed:", result.summary())
+    return result
+
+def _resize_for_snapshot(frame):
+    import cv2
+    h, w = frame.shape[:2]
+    if w > SNAPSHOT_WIDTH:
+        scale = SNAPSHOT_WIDTH / float(w)
+        frame = cv2.resize(frame, (SNAPSHOT_WIDTH, int(h * scale)), interpolation=cv2.INTER_AREA)
+    return frame
+
+def encode_jpeg(frame):
+    """JPEG-encode a frame in memory; returns a memoryview over the encoded bytes or None."""
+    import cv2
+    encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY]
+    success, enc = cv2.imencode('.jpg', frame, encode_param)
+    if not success:
+        print("❌ JPEG encode failed")
+        return None
+    return enc.reshape(-1).data
 
-def capture_snapshot(save_path=SNAPSHOT_FILE, cam_index=CAMERA_INDEX):
+def _grab_frame_cold(cam_index):
+    # fallback when the camera service is not running: open, warm up, release
+    import cv2
     cap = cv2.VideoCapture(cam_index, cv2.CAP_DSHOW if platform.system()=="Windows" else 0)
     if not cap.isOpened():
         print("❌ Cannot open webcam (index {})".format(cam_index))
-        return False
+        return None
     # warm camera
     for _ in range(3):
         ret, frame = cap.read()
     ret, frame = cap.read()
     cap.release()
     if not ret or frame is None:
+        return None
+    return frame
+
+def capture_snapshot(cam_index=CAMERA_INDEX, trigger_ts=None, trace=None):
+    """
+    Grab and JPEG-encode the best current frame in memory.
+    Returns (jpeg, [other frames]); jpeg is None on failure.
+    When the camera service is running the frames come from its ring buffer
+    (no device open cost). With BURST_ENABLED a burst around trigger_ts is
+    scored and the sharpest, best-exposed frame is encoded; otherwise the
+    current frame is used, with up to PRE_TRIGGER_FRAMES frames from before
+    trigger_ts. The other frames are returned raw for the contact sheet /
+    archive. trace (AlertTrace) gets "snapshot" and "encode" marks.
+    """
+    rest = []
+    if camera.is_ready() and BURST_ENABLED:
+        burst = camera.burst(trigger_ts, BURST_BEFORE, BURST_AFTER, BURST_WAIT)
+        best, scores = pick_best(burst, trigger_ts, BURST_SCORE_BUDGET_MS)
+        frame = burst[best][0] if burst else None
+        rest = [f for i, (f, _) in enumerate(burst) if i != best]
+        if burst:
+            print(f"🎯 Best of {len(burst)} burst frames: #{best + 1} {scores[best]} "
+                  f"({len(scores)} scored)")
+    elif camera.is_ready():
+        frame, rest = camera.snapshot(trigger_ts, PRE_TRIGGER_FRAMES)
+    else:
+        frame = _grab_frame_cold(cam_index)
+    if frame is None:
         print("❌ Snapshot capture failed")
-        return False
+        return None, []
+    if trace is not None:
+        trace.mark("snapshot")
 
-    h, w = frame.shape[:2]
-    if w > SNAPSHOT_WIDTH:
-        scale = SNAPSHOT_WIDTH / float(w)
-        frame = cv2.resize(frame, (SNAPSHOT_WIDTH, int(h * scale)), interpolation=cv2.INTER_AREA)
+    jpeg = encode_jpeg(_resize_for_snapshot(frame))
+    if jpeg is None:
+        return None, []
+    if trace is not None:
+        trace.mark("encode")
+    print(f"✅ Snapshot captured ({len(jpeg) / 1024:.1f} KB)")
+    return jpeg, rest
 
-    encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY]
-    success, enc = cv2.imencode('.jpg', frame, encode_param)
-    if not success:
-        print("❌ JPEG encode failed")
-        return False
-    with open(save_path, "wb") as f:
-        f.write(enc.tobytes())
-    print("✅ Snapshot saved:", save_path)
-    return True
+def _burst_followup(rest, detected_keyword, kw, location, ts):
+    """Archive the other burst frames and send them as one contact sheet."""
+    if EVIDENCE_ARCHIVE:
+        for i, f in enumerate(rest, 1):
+            j = encode_jpeg(f)
+            if j is not None:
+                archive.save(j, detected_keyword, suffix=f"burst{i}")
+    if BURST_CONTACT_SHEET:
+        sheet = encode_jpeg(contact_sheet(rest))
+        if sheet is not None:
+            telegram.send_photo(sheet, _alert_caption(kw, location, ts) + "\nOther frames",
+                                fallback=False)
 
 # ------------------ Siren control ------------------
 
@@ -206,50 +473,23 @@ def _winsound_stop():
     import winsound
     winsound.PlaySound(None, winsound.SND_PURGE)
 
-def _simpleaudio_loop(path):
-    try:
-        import simpleaudio as sa
-    except Exception:
-        print("simpleaudio not available")
-        return
-    wave_obj = sa.WaveObject.from_wave_file(path)
-    play_obj = None
-    while siren_playing:
-        play_obj = wave_obj.play()
-        play_obj.wait_done()
+# decoded once and played from a pre-opened output stream, see siren.py
+siren = SirenEngine(SIREN_WAV, volume=SIREN_VOLUME)
 
-def start_siren_thread(path=SIREN_WAV):
+def start_siren(path=SIREN_WAV):
     global siren_playing
     with siren_lock:
         if siren_playing:
             return
         siren_playing = True
-
-    def _runner():
-        print("🔊 Siren starting (type 'stop' + Enter to stop)...")
-        try:
-            if platform.system() == "Windows":
-                _winsound_loop(path)
-                # keep running until flag cleared
-                while siren_playing:
-                    time.sleep(0.5)
-                _winsound_stop()
-            else:
-                # use simpleaudio if available
-                try:
-                    import simpleaudio as sa
-                    wave_obj = sa.WaveObject.from_wave_file(path)
-                    while siren_playing:
-                        play_obj = wave_obj.play()
-                        play_obj.wait_done()
-                except Exception as e:
-                    print("No simple audio playback available:", e)
-                    print("Siren not played.")
-        except Exception as e:
-            print("Siren error:", e)
-        print("🔕 Siren stopped.")
-    t = threading.Thread(target=_runner, daemon=True)
-    t.start()
+    if siren.start():
+        print(f"🔊 Siren on in {siren.last_start_ms:.1f}ms (type 'stop' + Enter to stop)")
+        return
+    if platform.system() == "Windows" and os.path.exists(path):
+        _winsound_loop(path)
+        print("🔊 Siren starting (winsound)...")
+        return
+    print("Siren not played.")
 
 def stop_siren():
     global siren_playing
@@ -257,8 +497,10 @@ def stop_siren():
         if not siren_playing:
             return
         siren_playing = False
-    # winsound stop handled in thread
-    print("Stopping siren...")
+    siren.stop()
+    if platform.system() == "Windows":
+        _winsound_stop()
+    print("🔕 Siren stopped.")
 
 def input_monitor():
     # thread to listen for 'stop' command from user
@@ -274,97 +516,755 @@ def input_monitor():
         except Exception:
             break
 
+# ------------------ Camera service ------------------
+
+# keeps the webcam open and the last few seconds of frames in memory;
+# started in main()
+camera = CameraService(CAMERA_INDEX, width=SNAPSHOT_WIDTH, fps=CAMERA_FPS,
+                       seconds=CAMERA_BUFFER_SECONDS)
+
 # ------------------ Vosk STT ------------------
 
-print("Loading Vosk model... (this may take a few seconds)")
-if not os.path.exists(VOSK_MODEL_PATH):
-    print("❌ Vosk model folder not found:", VOSK_MODEL_PATH)
-    sys.exit(1)
+model = None
+recognizer = None
+recognizer_mode = None
+firebase_ok = False
 
-model = Model(VOSK_MODEL_PATH)
-recognizer = KaldiRecognizer(model, SAMPLE_RATE)
-print("✅ Vosk model loaded.")
+def build_grammar(keywords=EMERGENCY_KEYWORDS):
+    """Vosk grammar (phrase list + [unk]) for keyword-spotting mode."""
+    phrases = []
+    for kw in keywords:
+        for p in KEYWORD_SPOKEN_FORMS.get(kw, [kw]):
+            if p not in phrases:
+                phrases.append(p)
+    phrases.append("[unk]")
+    return phrases
 
-# initialize firebase
-firebase_ok = init_firebase()
+def build_recognizer(vosk_model, mode=RECOGNIZER_MODE):
+    """Return (KaldiRecognizer, mode actually used)."""
+    from vosk import KaldiRecognizer
+    if mode == "keyword":
+        try:
+            rec = KaldiRecognizer(vosk_model, SAMPLE_RATE, json.dumps(build_grammar()))
+            return rec, "keyword"
+        except Exception as e:
+            print("⚠ Keyword grammar not supported by this model, using free text:", e)
+    return KaldiRecognizer(vosk_model, SAMPLE_RATE), "free"
 
-# start input monitor thread (to stop siren manually)
-threading.Thread(target=input_monitor, daemon=True).start()
+def load_recognizer():
+    global model, recognizer, recognizer_mode
+    print("Loading Vosk model... (this may take a few seconds)")
+    if not os.path.exists(VOSK_MODEL_PATH):
+        print("❌ Vosk model folder not found:", VOSK_MODEL_PATH)
+        sys.exit(1)
+
+    from vosk import Model
+    model = Model(VOSK_MODEL_PATH)
+    recognizer, recognizer_mode = build_recognizer(model)
+    print(f"✅ Vosk model loaded ({recognizer_mode} mode).")
 
 # listening callback
+# compiled once: whole-word matching, so "saved" / "1000" do not fire
+keyword_matcher = KeywordMatcher.build({"english": EMERGENCY_KEYWORDS}, aliases=KEYWORD_SPOKEN_FORMS)
+
 def contains_keyword(text):
-    t = text.lower()
-    for kw in EMERGENCY_KEYWORDS:
-        if kw in t:
-            return kw
-    return None
+    m = keyword_matcher.first(text)
+    return m.keyword if m else None
+
+# runs the imgbb upload next to the Telegram send
+upload_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="imgbb")
+
+# fans each alert out to Telegram / FCM concurrently
+dispatcher = AlertDispatcher(max_workers=8, deadline=ALERT_DEADLINE)
+
+def timed(fn, *args):
+    """Call fn(*args), return (result, elapsed_ms)."""
+    t0 = time.perf_counter()
+    res = fn(*args)
+    return res, (time.perf_counter() - t0) * 1000.0
+
+def _incident_caption(incident):
+    i = incident.info
+    text = _alert_caption(i["keyword"], i["location"], i["time"]) + f"\nIncident: {incident.id}"
+    if i.get("confidence") is not None:
+        text += f"\nConfidence: {i['confidence']:.2f}"
+    if incident.hits > 1:
+        text += f"\nUpdate: {incident.describe()} (last at {datetime.now().strftime('%H:%M:%S')})"
+    return text
+
+def _alert_evidence(prepared, trigger_ts, trace):
+    """Snapshot prepared while the trigger was armed, or capture one now."""
+    if prepared is not None:
+        try:
+            jpeg, rest = prepared.result(timeout=BURST_WAIT + 2.0)
+            if jpeg is not None:
+                trace.mark("snapshot")
+                return jpeg, rest
+        except Exception as e:
+            print("⚠ Early snapshot failed, capturing now:", e)
+    return capture_snapshot(CAMERA_INDEX, trigger_ts, trace)
 
-def handle_emergency(detected_keyword):
+def handle_emergency(detected_keyword, trigger_ts=None, incident=None, prepared=None, confidence=None):
+    t_start = time.perf_counter()
+    trace = AlertTrace(m_stage, trigger_ts)
+    trace.mark("dequeue")
     ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     print(f"\n🚨🚨 ALERT TRIGGERED — Keyword Detected: {detected_keyword.upper()} at {ts} 🚨🚨")
+    kw = detected_keyword.upper()
+    location = LOCATION
+    fcm_extra = {}
+    if confidence is not None:
+        # detector alert (scream), not a recognized keyword
+        fcm_extra = {"type": "street_guardian_scream", "confidence": f"{confidence:.2f}"}
+    if incident is not None:
+        incident.info = {"keyword": kw, "location": location, "time": ts, "confidence": confidence}
+        with incident.lock:
+            alerted_version = incident.version
+        fcm_extra["incident"] = incident.id
+
+    # 1) local siren first: it needs no network and alerts people nearby now
+    start_siren(SIREN_WAV)
+    trace.mark("siren")
+
+    # audio clip around the keyword: cut + encoded on its own worker once
+    # the audio after the keyword is in, then sent as a follow-up
+    if AUDIO_CLIP_ENABLED and not clip_recorder.request(detected_keyword, trigger_ts, kw, location, ts):
+        print("⚠ Audio clip queue full, no clip for this alert")
+
+    # 2) capture snapshot (in memory), usually already done while armed
+    (jpeg, rest), snap_ms = timed(_alert_evidence, prepared, trigger_ts, trace)
+    evidence_path = None
+    if jpeg is not None and EVIDENCE_ARCHIVE:
+        evidence_path = archive.save(jpeg, detected_keyword)
+
+    # 3) imgbb upload, only needed for the FCM "image" field
+    def _upload():
+        url = upload_to_imgbb(jpeg)
+        if url:
+            trace.mark("upload")
+        return url
+
+    upload = upload_pool.submit(_upload) if jpeg is not None and not HUB_URL else None
+
+    def imgbb_url(timeout):
+        if upload is None:
+            return ""
+        try:
+            return upload.result(timeout=timeout)
+        except Exception:
+            print("⚠ imgbb not ready in time, sending without image URL")
+            return ""
+
+    # 4) every remote channel at once
+    if incident is not None:
+        caption = _incident_caption(incident)
+    else:
+        caption = _alert_caption(kw, location, ts)
+        if confidence is not None:
+            caption += f"\nConfidence: {confidence:.2f}"
+
+    def tg_photo(t):
+        # a 4xx from Telegram raises TelegramRejected: no retries, straight to tg_text
+        if TELEGRAM_PHOTO_MODE == "url":
+            mid = telegram.send_photo_url(imgbb_url(t / 2), caption, fallback=False, raise_rejected=True)
+        else:
+            mid = telegram.send_photo(jpeg, caption, timeout=t, fallback=False, raise_rejected=True)
+        if mid and incident is not None:
+            incident.telegram = (mid, "photo")    # later hits edit this message
+        return mid
+
+    def tg_text(t):
+        mid = send_telegram_text(caption, timeout=t)
+        if mid and incident is not None:
+            incident.telegram = (mid, "text")
+        return mid
 
-    # 1) capture snapshot
-    ok = capture_snapshot(SNAPSHOT_FILE, CAMERA_INDEX)
+    fcm_result = []
+
+    def fcm_send(t):
+        # wait for the image URL at most half of the FCM budget, then send without it
+        t0 = time.monotonic()
+        url = imgbb_url(t / 2)
+        r = send_fcm_data(kw, url, location, ts, fcm_extra, deadline=t - (time.monotonic() - t0))
+        fcm_result.append(r)
+        return r is not None and r.ok
+
+    def to_hub(t):
+        return hub.send_alert(kw, location, ts, jpeg, incident.id if incident is not None else "", timeout=t)
+
+    # no snapshot: the text message is the alert, not a fallback after photo retries
+    channels = [
+        Channel("telegram", tg_photo, timeout=TELEGRAM_TIMEOUT, retries=CHANNEL_RETRIES,
+                fallback=tg_text, fatal=(TelegramRejected,)) if jpeg is not None else
+        Channel("telegram", tg_text, timeout=TELEGRAM_TIMEOUT, retries=CHANNEL_RETRIES),
+        # FcmDelivery already retries the failed targets: a channel retry would resend to all
+        Channel("fcm", fcm_send, timeout=FCM_TIMEOUT, retries=0),
+    ]
+    if HUB_URL:
+        channels = [Channel("hub", to_hub, timeout=TELEGRAM_TIMEOUT, retries=CHANNEL_RETRIES)]
+    dispatch_t0 = time.monotonic()
+    result = dispatcher.dispatch(channels, deadline=ALERT_DEADLINE)
+    if rest and jpeg is not None:
+        upload_pool.submit(_burst_followup, rest, detected_keyword, kw, location, ts)
+    for name, r in result.channels.items():
+        m_channel.labels(name, r.status).inc()
+        if r.ok:
+            trace.mark(name, at=dispatch_t0 + r.latency_ms / 1000.0)
+
+    # 5) anything that did not get through goes to the durable outbox
+    # (a timed-out send may still land later; a duplicate beats a lost alert)
     img_url = ""
-    if ok:
-        # 2) upload to imgbb
-        img_url = upload_to_imgbb(SNAPSHOT_FILE)
+    if upload is not None and upload.done() and upload.exception() is None:
+        img_url = upload.result()
+    failed = [name for name, r in result.channels.items() if not r.ok]
+    if "fcm" in failed and fcm_result and fcm_result[0] is not None and not fcm_result[0].pending():
+        failed.remove("fcm")        # only permanent errors left: a retry cannot deliver
+    if failed and OUTBOX_ENABLED:
+        if jpeg is not None:
+            evidence_path = _outbox_evidence(jpeg, evidence_path, detected_keyword)
+        payload = {"keyword": kw, "location": location, "time": ts, "image_url": img_url}
+        payload.update(fcm_extra)
+        for name in failed:
+            item = payload
+            if name == "fcm" and fcm_result and fcm_result[0] is not None:
+                # only the targets that did not get it (a timed-out send: all of them)
+                item = dict(payload, fcm_targets=fcm_result[0].pending())
+            outbox.enqueue(name, item, evidence_path)
+        print(f"📮 Queued in outbox for retry: {', '.join(failed)}")
+    if OUTBOX_ENABLED:
+        # a live send got through: the link is back, so what waits for it need not sit out its backoff
+        waiting = outbox.stats()["by_channel"]
+        back = [name for name, r in result.channels.items() if r.ok]
+        back += ["telegram_audio"] if "telegram" in back else []
+        back = [name for name in back if waiting.get(name)]
+        if back:
+            outbox.kick(back)
 
-    # 3) send telegram
-    try:
-        send_telegram_photo(img_url, detected_keyword.upper(), "Police Zone A", ts)
-    except Exception as e:
-        print("Telegram error:", e)
+    # hits that arrived while this alert was going out become one update
+    if incident is not None:
+        incident.image_url = img_url
+        with incident.lock:
+            incident.sent_version = alerted_version
+            pending = incident.version > alerted_version
+        incident.last_update = time.monotonic()
+        incident.alerted.set()
+        if pending:
+            incident_updates.submit(incident)
+
+    total_ms = (time.perf_counter() - t_start) * 1000.0
+    trace.mark("done")
+    print(f"⏱ Alert latency ({TELEGRAM_PHOTO_MODE}): snapshot={snap_ms:.0f}ms "
+          f"{result.summary()} | alert total={total_ms:.0f}ms")
+    print(f"⏱ Trace from keyword block: {trace.summary()}")
+    return result
+
+def handle_incident_update(incident):
+    """
+    Fold new hits into an open incident: edit the Telegram alert and send a
+    follow-up FCM with the same incident id. Runs at most once per
+    INCIDENT_UPDATE_INTERVAL per incident; queued duplicates are no-ops.
+    """
+    if not incident.alerted.wait(ALERT_DEADLINE + 10.0):
+        return
+    wait = incident.last_update + INCIDENT_UPDATE_INTERVAL - time.monotonic()
+    if wait > 0:
+        time.sleep(wait)
+    with incident.lock:
+        if incident.version <= incident.sent_version:
+            return      # an earlier update already covered these hits
+        incident.sent_version = incident.version
+        hits, keywords = incident.hits, list(incident.keywords)
+    i = incident.info
+    if HUB_URL:
+        # the hub folds the new hit into its own incident and edits the alert
+        ok = hub.send_alert(keywords[-1], i["location"], datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                            incident=incident.id)
+        incident.last_update = time.monotonic()
+        print(f"🔁 Incident {incident.id} update sent to hub: {'ok' if ok else 'failed'}")
+        return
+    caption = _incident_caption(incident)
+    if incident.telegram is not None:
+        mid, kind = incident.telegram
+        tg_ok = telegram.edit(mid, caption, kind)
+    else:
+        mid = telegram.send_text(caption)
+        if mid:
+            incident.telegram = (mid, "text")
+        tg_ok = bool(mid)
+    fcm_r = send_fcm_data(i["keyword"], incident.image_url, i["location"], i["time"],
+                          {"type": "street_guardian_update", "incident": incident.id,
+                           "hits": str(hits), "keywords": ",".join(keywords)})
+    fcm_ok = fcm_r is not None and fcm_r.ok
+    incident.last_update = time.monotonic()
+    print(f"🔁 Incident {incident.id} updated ({incident.describe()}): "
+          f"telegram={'ok' if tg_ok else 'failed'} fcm={'ok' if fcm_ok else 'failed'}")
+
+# background evidence writer, started in main() when EVIDENCE_ARCHIVE or OUTBOX_ENABLED is on
+archive = EvidenceArchive(EVIDENCE_DIR)
+
+def _outbox_evidence(data, path, keyword, suffix="", ext=".jpg"):
+    """Evidence file for an outbox row, on disk before the row is queued (the drainer may read it at once)."""
+    if path is not None and archive.wait(path):
+        return path
+    return archive.save(data, keyword, suffix, ext, sync=True)
+
+# ------------------ Audio evidence ------------------
+
+def _send_audio_clip(wav, detected_keyword, kw, location, ts):
+    path = archive.save(wav, detected_keyword, suffix="audio", ext=".wav") if EVIDENCE_ARCHIVE else None
+    if HUB_URL:
+        return      # the hub only takes the snapshot; the clip stays in the local archive
+    caption = _alert_caption(kw, location, ts) + "\nAudio evidence"
+    if telegram.send_document(wav, "alert_audio.wav", caption):
+        return
+    if OUTBOX_ENABLED:
+        path = _outbox_evidence(wav, path, detected_keyword, suffix="audio", ext=".wav")
+        outbox.enqueue("telegram_audio", {"keyword": kw, "location": location, "time": ts}, path)
+        print("📮 Audio clip queued in outbox for retry")
+
+# mic audio history, written from the audio callback
+pcm_ring = PcmRing(AUDIO_RING_SECONDS, SAMPLE_RATE)
+clip_recorder = ClipRecorder(pcm_ring, before=AUDIO_CLIP_BEFORE, after=AUDIO_CLIP_AFTER,
+                             out_rate=AUDIO_CLIP_RATE, on_clip=_send_audio_clip)
+
+# ------------------ Outbox ------------------
+
+def _outbox_telegram(items):
+    results = []
+    for item in items:
+        p = item["payload"]
+        caption = _alert_caption(p["keyword"], p["location"], p["time"])
+        if p.get("confidence"):
+            caption += f"\nConfidence: {p['confidence']}"
+        caption += "\n<i>(delayed: uplink was down)</i>"
+        jpeg = read_evidence(item["evidence"])
+        if jpeg is not None:
+            ok = telegram.send_photo(jpeg, caption, fallback=False)
+        else:
+            ok = telegram.send_text(caption)
+        results.append(ok)
+        if not ok:
+            break   # link still down, leave the rest for the next retry
+    return results
+
+def _outbox_fcm(items):
+    results = []
+    for item in items:
+        p = item["payload"]
+        img_url = p.get("image_url", "")
+        if not img_url:
+            jpeg = read_evidence(item["evidence"])
+            if jpeg is not None:
+                img_url = upload_to_imgbb(jpeg)
+        extra = {k: p[k] for k in ("incident", "type", "confidence") if p.get(k)} or None
+        to = [tuple(t) for t in p["fcm_targets"]] if "fcm_targets" in p else None
+        r = send_fcm_data(p["keyword"], img_url, p["location"], p["time"], extra, to=to)
+        ok = r is not None and (r.ok or r.delivered > 0 or not r.pending())
+        if ok and r.pending():
+            # partly through: the rest becomes its own row, so nobody gets it twice
+            outbox.enqueue("fcm", dict(p, image_url=img_url, fcm_targets=r.pending()),
+                           None if img_url else item["evidence"])
+        results.append(ok)
+        if not ok:
+            break
+    return results
+
+def _outbox_hub(items):
+    results = []
+    for item in items:
+        p = item["payload"]
+        ok = bool(hub.send_alert(p["keyword"], p["location"], p["time"], read_evidence(item["evidence"]),
+                                 p.get("incident", "")))
+        results.append(ok)
+        if not ok:
+            break
+    return results
+
+def _outbox_telegram_audio(items):
+    results = []
+    for item in items:
+        p = item["payload"]
+        wav = read_evidence(item["evidence"])
+        if wav is None:
+            print(f"⚠ Audio clip for outbox alert #{item['id']} is gone, dropping it")
+            results.append(True)
+            continue
+        caption = _alert_caption(p["keyword"], p["location"], p["time"]) + "\nAudio evidence (delayed)"
+        ok = telegram.send_document(wav, "alert_audio.wav", caption)
+        results.append(ok)
+        if not ok:
+            break
+    return results
 
-    # 4) send FCM (data-only high-priority)
+# without the archive the outbox's evidence files are its own: gone once delivered
+outbox = Outbox(OUTBOX_PATH, batch_size=OUTBOX_BATCH, base_backoff=OUTBOX_BASE_BACKOFF,
+                max_backoff=OUTBOX_MAX_BACKOFF, delete_evidence=not EVIDENCE_ARCHIVE)
+outbox.register("telegram", _outbox_telegram)
+outbox.register("fcm", _outbox_fcm)
+outbox.register("telegram_audio", _outbox_telegram_audio)
+outbox.register("hub", _outbox_hub)
+
+# alert pipeline: bounded queue + worker pool, started in main()
+alert_queue = AlertQueue(handle_emergency, maxsize=ALERT_QUEUE_SIZE, workers=ALERT_WORKERS)
+
+# groups repeated hits; follow-ups go through their own single worker
+incidents = IncidentManager(window=INCIDENT_WINDOW, max_duration=INCIDENT_MAX_SECONDS)
+incident_updates = AlertQueue(handle_incident_update, maxsize=ALERT_QUEUE_SIZE, workers=1, name="incident")
+
+def prepare_alert(keyword, ts):
+    """Head start for an armed keyword; nothing here is visible outside the device."""
+    upload_pool.submit(http.warm, 3.0)
+    return capture_snapshot(CAMERA_INDEX, ts)
+
+early = EarlyTrigger(prepare_alert, timeout=EARLY_TRIGGER_TIMEOUT)
+
+def print_stats():
+    a = alert_queue.stats()
+    c = camera.stats()
+    print(f"📷 camera fps={c['capture_fps']} buffered={c['buffered']}/{c['capacity']} "
+          f"mem={c['buffer_bytes'] / 1e6:.1f}MB opens={c['opens']} read_failures={c['read_failures']}")
+    print(f"📊 audio blocks={audio_stats['blocks']} overflow={audio_stats['input_overflow']} "
+          f"underflow={audio_stats['input_underflow']} callback_max={audio_stats['callback_max_ms']:.1f}ms "
+          f"errors={audio_stats['callback_errors']} | "
+          f"alerts queued={a['depth']} busy={a['busy']} done={a['processed']} "
+          f"failed={a['failed']} dropped={a['dropped']}")
+    fe = frontend.stats()
+    if not frontend.passthrough:
+        print(f"🎙 capture {fe['in_rate']}Hz x{fe['channels']} -> {fe['out_rate']}Hz channel={fe['channel']} "
+              f"snr={fe['snr_db']}dB switches={fe['switches']} cpu={fe['cpu_ms_per_s']}ms/s")
+    f = recognizer_feed.stats()
+    print(f"🎚 feed={f['feed_ms']}ms rtf={f['rtf']} backlog={f['backlog_ms']}ms "
+          f"max_backlog={f['max_backlog_ms']}ms overrun={f['overrun_ms']}ms resizes={f['resizes']}")
+    i = incidents.stats()
+    print(f"🧭 incidents={i['incidents']} coalesced hits={i['coalesced']} open={i['open'] or '-'}")
+    if EARLY_TRIGGER_ENABLED:
+        e = early.stats()
+        print(f"⏳ early trigger armed={e['armed']} confirmed={e['confirmed']} cancelled={e['cancelled']} "
+              f"expired={e['expired']} last lead={e['lead_ms']}ms")
+    if SCREAM_ENABLED:
+        s = scream.stats()
+        print(f"😱 scream detections={s['detections']} last={s['last']} analysed={s['analysed']}/{s['frames']} "
+              f"frames background={s['background_db']}dBFS cpu={s['cpu_ms_per_s']}ms/s")
+    if OUTBOX_ENABLED:
+        o = outbox.stats()
+        print(f"📮 outbox depth={o['depth']} oldest={o['oldest_age_s']}s delivered={o['delivered']} "
+              f"retries={o['retries']}")
+    if VAD_ENABLED:
+        v = vad.stats()
+        print(f"🔇 vad skipped={v['skipped_pct']}% segments={v['segments']} noise={v['noise_db']}dBFS")
+
+vad = EnergyVAD(SAMPLE_RATE, frame_ms=VAD_FRAME_MS, energy_db=VAD_ENERGY_DB,
+                margin_db=VAD_MARGIN_DB, zcr_max=VAD_ZCR_MAX,
+                hangover_ms=VAD_HANGOVER_MS, padding_ms=VAD_PADDING_MS)
+
+def _drop_arming(armed, outcome):
+    incidents.cancel(armed.incident)
+    m_early.labels(outcome).inc()
+    print(f"↩ Early trigger '{armed.keyword}' {outcome}, provisional incident {armed.incident.id} dropped")
+
+def on_partial_text(text, block_ts):
+    expired = early.expire()
+    if expired is not None:
+        _drop_arming(expired, "expired")
+    kw = contains_keyword(text)
+    if not kw or early.current is not None or incidents.is_open(block_ts):
+        return      # nothing to arm, already armed, or a hit now would only be an update
+    incident, _ = incidents.hit(kw, block_ts, provisional=True)
+    early.arm(kw, block_ts, incident)
+    m_early.labels("armed").inc()
+    m_stage.labels("partial").observe(clock() - block_ts)
+    print(f"⏳ Armed on partial '{kw}' (incident {incident.id}), waiting for the final result")
+
+def on_scream(confidence, start_ts):
+    """Scream detector fired: alert as SCREAM, or fold into / confirm the open incident."""
+    m_scream.observe(confidence)
+    print(f"😱 Scream detected (confidence {confidence:.2f})")
+    incident, new = incidents.hit(SCREAM_LABEL, start_ts)
+    if not new and incident.provisional:
+        # a keyword is armed for this very incident: the scream confirms it now
+        armed = early.confirm()
+        incidents.confirm(incident)
+        if armed is not None:
+            m_early.labels("confirmed").inc()
+        if not alert_queue.submit(SCREAM_LABEL, start_ts, incident,
+                                  armed.prepared if armed is not None else None, confidence):
+            print("⚠ Alert queue full, dropping scream alert")
+            incidents.close(incident)
+        return
+    if not new:
+        print(f"➕ Incident {incident.id}: {incident.describe()} — sending as an update")
+        incident_updates.submit(incident)
+        return
+    if not alert_queue.submit(SCREAM_LABEL, start_ts, incident, None, confidence):
+        print("⚠ Alert queue full, dropping scream alert")
+        incidents.close(incident)
+
+def on_final_text(text, block_ts):
+    text = text.strip()
+    if text:
+        print("> Recognized:", text)
+    # a stale arming (its final never came in time) must not be confirmed by a
+    # later utterance: drop it, and this keyword takes the normal path below
+    expired = early.expire()
+    if expired is not None:
+        _drop_arming(expired, "expired")
+    kw = contains_keyword(text) if text else None
+    armed = early.confirm() if kw else early.cancel()
+    if armed is not None and not kw:
+        _drop_arming(armed, "cancelled")
+    if kw:
+        m_stage.labels("recognition").observe(clock() - block_ts)
+        if armed is not None:
+            # the evidence is (nearly) ready: dispatch from the partial's timestamp
+            incidents.confirm(armed.incident)
+            m_early.labels("confirmed").inc()
+            if not alert_queue.submit(kw, armed.ts, armed.incident, armed.prepared):
+                print("⚠ Alert queue full, dropping alert for:", kw)
+                incidents.close(armed.incident)
+            return
+        incident, new = incidents.hit(kw, block_ts)
+        if not new:
+            print(f"➕ Incident {incident.id}: {incident.describe()} — sending as an update")
+            incident_updates.submit(incident)
+            return
+        # never run the alert here: camera/network would stall the stream
+        if not alert_queue.submit(kw, block_ts, incident):
+            print("⚠ Alert queue full, dropping alert for:", kw)
+            incidents.close(incident)
+
+def feed_recognizer(raw, block_ts):
+    t0 = time.perf_counter()
+    final = recognizer.AcceptWaveform(raw)
+    dt = time.perf_counter() - t0
+    audio_s = len(raw) / (2.0 * SAMPLE_RATE)
+    m_decode.inc(dt)
+    m_decoded.inc(audio_s)
+    if audio_s:
+        m_rtf.observe(dt / audio_s)
+    if final:
+        on_final_text(json.loads(recognizer.Result()).get("text", ""), block_ts)
+    else:
+        # optional: partial results
+        partial = json.loads(recognizer.PartialResult()).get("partial", "")
+        if partial:
+            print("Partial:", partial)
+            if EARLY_TRIGGER_ENABLED:
+                on_partial_text(partial, block_ts)
+
+# audio captured during startup, before the recognizer exists; main() clears
+# audio_live while it is loading and drains the buffer before setting it again
+# (slots hold a few extra samples: resampled blocks can be one longer)
+startup_audio = BlockBuffer(STARTUP_BUFFER_SECONDS, SAMPLE_RATE, BLOCKSIZE + 16, CHANNELS)
+startup_lock = threading.Lock()
+audio_live = True
+
+scream = ScreamDetector(SAMPLE_RATE, min_level_db=SCREAM_LEVEL_DB, rise_db=SCREAM_RISE_DB,
+                        min_seconds=SCREAM_MIN_SECONDS, threshold=SCREAM_THRESHOLD, cooldown=SCREAM_COOLDOWN)
+
+def process_block(indata, block_ts):
     try:
-        send_fcm_data(detected_keyword.upper(), img_url, "Police Zone A", ts)
+        if SCREAM_ENABLED:
+            hit = scream.process(indata, block_ts)
+            if hit is not None:
+                on_scream(*hit)
+        if not VAD_ENABLED:
+            feed_recognizer(indata.tobytes(), block_ts)
+        else:
+            for chunk, ended in vad.process(indata):
+                if chunk:
+                    feed_recognizer(chunk, block_ts)
+                if ended:
+                    # speech segment over: flush whatever the recognizer still holds
+                    on_final_text(json.loads(recognizer.FinalResult()).get("text", ""), block_ts)
     except Exception as e:
-        print("FCM error:", e)
+        print("Audio processing error:", e)
 
-    # 5) start siren
-    if os.path.exists(SIREN_WAV):
-        start_siren_thread(SIREN_WAV)
-    else:
-        print("⚠ Siren file not found:", SIREN_WAV, " — put a WAV file named siren.wav or update SIREN_WAV variable.")
+# ring -> VAD / recognizer in FEED_* chunks, on its own thread (started in main())
+recognizer_feed = RecognizerFeed(pcm_ring, process_block, FEED_SIZE, FEED_MIN, FEED_MAX, FEED_STEP,
+                                 FEED_ADAPTIVE)
+
+def drain_startup_audio():
+    """Run the blocks buffered during startup through the recognizer, then go live."""
+    global audio_live
+    drained = 0
+    while True:
+        with startup_lock:
+            item = startup_audio.pop()
+            if item is None:
+                # the feeder takes over from the first block written after this
+                recognizer_feed.reset(pcm_ring.position)
+                audio_live = True
+                return drained
+        process_block(*item)
+        drained += 1
+
+def capture_format():
+    """(rate, channels) to open the mic with: the device's own unless configured."""
+    rate, channels = CAPTURE_RATE, CAPTURE_CHANNELS
+    if rate is None or channels is None:
+        try:
+            info = sd.query_devices(CAPTURE_DEVICE, "input")
+            rate = rate or int(info["default_samplerate"])
+            channels = channels or int(info["max_input_channels"])
+        except Exception as e:
+            print(f"⚠ Could not query the input device, capturing {SAMPLE_RATE} Hz mono:", e)
+            rate, channels = rate or SAMPLE_RATE, channels or CHANNELS
+    return rate, max(1, channels)
+
+# native-rate capture -> 16 kHz mono; main() replaces it once the device format is known
+frontend = AudioFrontEnd(SAMPLE_RATE, CHANNELS, SAMPLE_RATE, CHANNEL_SELECT)
+
+# block timestamps; replay.py swaps in the audio position so windows and
+# timeouts count audio time, not the (much shorter) wall time of a replay
+clock = time.monotonic
 
 # audio callback
 def audio_callback(indata, frames, time_info, status):
+    t0 = time.perf_counter()
+    block_ts = clock()
+    audio_stats["blocks"] += 1
     if status:
-        print("Audio status:", status)
-    raw = indata.tobytes()
+        if status.input_overflow:
+            audio_stats["input_overflow"] += 1
+        if status.input_underflow:
+            audio_stats["input_underflow"] += 1
+    # an exception here would stop the stream for good (sounddevice aborts
+    # it): lose the block, count it, keep listening
     try:
-        if recognizer.AcceptWaveform(raw):
-            res = json.loads(recognizer.Result())
-            text = res.get("text", "").strip()
-            if text:
-                print("> Recognized:", text)
-                kw = contains_keyword(text)
-                if kw:
-                    handle_emergency(kw)
-        else:
-            # optional: partial results
-            partial = json.loads(recognizer.PartialResult()).get("partial", "")
-            if partial:
-                print("Partial:", partial)
+        # channel select + resample, then only copies: VAD and Vosk run on the feeder thread
+        mono = frontend.process(indata)
+        buffered = False
+        if not audio_live:
+            with startup_lock:
+                if not audio_live:
+                    startup_audio.push(mono.reshape(-1, 1), block_ts)
+                    pcm_ring.write(mono, block_ts)
+                    buffered = True
+        if not buffered:
+            pcm_ring.write(mono, block_ts)
+            recognizer_feed.notify()
     except Exception as e:
-        print("Audio processing error:", e)
+        audio_stats["callback_errors"] += 1
+        n = audio_stats["callback_errors"]
+        if n & (n - 1) == 0:        # 1st, 2nd, 4th, 8th... so a persistent fault cannot flood the log
+            print(f"❌ Audio callback error (#{n}, block dropped):", repr(e))
+    dt = (time.perf_counter() - t0) * 1000.0
+    m_callback.observe(dt / 1000.0)
+    if dt > audio_stats["callback_max_ms"]:
+        audio_stats["callback_max_ms"] = dt
 
 # ------------------ MAIN ------------------
 
+def _init_firebase_phase():
+    global firebase_ok
+    firebase_ok = init_firebase()
+    return firebase_ok
+
+def _camera_phase():
+    camera.start()
+    return camera.wait_ready(CAMERA_READY_TIMEOUT)
+
+def _http_phase():
+    if HUB_URL:
+        http.add_warmup("hub", hub.warmup_url())
+    else:
+        http.add_warmup("telegram", telegram.warmup_url())
+        http.add_warmup("imgbb", imgbb.warmup_url(), method="HEAD")
+    http.warm()
+    http.start_keepalive(warm_now=False)
+
 def main():
+    global audio_live, frontend
+    boot = Startup()
     print("\n🎧 StreetGuardian MAIN starting. Speak emergency words to trigger alert.")
     print("Keywords:", ", ".join(EMERGENCY_KEYWORDS))
     print("Type 'stop' + Enter in this console to stop the siren.")
+
+    # start input monitor thread (to stop siren manually)
+    threading.Thread(target=input_monitor, daemon=True).start()
+
+    alert_queue.start()
+    incident_updates.start()
+    if EVIDENCE_ARCHIVE or OUTBOX_ENABLED:
+        archive.start()
+    if OUTBOX_ENABLED:
+        outbox.start()
+    if AUDIO_CLIP_ENABLED:
+        clip_recorder.start()
+    metrics_server = None
+    if METRICS_ENABLED:
+        try:
+            metrics_server = MetricsServer(metrics, METRICS_HOST, METRICS_PORT).start()
+        except OSError as e:
+            print("⚠ Metrics endpoint not started:", e)
+    if not os.path.exists(SIREN_WAV):
+        print("⚠ Siren file not found:", SIREN_WAV, " — using a synthesized siren.")
     try:
-        with sd.InputStream(samplerate=SAMPLE_RATE, blocksize=BLOCKSIZE,
-                            dtype='int16', channels=CHANNELS, callback=audio_callback):
+        # 1) the mic first: audio is buffered from here on, even before the model is in
+        rate, channels = capture_format()
+        select = CHANNEL_SELECT
+        try:
+            frontend = AudioFrontEnd(rate, channels, SAMPLE_RATE, select)
+        except ValueError as e:
+            select = "best"
+            print(f"⚠ CHANNEL_SELECT: {e}; using \"best\"")
+            frontend = AudioFrontEnd(rate, channels, SAMPLE_RATE, select)
+        print(f"🎙 Capturing {rate} Hz x{channels} -> {SAMPLE_RATE} Hz mono"
+              f"{'' if frontend.passthrough else f' (channel: {select}, polyphase resampling)'}")
+        audio_live = False
+        with sd.InputStream(device=CAPTURE_DEVICE, samplerate=rate, blocksize=frontend.blocksize(BLOCKSIZE),
+                            dtype='int16', channels=channels, callback=audio_callback):
+            boot.mark("audio")
+
+            # 2) everything slow at once
+            boot.run("model", load_recognizer)
+            boot.run("firebase", _init_firebase_phase)
+            boot.run("camera", _camera_phase)
+            boot.run("http", _http_phase)
+            # decode the siren and open its output stream now, not on the first alert
+            boot.run("siren", siren.prepare)
+
+            # 3) once the recognizer exists, catch up on what was said meanwhile
+            boot.result("model")
+            backlog_s = startup_audio.seconds()
+            drained = drain_startup_audio()
+            recognizer_feed.start()
+            boot.mark("live")
+            print(f"🟢 Listening live: caught up on {drained} buffered block(s) ({backlog_s:.1f}s of audio, "
+                  f"{startup_audio.dropped} dropped)")
+
+            reported = False
+            last_stats = time.monotonic()
             while True:
                 time.sleep(0.5)
+                if not reported and boot.finished():
+                    print("⏱ Startup:", boot.report())
+                    for phase, at in list(boot.done.items()):
+                        m_startup.labels(phase).set(round(at, 3))
+                    reported = True
+                if time.monotonic() - last_stats >= STATS_INTERVAL:
+                    print_stats()
+                    last_stats = time.monotonic()
     except KeyboardInterrupt:
         print("\nStopped by user")
     except Exception as e:
         print("Fatal error:", e)
+    finally:
+        recognizer_feed.stop()
+        print_stats()
+        boot.shutdown()
+        siren.close()
+        alert_queue.stop()
+        incident_updates.stop()
+        clip_recorder.stop()
+        camera.stop()
+        archive.stop()
+        outbox.stop()
+        upload_pool.shutdown(wait=False)
+        dispatcher.shutdown()
+        http.stop()
+        if metrics_server is not None:
+            metrics_server.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,33 @@
+"""pytest: a rejected request is not retried, the fallback still runs."""
+
+from alert_dispatcher import AlertDispatcher, Channel
+
+
+class Rejected(Exception):
+    pass
+
+
+def run(channel):
+    d = AlertDispatcher()
+    try:
+        return d.dispatch([channel], deadline=5.0).channels[channel.name]
+    finally:
+        d.shutdown()
+
+
+def test_fatal_error_skips_retries_not_fallback():
+    calls = []
+    def send(t):
+        calls.append(t)
+        raise Rejected("400 bad photo")
+    r = run(Channel("tg", send, retries=3, backoff=0.01, fallback=lambda t: True, fatal=(Rejected,)))
+    assert len(calls) == 1 and r.status == "fallback" and r.attempts == 1
+
+
+def test_other_errors_are_retried():
+    calls = []
+    def send(t):
+        calls.append(t)
+        raise ConnectionError("down")
+    r = run(Channel("tg", send, retries=2, backoff=0.01, fatal=(Rejected,)))
+    assert len(calls) == 3 and r.status == "failed"
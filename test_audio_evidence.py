@@ -0,0 +1,70 @@
+"""pytest: the PCM ring keeps the last seconds of audio; ClipRecorder cuts mu-law clips from it."""
+
+import struct
+import threading
+
+import numpy as np
+
+from audio_evidence import WAVE_FORMAT_MULAW, ClipRecorder, PcmRing, mulaw_encode
+
+SR = 16000
+
+
+def ramp(start, n):
+    return (np.arange(start, start + n) % 30000).astype(np.int16)
+
+
+def test_ring_wraps_and_keeps_the_newest_samples():
+    ring = PcmRing(1.0, SR)
+    for k in range(25):                         # 2.5 s through a 1 s ring
+        ring.write(ramp(k * 1600, 1600), ts=k * 0.1 + 0.1)
+    assert ring.position == 40000
+    assert np.array_equal(ring.read(39000, 40000), ramp(39000, 1000))
+    assert np.array_equal(ring.read(0, 40000), ramp(24000, 16000))     # clamped to what is left
+    assert len(ring.read(40000, 41000)) == 0
+
+
+def test_block_larger_than_the_ring_keeps_its_tail():
+    ring = PcmRing(0.1, SR)
+    ring.write(ramp(0, 5000), ts=1.0)
+    assert ring.position == 5000
+    assert np.array_equal(ring.read(0, 5000), ramp(3400, 1600))
+
+
+def test_timestamps_map_to_sample_positions():
+    ring = PcmRing(2.0, SR)
+    for k in range(10):
+        ring.write(ramp(0, 1600), ts=100.0 + (k + 1) * 0.1)
+    assert ring.position_at(101.0) == 16000
+    assert ring.position_at(100.5) == 8000
+    assert abs(ring.ts_at(8000) - 100.5) < 1e-9
+
+
+def test_mulaw_is_symmetric_and_silence_is_0xff():
+    codes = mulaw_encode(np.array([0, 1000, -1000, 32767, -32768], dtype=np.int16))
+    assert codes[0] == 0xFF
+    assert codes[1] ^ 0x80 == codes[2]
+    assert codes[3] == 0x80 and codes[4] == 0x00
+
+
+def test_clip_around_the_trigger_is_cut_and_encoded():
+    ring = PcmRing(10.0, SR)
+    for k in range(50):                         # 5 s, block k ends at 200 + (k + 1) / 10
+        ring.write(np.full(1600, 1000, dtype=np.int16), ts=200.0 + (k + 1) * 0.1)
+    got = []
+    done = threading.Event()
+    rec = ClipRecorder(ring, before=2.0, after=1.0, out_rate=8000,
+                       on_clip=lambda wav, kw, *ctx: (got.append((wav, kw, ctx)), done.set())).start()
+    try:
+        assert rec.request("help", 203.0, "ctx")
+        assert done.wait(5.0)
+    finally:
+        rec.stop()
+    wav, kw, ctx = got[0]
+    assert (kw, ctx) == ("help", ("ctx",))
+    assert wav[:4] == b"RIFF" and wav[8:12] == b"WAVE"
+    fmt, channels, rate = struct.unpack("<HHI", wav[20:28])
+    assert (fmt, channels, rate) == (WAVE_FORMAT_MULAW, 1, 8000)
+    data = wav.index(b"data")
+    assert struct.unpack("<I", wav[data + 4:data + 8])[0] == 3 * 8000     # before + after, at 8 kHz
+    assert rec.stats()["clips"] == 1
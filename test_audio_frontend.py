@@ -0,0 +1,16 @@
+"""pytest: AudioFrontEnd rejects a channel selection the device cannot serve."""
+
+import pytest
+
+from audio_frontend import AudioFrontEnd
+
+
+@pytest.mark.parametrize("select", ["best", "mix", 0, 3])
+def test_valid_channel_select(select):
+    AudioFrontEnd(48000, 4, 16000, select)
+
+
+@pytest.mark.parametrize("select", [4, -1, "loudest"])
+def test_invalid_channel_select(select):
+    with pytest.raises(ValueError):
+        AudioFrontEnd(48000, 4, 16000, select)
@@ -0,0 +1,59 @@
+"""pytest: arm on a partial, confirm or cancel on the final, expire a stale arming."""
+
+from concurrent.futures import Future
+
+from early_trigger import EarlyTrigger
+
+
+class InlinePool:
+    def submit(self, fn, *args):
+        f = Future()
+        f.set_result(fn(*args))
+        return f
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def trigger(timeout=10.0):
+    clock = Clock()
+    return EarlyTrigger(lambda keyword, ts: ("prepared", keyword, ts), timeout=timeout,
+                        pool=InlinePool(), clock=clock), clock
+
+
+def test_confirm_hands_over_the_prepared_work():
+    early, clock = trigger()
+    early.arm("help", 5.0)
+    clock.now += 1.5
+    a = early.confirm()
+    assert a.prepared.result() == ("prepared", "help", 5.0)
+    assert early.current is None and early.stats()["lead_ms"] == 1500.0
+
+
+def test_a_second_partial_keeps_the_first_arming():
+    early, _ = trigger()
+    first = early.arm("help", 5.0)
+    assert early.arm("bachao", 6.0) is first and early.stats()["armed"] == 1
+
+
+def test_cancel_drops_the_arming():
+    early, _ = trigger()
+    early.arm("help", 5.0)
+    assert early.cancel() is not None and early.current is None
+    assert early.confirm() is None
+
+
+def test_stale_arming_expires_on_the_trigger_clock():
+    early, clock = trigger(timeout=10.0)
+    early.arm("help", 5.0)
+    clock.now += 9.9
+    assert early.expire() is None
+    clock.now += 0.2
+    assert early.expire() is not None
+    assert early.current is None and early.stats()["expired"] == 1
+    assert early.confirm() is None          # a later final does not confirm it
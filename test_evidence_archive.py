@@ -0,0 +1,30 @@
+"""pytest: evidence an outbox row points at is on disk (wait / sync save / drain on stop)."""
+
+import os
+
+from evidence_archive import EvidenceArchive
+
+
+def test_sync_save_is_on_disk_at_return(tmp_path):
+    archive = EvidenceArchive(str(tmp_path))
+    path = archive.save(b"jpeg", "help", sync=True)
+    with open(path, "rb") as f:
+        assert f.read() == b"jpeg"
+
+
+def test_wait_returns_once_the_queued_write_is_done(tmp_path):
+    archive = EvidenceArchive(str(tmp_path)).start()
+    try:
+        path = archive.save(b"x" * 100000, "help")
+        assert archive.wait(path) and os.path.getsize(path) == 100000
+    finally:
+        archive.stop()
+
+
+def test_stop_writes_everything_still_queued(tmp_path):
+    archive = EvidenceArchive(str(tmp_path), maxsize=64)
+    os.makedirs(archive.directory, exist_ok=True)
+    paths = [archive.save(b"%d" % i, "help") for i in range(20)]     # no worker running
+    archive.stop()
+    assert all(os.path.exists(p) for p in paths)
+    assert archive.wait(paths[-1], timeout=0)
@@ -0,0 +1,53 @@
+"""pytest: FcmResult.ok only for a delivery that reached someone."""
+
+from fcm_delivery import FcmDelivery, targets
+
+
+class UnregisteredError(Exception):
+    pass
+
+
+class InvalidArgumentError(Exception):
+    pass
+
+
+def transport(fail):
+    """send_each stand-in: fail maps a target to the exception it fails with."""
+    def send_each(items):
+        return [(False, fail[t]) if t in fail else (True, None) for t, _ in items]
+    return send_each
+
+
+def deliver(fail, topics=("zone_a",), tokens=("tok1",)):
+    return FcmDelivery(transport(fail), retries=1, backoff=0.0).send({"k": "v"}, targets(topics, tokens))
+
+
+def test_all_delivered_is_ok():
+    assert deliver({}).ok
+
+
+def test_dead_token_alone_does_not_fail_the_alert():
+    r = deliver({("token", "tok1"): UnregisteredError()})
+    assert r.ok and r.delivered == 1
+
+
+def test_nothing_delivered_is_not_ok():
+    r = deliver({("token", "tok1"): UnregisteredError()}, topics=())
+    assert not r.ok and r.delivered == 0
+
+
+def test_permanent_topic_error_is_not_ok():
+    r = deliver({("topic", "zone_a"): InvalidArgumentError()})
+    assert not r.ok and r.results[0].attempts == 1
+
+
+def test_transient_topic_error_is_retried_then_not_ok():
+    r = deliver({("topic", "zone_a"): ConnectionError()})
+    assert not r.ok and r.results[0].attempts == 2
+
+
+def test_pending_lists_only_what_a_retry_could_reach():
+    r = deliver({("topic", "zone_a"): ConnectionError(), ("topic", "zone_b"): InvalidArgumentError(),
+                 ("token", "tok1"): UnregisteredError()}, topics=("zone_a", "zone_b"))
+    assert r.pending() == [("topic", "zone_a")]
+    assert len(r.failed()) == 3
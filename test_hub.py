@@ -0,0 +1,73 @@
+"""pytest: an edge alert reaches Telegram through the hub, also after a failed first send."""
+
+import asyncio
+import os
+import time
+from urllib.parse import parse_qs
+
+from hub import Hub
+from outbox import Outbox
+from sender_stub_test import start_stub
+from senders import HubClient, SenderPool, TelegramSender
+
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 2048 + b"\xff\xd9"
+
+
+async def wait_for(cond, timeout=5.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end and not cond():
+        await asyncio.sleep(0.02)
+    return cond()
+
+
+async def scenario(tmp_path, steps):
+    srv = start_stub()
+    srv.fail_status = 500
+    pool = SenderPool(pool_size=4)
+    tg = TelegramSender(f"http://127.0.0.1:{srv.server_port}/botTEST", "42", pool)
+    outbox = Outbox(str(tmp_path / "outbox.db"), base_backoff=0.1, max_backoff=0.2)
+    hub = await Hub(lambda zone: tg, fcm_send_batch=lambda batch: [True] * len(batch), evidence_wait=2.0,
+                    update_interval=0.2, outbox=outbox, evidence_dir=str(tmp_path / "evidence")
+                    ).start("127.0.0.1", 0)
+    devices = [HubClient(f"http://127.0.0.1:{hub.port}", f"dev{i}", "zone_a", pool) for i in range(2)]
+    try:
+        await steps(srv, hub, devices)
+    finally:
+        await hub.stop()
+        pool.stop()
+        srv.shutdown()
+
+
+def photos(srv):
+    return srv.hits.count(("POST", "/botTEST/sendPhoto"))
+
+
+def test_alert_goes_out_as_photo_and_a_second_device_edits_it(tmp_path):
+    async def steps(srv, hub, devices):
+        incident = await asyncio.to_thread(devices[0].send_alert, "HELP", "Main St", "now", JPEG)
+        assert incident
+        assert await wait_for(lambda: photos(srv) == 1)
+        assert srv.last_multipart and f"Incident: {incident}".encode() in srv.last_body
+
+        again = await asyncio.to_thread(devices[1].send_alert, "SAVE ME", "Main St", "now", JPEG)
+        assert again == incident
+        assert await wait_for(lambda: ("POST", "/botTEST/editMessageCaption") in srv.hits)
+        caption = parse_qs(srv.last_body.decode())["caption"][0]
+        assert "from 2 device(s)" in caption and "SAVE ME" in caption
+        assert photos(srv) == 1
+        assert hub.stats()["telegram_sent"] == 1 and hub.stats()["deduplicated"] == 1
+
+    asyncio.run(scenario(tmp_path, steps))
+
+
+def test_failed_first_send_is_retried_with_the_photo(tmp_path):
+    async def steps(srv, hub, devices):
+        srv.fail_next = 1
+        incident = await asyncio.to_thread(devices[0].send_alert, "HELP", "Main St", "now", JPEG)
+        assert await wait_for(lambda: hub.stats()["telegram_late"] == 1)
+        assert photos(srv) == 2 and srv.last_multipart
+        assert f"Incident: {incident}".encode() in srv.last_body
+        assert hub.stats()["telegram_queued"] == 1
+        assert await wait_for(lambda: not os.listdir(hub.evidence_dir))    # delivered: photo removed
+
+    asyncio.run(scenario(tmp_path, steps))
@@ -0,0 +1,46 @@
+"""pytest: keyword hits coalesce into incidents."""
+
+from incidents import IncidentManager
+
+
+def test_hits_within_the_window_join_one_incident():
+    m = IncidentManager(window=30.0, max_duration=600.0)
+    first, new = m.hit("help", 100.0)
+    assert new
+    again, new = m.hit("save me", 125.0)
+    assert again is first and not new
+    assert (first.hits, first.version, first.keywords) == (2, 2, ["help", "save me"])
+    assert m.stats()["incidents"] == 1 and m.stats()["coalesced"] == 1
+
+
+def test_window_counts_from_the_last_hit():
+    m = IncidentManager(window=30.0, max_duration=600.0)
+    first, _ = m.hit("help", 100.0)
+    m.hit("help", 125.0)
+    assert m.hit("help", 150.0)[0] is first         # 25 s after the last hit
+    later, new = m.hit("help", 181.0)               # 31 s of quiet
+    assert new and later is not first
+
+
+def test_max_duration_closes_a_busy_incident():
+    m = IncidentManager(window=30.0, max_duration=60.0)
+    first, _ = m.hit("help", 0.0)
+    for ts in (20.0, 40.0, 60.0):
+        assert m.hit("help", ts)[0] is first
+    assert m.hit("help", 61.0)[1]
+
+
+def test_provisional_incident_counts_only_once_confirmed():
+    m = IncidentManager()
+    inc, _ = m.hit("help", 0.0, provisional=True)
+    assert m.stats()["incidents"] == 0 and m.is_open(1.0)
+    m.confirm(inc)
+    assert m.stats()["incidents"] == 1
+
+
+def test_cancelled_provisional_incident_does_not_swallow_the_next_hit():
+    m = IncidentManager()
+    inc, _ = m.hit("help", 0.0, provisional=True)
+    m.cancel(inc)
+    assert not m.is_open(1.0)
+    assert m.hit("help", 1.0)[1]
@@ -0,0 +1,70 @@
+"""pytest: whole-word matching and script-aware normalization of keyword_matcher."""
+
+import pytest
+
+from keyword_matcher import KeywordMatcher, normalize
+
+
+def keywords(matcher, text):
+    return [m.keyword for m in matcher.find_all(text)]
+
+
+@pytest.mark.parametrize("word", ["बचाओ", "मदद", "रक्षा", "కాపాడు", "నన్ను కాపాడు"])
+def test_indic_words_survive_normalization(word):
+    assert normalize(word) == word
+
+
+def test_latin_accents_and_repeats_fold():
+    assert normalize("thuṇai") == "thunai"
+    assert normalize("Saahayam!!") == "sahayam"
+    assert normalize("kaapadu") == normalize("kapadu")
+
+
+def test_devanagari_double_consonant_is_not_collapsed():
+    m = KeywordMatcher.build({"hindi": ["मद"]})
+    assert keywords(m, "मदद करो") == []
+    m = KeywordMatcher.build({"hindi": ["मदद"]})
+    assert keywords(m, "मद") == []
+    assert keywords(m, "मदद करो") == ["मदद"]
+
+
+def test_telugu_vowel_signs_are_part_of_the_word():
+    m = KeywordMatcher.build({"telugu": ["కాపాడు"]})
+    assert keywords(m, "కిపిడి") == []
+    assert keywords(m, "నన్ను కాపాడు") == ["కాపాడు"]
+
+
+def test_native_spellings_match_romanized_keywords():
+    m = KeywordMatcher.build({"hindi": ["madad", "bachao"]},
+                             {"madad": ["मदद"], "bachao": ["बचाओ"]})
+    found = m.find_all("मदद करो बचाओ")
+    assert [x.keyword for x in found] == ["madad", "bachao"]
+    assert found[0].langs == ("hindi",)
+
+
+def test_whole_words_only():
+    m = KeywordMatcher.build(["save", "100", "save me"])
+    assert keywords(m, "he saved us") == []
+    assert keywords(m, "call 1000 now") == []
+    assert keywords(m, "call 100 now") == ["100"]
+    assert keywords(m, "please save me") == ["save me", "save"]
+
+
+def test_duplicates_merge_language_tags():
+    m = KeywordMatcher.build({"hindi": ["police"], "english": ["police"]})
+    assert len(m) == 1
+    assert m.first("call the police").langs == ("english", "hindi")
+
+
+def test_multi_test_matcher_reads_native_script():
+    multi_test = pytest.importorskip("multi_test")
+    assert multi_test.is_emergency("मदद करो") == (True, "madad")
+    assert multi_test.is_emergency("నన్ను కాపాడు")[0]
+    assert multi_test.is_emergency("मद") == (False, None)
+
+
+def test_urdu_grammar_is_in_the_hindi_models_script():
+    multi_test = pytest.importorskip("multi_test")
+    for word in multi_test.GRAMMARS["urdu"]:
+        assert all("\u0900" <= ch <= "\u097f" for ch in word)
+        assert multi_test.is_emergency(word)[0]
@@ -0,0 +1,26 @@
+"""pytest: ModelManager memory estimates against the budget."""
+
+from model_manager import ModelManager
+
+
+def model_dir(tmp_path, name, mb):
+    d = tmp_path / name
+    d.mkdir()
+    (d / "final.mdl").write_bytes(b"\0" * int(mb * 1024 * 1024))
+    return str(d)
+
+
+def test_hot_mb_counts_each_hot_model_once(tmp_path):
+    hi = model_dir(tmp_path, "hi", 2)
+    te = model_dir(tmp_path, "te", 1)
+    m = ModelManager({"hindi": hi, "urdu": hi, "telugu": te}, hot=["hindi", "urdu"], budget_mb=1.5)
+    assert round(m.hot_mb(), 1) == 2.0
+    assert m.hot_mb() > m.budget_mb
+
+
+def test_cold_model_does_not_fit_beside_oversized_hot_set(tmp_path):
+    hi = model_dir(tmp_path, "hi", 2)
+    te = model_dir(tmp_path, "te", 1)
+    m = ModelManager({"hindi": hi, "telugu": te}, hot=["hindi"], budget_mb=1.5)
+    m.entry("hindi").state = "ready"
+    assert m.plan(m.entry("telugu")) is None
@@ -0,0 +1,137 @@
+"""pytest: outbox persistence, redelivery, evidence cleanup and kick."""
+
+import os
+import time
+
+from outbox import Outbox
+
+
+def wait_for(cond, timeout=5.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return cond()
+
+
+def evidence(tmp_path, name="snap.jpg"):
+    path = str(tmp_path / name)
+    with open(path, "wb") as f:
+        f.write(b"jpeg")
+    return path
+
+
+def test_undelivered_rows_survive_a_restart(tmp_path):
+    db = str(tmp_path / "o.db")
+    box = Outbox(db, base_backoff=60.0)
+    box.register("telegram", lambda items: [False] * len(items))
+    box.start()
+    box.enqueue("telegram", {"keyword": "help", "n": 1}, "snap.jpg")
+    assert wait_for(lambda: box.retries == 1)
+    box.enqueue("telegram", {"keyword": "help", "n": 2})
+    box.stop()                  # the second row is only in memory: stop() writes it
+
+    got = []
+    box = Outbox(db)
+    box.register("telegram", lambda items: got.extend(items) or [True] * len(items))
+    box.kick()                  # the first row is still backing off
+    box.start()
+    try:
+        assert wait_for(lambda: box.stats()["delivered"] == 2)
+        assert [(i["payload"]["n"], i["evidence"], i["attempts"]) for i in got] == [(1, "snap.jpg", 1), (2, None, 0)]
+        assert wait_for(lambda: box.stats()["depth"] == 0)
+    finally:
+        box.stop()
+
+
+def test_failed_rows_back_off_and_are_redelivered(tmp_path):
+    box = Outbox(str(tmp_path / "o.db"), base_backoff=0.05, max_backoff=0.1)
+    up = {"ok": False}
+    calls = []
+
+    def send(items):
+        calls.append(len(items))
+        return [up["ok"]] * len(items)
+
+    box.register("fcm", send)
+    box.start()
+    try:
+        for n in range(3):
+            box.enqueue("fcm", {"n": n})
+        assert wait_for(lambda: box.retries >= 6)       # every row failed at least twice
+        up["ok"] = True
+        assert wait_for(lambda: box.stats()["delivered"] == 3)
+        assert box.stats()["given_up"] == 0
+    finally:
+        box.stop()
+
+
+def test_gives_up_after_max_attempts(tmp_path):
+    box = Outbox(str(tmp_path / "o.db"), base_backoff=0.01, max_backoff=0.01, max_attempts=2)
+    box.register("fcm", lambda items: [False] * len(items))
+    box.start()
+    try:
+        box.enqueue("fcm", {"n": 1})
+        assert wait_for(lambda: box.stats()["given_up"] == 1)
+        assert wait_for(lambda: box.stats()["depth"] == 0)
+    finally:
+        box.stop()
+
+
+def test_shared_evidence_is_removed_after_its_last_row(tmp_path):
+    box = Outbox(str(tmp_path / "o.db"), base_backoff=60.0, delete_evidence=True)
+    ok = {"telegram": True, "fcm": False}
+    box.register("telegram", lambda items: [ok["telegram"]] * len(items))
+    box.register("fcm", lambda items: [ok["fcm"]] * len(items))
+    path = evidence(tmp_path)
+    box.enqueue("telegram", {"k": 1}, path)
+    box.enqueue("fcm", {"k": 1}, path)
+    box.start()
+    try:
+        assert wait_for(lambda: box.stats()["delivered"] == 1)
+        assert os.path.exists(path)         # the fcm row still needs it
+        ok["fcm"] = True
+        box.kick(["fcm"])
+        assert wait_for(lambda: box.stats()["delivered"] == 2)
+        assert wait_for(lambda: not os.path.exists(path))
+    finally:
+        box.stop()
+
+
+def test_archived_evidence_is_kept(tmp_path):
+    box = Outbox(str(tmp_path / "o.db"))
+    box.register("telegram", lambda items: [True] * len(items))
+    path = evidence(tmp_path)
+    box.enqueue("telegram", {"k": 1}, path)
+    box.start()
+    try:
+        assert wait_for(lambda: box.stats()["delivered"] == 1)
+        assert os.path.exists(path)
+    finally:
+        box.stop()
+
+
+def test_kick_retries_only_the_named_channel(tmp_path):
+    box = Outbox(str(tmp_path / "o.db"), base_backoff=60.0)
+    calls = {"telegram": 0, "fcm": 0}
+
+    def handler(channel):
+        def send(items):
+            calls[channel] += 1
+            return [False] * len(items)
+        return send
+
+    box.register("telegram", handler("telegram"))
+    box.register("fcm", handler("fcm"))
+    box.enqueue("telegram", {"k": 1})
+    box.enqueue("fcm", {"k": 1})
+    box.start()
+    try:
+        assert wait_for(lambda: calls == {"telegram": 1, "fcm": 1})
+        box.kick(["telegram"])
+        assert wait_for(lambda: calls["telegram"] == 2)
+        time.sleep(0.2)
+        assert calls["fcm"] == 1
+    finally:
+        box.stop()
@@ -0,0 +1,37 @@
+"""pytest: the bundled siren.wav decodes (WAVE_FORMAT_EXTENSIBLE, 24-bit stereo)."""
+
+import os
+import wave
+
+import numpy as np
+
+from siren import SirenEngine, decode_wav
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SIREN_WAV = os.path.join(HERE, "siren.wav")
+
+
+def test_bundled_siren_decodes():
+    pcm, rate = decode_wav(SIREN_WAV)
+    assert rate == 44100
+    assert pcm.dtype == np.int16 and pcm.shape[1] == 2
+    assert len(pcm) > rate and np.abs(pcm).max() > 1000
+
+
+def test_engine_plays_the_file_not_the_synth():
+    engine = SirenEngine(SIREN_WAV)
+    assert engine.load()
+    assert engine.source == "file"
+
+
+def test_plain_pcm16(tmp_path):
+    path = str(tmp_path / "tone.wav")
+    samples = np.arange(-100, 100, dtype="<i2")
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(8000)
+        wf.writeframes(samples.tobytes())
+    pcm, rate = decode_wav(path)
+    assert rate == 8000
+    assert np.array_equal(pcm[:, 0], samples)
@@ -0,0 +1,51 @@
+"""pytest: the VAD gate feeds speech (with padding and hangover) and skips quiet."""
+
+import numpy as np
+
+from vad import EnergyVAD
+
+SR = 16000
+
+
+def noise(seconds, level=20, seed=0):
+    return np.random.default_rng(seed).integers(-level, level, int(SR * seconds)).astype(np.int16)
+
+
+def tone(seconds, hz=200.0, amp=8000):
+    t = np.arange(int(SR * seconds)) / SR
+    return (amp * np.sin(2 * np.pi * hz * t)).astype(np.int16)
+
+
+def run(vad, pcm, block=1600):
+    out = []
+    for i in range(0, len(pcm), block):
+        out.extend(vad.process(pcm[i:i + block]))
+    return out
+
+
+def test_quiet_street_feeds_nothing():
+    vad = EnergyVAD(SR)
+    assert run(vad, noise(3.0)) == []
+    assert vad.skipped_pct() == 100.0 and vad.segments == 0
+
+
+def test_speech_is_fed_with_padding_and_hangover_then_flushed():
+    vad = EnergyVAD(SR, frame_ms=20, hangover_ms=300, padding_ms=200)
+    pcm = np.concatenate((noise(1.0), tone(0.5), noise(1.5, seed=1)))
+    out = run(vad, pcm)
+    fed = b"".join(chunk for chunk, _ in out)
+    assert sum(ended for _, ended in out) == 1 and out[-1][1]
+    assert vad.segments == 1
+    # 0.2 s padding + 0.5 s speech + 0.3 s hangover (to within a frame or two)
+    assert abs(len(fed) / 2 / SR - 1.0) <= 0.05
+    # the padding reaches back before the speech: the fed audio starts quiet
+    first = np.frombuffer(fed[:2 * 320], dtype=np.int16)
+    assert np.abs(first).max() < 100
+    assert 40.0 < vad.skipped_pct() < 70.0
+
+
+def test_segment_ending_on_a_block_boundary_is_flushed_in_the_next_block():
+    vad = EnergyVAD(SR, frame_ms=20, hangover_ms=0, padding_ms=0)
+    out = run(vad, np.concatenate((tone(0.2), noise(0.2))), block=3200)
+    assert out[0][0] and not out[0][1]      # speech fills the first block exactly
+    assert out[1] == (b"", True)            # and ends right at its edge
@@ -0,0 +1,135 @@
+"""
+vad.py
+
+Energy / zero-crossing voice activity gate in front of the Vosk recognizer.
+
+Most of the day the street is quiet, and feeding every block through
+KaldiRecognizer keeps one core busy for nothing. EnergyVAD splits each
+audio block into short frames, marks speech frames with vectorized NumPy
+(frame energy above an adaptive noise floor, zero-crossing rate low enough
+to be voiced, or loud enough to be a fricative), holds the gate open for a
+hangover period, and adds padding before each speech segment. Only those
+frames are returned for recognition.
+"""
+
+import numpy as np
+
+_FULL_SCALE_SQ = 32768.0 ** 2
+
+
+class EnergyVAD:
+    def __init__(self, sample_rate=16000, frame_ms=20, energy_db=-50.0, margin_db=10.0,
+                 zcr_max=0.35, loud_db=10.0, hangover_ms=300, padding_ms=200,
+                 noise_adapt=0.05):
+        self.sample_rate = sample_rate
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.energy_db = energy_db          # absolute floor, dBFS
+        self.margin_db = margin_db          # speech must be this far above the noise floor
+        self.zcr_max = zcr_max              # voiced speech has low zero-crossing rate
+        self.loud_db = loud_db              # ...unless it is this much louder than threshold
+        self.hangover = max(0, int(round(hangover_ms / frame_ms)))
+        self.padding = max(0, int(round(padding_ms / frame_ms)))
+        self.noise_adapt = noise_adapt
+        self.noise_db = energy_db - margin_db
+        self.reset()
+
+    def reset(self):
+        self._carry = np.zeros(0, dtype=np.int16)
+        self._gap = self.hangover + 1       # frames since the last speech frame
+        self._tail = np.zeros((0, self.frame_len), dtype=np.int16)
+        self._tail_sent = np.zeros(0, dtype=bool)
+        self.total_frames = 0
+        self.fed_frames = 0
+        self.segments = 0
+        self._open = False                  # last segment reached the end of the previous block
+
+    @property
+    def active(self):
+        return self._gap <= self.hangover
+
+    def _classify(self, frames):
+        f = frames.astype(np.float32)
+        energy = 10.0 * np.log10(np.mean(f * f, axis=1) / _FULL_SCALE_SQ + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        thr = max(self.energy_db, self.noise_db + self.margin_db)
+        speech = (energy > thr) & ((zcr <= self.zcr_max) | (energy > thr + self.loud_db))
+        quiet = energy[~speech]
+        if quiet.size:
+            # slow noise floor tracking so traffic noise does not open the gate
+            self.noise_db += self.noise_adapt * (float(np.mean(quiet)) - self.noise_db)
+        return speech
+
+    def process(self, block):
+        """
+        Feed one block of int16 PCM (any shape). Returns a list of
+        (pcm_bytes, ended) segments to pass to the recognizer; `ended` is True
+        when the speech segment closed inside this block and the recognizer
+        should be flushed.
+        """
+        x = np.asarray(block, dtype=np.int16).reshape(-1)
+        if self._carry.size:
+            x = np.concatenate((self._carry, x))
+        n = x.size // self.frame_len
+        self._carry = x[n * self.frame_len:].copy()
+        if n == 0:
+            return []
+        frames = x[:n * self.frame_len].reshape(n, self.frame_len)
+        self.total_frames += n
+
+        speech = self._classify(frames)
+
+        # hangover: a frame is active if speech was seen within `hangover` frames
+        idx = np.arange(n)
+        last = np.where(speech, idx, -1 - self._gap)
+        last = np.maximum.accumulate(np.maximum(last, -1 - self._gap))
+        active = (idx - last) <= self.hangover
+        self._gap = int(n - 1 - last[-1])
+
+        # padding: also send up to `padding` frames before each active frame,
+        # reaching back into the unsent tail of the previous block
+        t = self._tail.shape[0]
+        ext = np.concatenate((self._tail, frames))
+        ext_active = np.concatenate((np.zeros(t, dtype=bool), active))
+        include = ext_active.copy()
+        for k in range(1, self.padding + 1):
+            include[:-k] |= ext_active[k:]
+        include[:t] &= ~self._tail_sent
+
+        keep = min(self.padding, ext.shape[0])
+        self._tail = ext[ext.shape[0] - keep:].copy()
+        self._tail_sent = (include | np.concatenate((self._tail_sent, np.zeros(n, dtype=bool))))[ext.shape[0] - keep:]
+
+        out = []
+        if self._open and not include[t]:
+            # the segment left open by the previous block stopped right at its end
+            out.append((b"", True))
+            self.segments += 1
+        self._open = False
+
+        # split into contiguous runs
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], include.view(np.int8), [0]))))
+        for start, stop in zip(edges[::2], edges[1::2]):
+            ended = stop < ext.shape[0]
+            out.append((ext[start:stop].tobytes(), bool(ended)))
+            self.fed_frames += int(stop - start)
+            if ended:
+                self.segments += 1
+            else:
+                self._open = True
+        return out
+
+    def skipped_pct(self):
+        if self.total_frames == 0:
+            return 0.0
+        return 100.0 * (1.0 - min(self.fed_frames, self.total_frames) / self.total_frames)
+
+    def stats(self):
+        return {
+            "frames": self.total_frames,
+            "fed_frames": self.fed_frames,
+            "skipped_pct": round(self.skipped_pct(), 1),
+            "segments": self.segments,
+            "noise_db": round(self.noise_db, 1),
+            "active": self.active,
+        }